@@ -1,5 +1,6 @@
 from telegram import Update
-from telegram.ext import ContextTypes, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ChatMemberHandler, Application
+from telegram.ext import ContextTypes, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ChatMemberHandler, Application, CallbackContext
+import asyncio
 import logging
 from database.database import MongoDBManager
 import bot.commands as commands
@@ -10,11 +11,33 @@ import bot.openai_utils as oai_utils
 import bot.group_message_handler as gmh
 import bot.config as config
 import bot.left_members as l_members
+from bot.admin_cache import AdminRosterCache
+from bot.flood_control import FloodController
+from bot.vote_scheduler import VoteScheduler
+from bot.ephemeral_messages import EphemeralMessageManager
+from bot.record_sweeper import RecordSweeper
+from bot.captcha_pool import CaptchaPool
+from bot.captcha_corpus import CaptchaCorpus
+from bot.answer_cache import AnswerCache
+from bot.stats_reporter import StatsReporter
+from bot.webhook_server import WebhookServer
+from bot.sharding import Shard, ShardedIngress
+from bot.update_lanes import PriorityUpdateProcessor, LANE_INTERACTIVE, LANE_MODERATION, LANE_SCANNING, LANE_QA
+from scam_algo_src.inference_service import SpamInferenceService
+from scam_algo_src.verdict_cache import VerdictCache
+from scam_algo_src.prefilter import SpamPreFilter
+from scam_algo_src.overload_control import OverloadController
 
 
 # configuration
 CONFIG = config.get_config()
-db = MongoDBManager(uri=CONFIG.MONGO_DB_CONNECTION_STRING)
+db = MongoDBManager(uri=CONFIG.MONGO_DB_CONNECTION_STRING,
+                    config_cache_size=CONFIG.GROUP_CONFIG_CACHE_SIZE,
+                    config_cache_ttl=CONFIG.GROUP_CONFIG_CACHE_TTL,
+                    verification_retention=CONFIG.VERIFICATION_RETENTION,
+                    scam_voting_retention=CONFIG.SCAM_VOTING_RETENTION,
+                    verdict_retention=CONFIG.SPAM_VERDICT_CACHE_TTL,
+                    count_round_trips=CONFIG.MONGO_COUNT_ROUND_TRIPS)
 
 
 # enable logging
@@ -28,7 +51,7 @@ async def handle_new_members(update: Update, context: ContextTypes.DEFAULT_TYPE)
     try:
         new_members = update.message.new_chat_members
         group_id = update.message.chat_id
-        group_config = db.get_admin_config(group_id=group_id)
+        group_config = await db.get_admin_config(group_id=group_id)
 
         for member in new_members:
             await n_members.handle_bot_as_new_admin(member, update, context, db)
@@ -57,30 +80,37 @@ async def handle_user_verification(update, context, query, data):
 
     user_id = update.effective_user.id
     chat_id = query.message.chat_id
-    group_id = context.user_data['to_verify_in_group_id']
+    group_id = None
 
     try:
-        verif_data = db.get_verification_data(user_id, group_id)
-        welcome_message_id = context.user_data.get('welcome_message_id')
+        # the group picked by /start verify_<group_id> in this private chat, stored when the user joined (the group may be served by another shard)
+        verif_data = await db.get_pending_verification(user_id, context.user_data.get('to_verify_in_group_id'))
+        if verif_data is None:
+            await query.answer("No pending verification found.")
+            return
+        group_id = verif_data["group_id"]
+        welcome_message_id = verif_data.get("welcome_message_id")
         verification_message_id = context.user_data.get('verification_msg_id')
         group_title = verif_data["group_title"]
         group_username = verif_data["group_username"]
+        if data != "vrfct_regenerate_captcha":
+            context.user_data.pop('to_verify_in_group_id', None)  # answered, the next verification picks its own group
 
         if data == "vrfct_correct_web":
             # verification succeeded | WEB
-            db.delete_verification_data(user_id)
+            await db.delete_verification_data(user_id, group_id)
             await verification.handle_web_success(query, context, user_id, group_id, chat_id, group_username, group_title, welcome_message_id, verification_message_id)
         elif data == "vrfct_wrong_web":
             # verification failed | WEB
-            db.delete_verification_data(user_id)
+            await db.delete_verification_data(user_id, group_id)
             await verification.handle_web_failure(query, context, user_id, chat_id, group_id, group_title, welcome_message_id, verification_message_id)
         elif data == "vrfct_correct_captcha":
             # verification succeeded | CAPTCHA
-            db.delete_verification_data(user_id)
+            await db.delete_verification_data(user_id, group_id)
             await verification.handle_captcha_success(query, context, user_id, group_id, group_title, group_username, chat_id, welcome_message_id)
         elif data == "vrfct_wrong_captcha":
             # verification failed | CAPTCHA
-            db.delete_verification_data(user_id)
+            await db.delete_verification_data(user_id, group_id)
             await verification.handle_captcha_failure(query, context, user_id, group_id, group_title, chat_id, welcome_message_id)
         elif data == "vrfct_regenerate_captcha":
             # regenerate CAPTCHA
@@ -132,7 +162,7 @@ async def handle_bot_group_query(update: Update, context: ContextTypes.DEFAULT_T
             return
 
         PREMIUM_GROUPS = config.premium_groups['premium_groups_id']
-        group_config = db.get_admin_config(group_id=group_id)
+        group_config = await db.get_admin_config(group_id=group_id)
         antiflood_interval = group_config.get('antiflood', 'no')
 
         if antiflood_interval != 'no':
@@ -140,51 +170,119 @@ async def handle_bot_group_query(update: Update, context: ContextTypes.DEFAULT_T
             await gmh.antiflood_checker(update, context, interval)
 
         if chat_id in PREMIUM_GROUPS:
-            await gmh.antiflood_checker(update, context, antiflood_interval)
             await gmh.analyse_group_msg_from_user(update, context, db, chat_id)
             await oai_utils.activate_premium_assistance(update, context, chat_id, CONFIG.OPENAI_GUARDY_ASSISTANT_ID, CONFIG.OPENAI_GUARDY_ASSISTANT_API_KEY)
     except Exception as e:
         logger.error(f"Error in handle_bot_group_query: {e}")
 
 
-# /verify command
-async def verify_user_command(update, context):
-
-    chat_id = update.effective_chat.id
-    user_id = update.effective_user.id
-    group_id = context.user_data.get('to_verify_in_group_id')
-
-    try:
-        # check if there is pending verification
-        if not await utils.is_user_verified(user_id, group_id, db):
-            return
-
-        # fetch group configuration
-        group_config = db.get_admin_config(group_id=group_id)
-        if group_config:
-            verification_type = group_config.get('human_verification', 'no')
-
-            if verification_type == 'web':
-                await verification.web_command(update, context)
-            elif verification_type == 'image':
-                await verification.captcha_command(update, context)
-            elif verification_type == 'no':
-                pass  # No action required if no verification type is set
-            else:
-                logger.error(f"Unexpected verification type: {verification_type} for group: {chat_id}")
-        else:
-            logger.warning(f"No group configuration found for group: {chat_id}")
-    except Exception as e:
-        logger.error(f"Error during verification process for user {user_id} in group {chat_id}: {e}")
-        await update.message.reply_text("An error occurred during the verification process. Please contact support.")
-
-
-
-def main() -> None:
+# start background services
+async def post_init(application: Application):
+    await db.ensure_indexes()
+    if CONFIG.MONGO_VERIFY_QUERY_PLANS:
+        await db.verify_query_plans()
+    if CONFIG.SPAM_MODEL_PRELOAD:
+        application.bot_data['spam_inference'].warm_up_in_background()
+    await application.bot_data['vote_scheduler'].start()
+    await application.bot_data['ephemeral_messages'].start(application.bot)
+    if 'record_sweeper' in application.bot_data:
+        application.bot_data['record_sweeper'].start()
+    application.bot_data['captcha_pool'].start()
+    if 'captcha_corpus' in application.bot_data:
+        await application.bot_data['captcha_corpus'].start(application.bot)
+    application.bot_data['stats_reporter'].start()
+
+
+# stop background services
+async def post_shutdown(application: Application):
+    await application.bot_data['stats_reporter'].stop()
+    if 'record_sweeper' in application.bot_data:
+        await application.bot_data['record_sweeper'].stop()
+    if 'captcha_corpus' in application.bot_data:
+        await application.bot_data['captcha_corpus'].stop()
+    await application.bot_data['vote_scheduler'].stop()
+    await application.bot_data['ephemeral_messages'].stop()
+    await application.bot_data['spam_inference'].shutdown()
+    await application.bot_data['captcha_pool'].shutdown()
+
+
+def build_application(shard: Shard = None) -> Application:
+    """
+    builds the guardy application with all services and handlers. in sharded mode (see bot/sharding.py) it only
+    serves the chats of `shard`, and the global background jobs run on shard 0 only.
+    """
+    owns = shard.owns if shard is not None else None
+    is_primary = shard is None or shard.index == 0
+
+    # bounded concurrency, verification & admin clicks are preferred over scanning during raids
+    update_processor = PriorityUpdateProcessor(CONFIG.UPDATE_MAX_CONCURRENT, lane_limits={
+        LANE_INTERACTIVE: CONFIG.UPDATE_LANE_INTERACTIVE,
+        LANE_MODERATION: CONFIG.UPDATE_LANE_MODERATION,
+        LANE_SCANNING: CONFIG.UPDATE_LANE_SCANNING,
+        LANE_QA: CONFIG.UPDATE_LANE_QA,
+    })
 
     application = (Application.builder()
                    .token(token=CONFIG.GUARDY_BOT_API_KEY)
-                   .concurrent_updates(True)).build()
+                   .concurrent_updates(update_processor)
+                   .post_init(post_init)
+                   .post_shutdown(post_shutdown)).build()
+
+    # shared state & background services
+    verdict_cache = VerdictCache(maxsize=CONFIG.SPAM_VERDICT_CACHE_SIZE,
+                                 ttl=CONFIG.SPAM_VERDICT_CACHE_TTL,
+                                 db=db if CONFIG.SPAM_VERDICT_CACHE_SHARED else None)
+    application.bot_data['admin_roster'] = AdminRosterCache(ttl=CONFIG.ADMIN_ROSTER_TTL)
+    application.bot_data['flood_control'] = FloodController(window_seconds=20)
+    application.bot_data['vote_scheduler'] = VoteScheduler(db, conclude=lambda group_id, scam_message_id: gmh.conclude_voting(CallbackContext(application), group_id, db, scam_message_id), owns=owns)
+    application.bot_data['ephemeral_messages'] = EphemeralMessageManager(db, owns=owns)
+    if is_primary:
+        application.bot_data['record_sweeper'] = RecordSweeper(db, interval=CONFIG.RECORD_SWEEP_INTERVAL)
+    application.bot_data['captcha_pool'] = CaptchaPool(size_num=verification.CAPTCHA_SIZE_NUM,
+                                                       difficulty=verification.CAPTCHA_DIFFICULTY,
+                                                       low_watermark=CONFIG.CAPTCHA_POOL_LOW_WATERMARK,
+                                                       high_watermark=CONFIG.CAPTCHA_POOL_HIGH_WATERMARK,
+                                                       workers=CONFIG.CAPTCHA_POOL_WORKERS)
+    if CONFIG.CAPTCHA_STORAGE_CHAT_ID:
+        # every shard serves the corpus, only shard 0 uploads & rotates it
+        application.bot_data['captcha_corpus'] = CaptchaCorpus(db, application.bot_data['captcha_pool'],
+                                                               storage_chat_id=int(CONFIG.CAPTCHA_STORAGE_CHAT_ID),
+                                                               size=CONFIG.CAPTCHA_CORPUS_SIZE,
+                                                               rotation_interval=CONFIG.CAPTCHA_CORPUS_ROTATION_INTERVAL,
+                                                               rotation_batch=CONFIG.CAPTCHA_CORPUS_ROTATION_BATCH,
+                                                               read_only=not is_primary,
+                                                               refresh_interval=CONFIG.CAPTCHA_CORPUS_REFRESH_INTERVAL)
+    application.bot_data['answer_cache'] = AnswerCache(maxsize=CONFIG.ANSWER_CACHE_SIZE,
+                                                       ttl=CONFIG.ANSWER_CACHE_TTL,
+                                                       embed=oai_utils.get_support_assistant(CONFIG.OPENAI_GUARDY_ASSISTANT_ID, CONFIG.OPENAI_GUARDY_ASSISTANT_API_KEY).embed if CONFIG.ANSWER_CACHE_SEMANTIC else None,
+                                                       similarity_threshold=CONFIG.ANSWER_CACHE_SIMILARITY)
+    application.bot_data['spam_prefilter'] = SpamPreFilter()
+    application.bot_data['spam_inference'] = SpamInferenceService(workers=CONFIG.SPAM_INFERENCE_WORKERS,
+                                                                  max_queue_size=CONFIG.SPAM_INFERENCE_QUEUE_SIZE,
+                                                                  timeout=CONFIG.SPAM_INFERENCE_TIMEOUT,
+                                                                  max_batch_size=CONFIG.SPAM_BATCH_MAX_SIZE,
+                                                                  max_batch_wait_ms=CONFIG.SPAM_BATCH_MAX_WAIT_MS,
+                                                                  verdict_cache=verdict_cache,
+                                                                  model_backend=CONFIG.SPAM_MODEL_BACKEND,
+                                                                  onnx_dir=CONFIG.SPAM_MODEL_ONNX_DIR,
+                                                                  group_weights=config.premium_groups.get('premium_group_weights') or {},
+                                                                  max_pending_per_group=CONFIG.SPAM_INFERENCE_GROUP_QUEUE_SIZE)
+    application.bot_data['overload_control'] = OverloadController(application.bot_data['spam_inference'],
+                                                                  degrade_depth=CONFIG.SPAM_OVERLOAD_DEGRADE_DEPTH,
+                                                                  degrade_age=CONFIG.SPAM_OVERLOAD_DEGRADE_AGE,
+                                                                  shed_depth=CONFIG.SPAM_OVERLOAD_SHED_DEPTH,
+                                                                  shed_age=CONFIG.SPAM_OVERLOAD_SHED_AGE,
+                                                                  sample_rate=CONFIG.SPAM_OVERLOAD_SAMPLE_RATE)
+
+    # service stats, logged periodically and served on the webhook's /health
+    application.bot_data['stats_reporter'] = StatsReporter({
+        'overload_control': application.bot_data['overload_control'].stats,
+        'spam_inference': application.bot_data['spam_inference'].stats,
+        'captcha_pool': application.bot_data['captcha_pool'].stats,
+        'update_lanes': update_processor.stats,
+    }, interval=CONFIG.STATS_LOG_INTERVAL)
+    if 'captcha_corpus' in application.bot_data:
+        application.bot_data['stats_reporter'].add('captcha_corpus', application.bot_data['captcha_corpus'].stats)
 
     # core functionality 1
     application.add_handler(MessageHandler(filters.ChatType.GROUPS & filters.Entity("url"), lambda update, context: utils.remove_url_message(update, context, db)))
@@ -200,7 +298,7 @@ def main() -> None:
     application.add_handler(CommandHandler("help", commands.help_command))
     application.add_handler(CommandHandler("setup", commands.setup_command))
     application.add_handler(CommandHandler("examples", commands.examples_command))
-    application.add_handler(CommandHandler("verify", verify_user_command))
+    application.add_handler(CommandHandler("verify", lambda update, context: verification.verify_user_command(update, context, db)))
     application.add_handler(CommandHandler('features', commands.features_command))
     application.add_handler(CommandHandler('adminlist', commands.admin_list_command))
 
@@ -209,14 +307,36 @@ def main() -> None:
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, handle_new_members))
     application.add_handler(MessageHandler(filters.StatusUpdate.LEFT_CHAT_MEMBER, handle_left_members))
     application.add_handler(ChatMemberHandler(lambda update, context: l_members.handle_left_guardy(update, context, db), ChatMemberHandler.MY_CHAT_MEMBER))
+    application.add_handler(ChatMemberHandler(utils.track_admin_changes, ChatMemberHandler.ANY_CHAT_MEMBER), group=1)
 
 
     # verification
     application.add_handler(MessageHandler(filters.StatusUpdate.WEB_APP_DATA, verification.web_app_data)) # web app
     application.add_handler(CallbackQueryHandler(unified_callback_handler))
 
-    # other
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    return application
+
+
+def main() -> None:
+
+    # sharded: an ingress process routes updates to worker processes by chat_id
+    if CONFIG.GUARDY_WORKERS > 1:
+        if CONFIG.GUARDY_UPDATE_MODE == 'webhook':
+            raise ValueError("GUARDY_WORKERS > 1 fetches updates by polling, use GUARDY_UPDATE_MODE=polling or GUARDY_WORKERS=1")
+        asyncio.run(ShardedIngress(CONFIG.GUARDY_BOT_API_KEY, workers=CONFIG.GUARDY_WORKERS).run())
+        return
+
+    application = build_application()
+    if CONFIG.GUARDY_UPDATE_MODE == 'webhook':
+        webhook_server = WebhookServer(application,
+                                       webhook_url=CONFIG.GUARDY_WEBHOOK_URL,
+                                       secret_token=CONFIG.GUARDY_WEBHOOK_SECRET,
+                                       port=CONFIG.GUARDY_WEBHOOK_PORT,
+                                       path=CONFIG.GUARDY_WEBHOOK_PATH,
+                                       max_connections=CONFIG.GUARDY_WEBHOOK_MAX_CONNECTIONS)
+        asyncio.run(webhook_server.run())
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+from telegram import ChatMember
+import asyncio
+import logging
+from database.cache import TTLCache
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = (ChatMember.ADMINISTRATOR, ChatMember.OWNER)
+
+
+# per-chat admin roster
+class AdminRosterCache:
+    """
+    in-memory admin roster per chat.
+
+    each roster is filled with a single get_chat_administrators call and kept fresh from
+    chat member updates (see apply_update). the ttl is a fallback for updates telegram does not deliver.
+
+    usage:
+    roster = AdminRosterCache(ttl=600)
+    if await roster.is_admin(context.bot, chat_id, user_id):
+        ...
+    """
+
+    def __init__(self, ttl: float = 600, max_chats: int = 50000):
+        self.rosters = TTLCache(maxsize=max_chats, ttl=ttl)
+        self.fetches = 0
+        self._pending = {}
+
+    async def get_admins(self, bot, chat_id: int):
+        """
+        returns a dict {user_id: ChatMember} with all admins of the chat.
+        concurrent callers for the same chat share one get_chat_administrators request.
+        """
+        found, admins = self.rosters.get(chat_id)
+        if found:
+            return admins
+
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(bot, chat_id))
+            self._pending[chat_id] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(chat_id, None))
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, bot, chat_id: int):
+        self.fetches += 1
+        members = await bot.get_chat_administrators(chat_id)
+        admins = {member.user.id: member for member in members}
+        self.rosters.set(chat_id, admins)
+        return admins
+
+    async def is_admin(self, bot, chat_id: int, user_id: int):
+        admins = await self.get_admins(bot, chat_id)
+        member = admins.get(user_id)
+        return member is not None and member.status in ADMIN_STATUSES
+
+    def apply_update(self, chat_member_updated):
+        """
+        apply a ChatMemberUpdated (chat_member / my_chat_member) to the cached roster of the chat.
+        chats without a cached roster are left alone, they are fetched on the next lookup.
+        """
+        chat_id = chat_member_updated.chat.id
+        new_member = chat_member_updated.new_chat_member
+        found, admins = self.rosters.peek(chat_id)
+        if not found:
+            return
+
+        if new_member.status in ADMIN_STATUSES:
+            admins[new_member.user.id] = new_member
+        else:
+            admins.pop(new_member.user.id, None)
+
+    def invalidate(self, chat_id: int):
+        self.rosters.invalidate(chat_id)
+
+    def stats(self):
+        stats = self.rosters.stats()
+        stats["fetches"] = self.fetches
+        return stats
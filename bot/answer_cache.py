@@ -0,0 +1,142 @@
+import logging
+import numpy as np
+from database.cache import TTLCache
+from scam_algo_src.verdict_cache import normalize_text
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _GroupQuestionIndex:
+    """
+    unit-length embeddings of the cached questions of one group, searched with a single matrix-vector product.
+    """
+    __slots__ = ("questions", "vectors")
+
+    def __init__(self, dimensions: int):
+        self.questions = []
+        self.vectors = np.empty((0, dimensions), dtype=np.float32)
+
+    def add(self, question: str, vector: np.ndarray, max_questions: int):
+        if question in self.questions:
+            return
+        self.questions.append(question)
+        self.vectors = np.vstack([self.vectors, vector])[-max_questions:]
+        self.questions = self.questions[-max_questions:]
+
+    def keep(self, is_cached):
+        # drop questions whose answers expired or were evicted
+        rows = [i for i, question in enumerate(self.questions) if is_cached(question)]
+        if len(rows) != len(self.questions):
+            self.questions = [self.questions[i] for i in rows]
+            self.vectors = self.vectors[rows]
+
+    def search(self, vector: np.ndarray):
+        """
+        returns:
+        - list: (similarity, question) of the cached questions, most similar first.
+        """
+        if not self.questions:
+            return []
+        similarities = self.vectors @ vector
+        order = np.argsort(similarities)[::-1]
+        return [(float(similarities[i]), self.questions[i]) for i in order]
+
+
+class AnswerCache:
+    """
+    cache of premium assistant answers per group, keyed by the normalized question.
+
+    with an `embed` function, a question missing from the cache is also matched against the cached questions
+    of the group by cosine similarity, so rephrased repeat questions skip the assistant run as well.
+
+    parameters:
+    - maxsize (int): max. number of cached answers (all groups).
+    - ttl (float): seconds an answer stays valid.
+    - embed (coroutine function, optional): `await embed(text)` returns the embedding of a text.
+    - similarity_threshold (float): min. cosine similarity of a semantic match.
+    - max_questions_per_group (int): max. number of questions searched per group.
+
+    usage:
+    answer_cache = AnswerCache(maxsize=2000, ttl=86400)
+    answer = await answer_cache.get(group_id, "How do I set up Guardy?")
+    await answer_cache.set(group_id, "How do I set up Guardy?", answer)
+    """
+
+    def __init__(self, maxsize: int = 2000, ttl: float = 86400, embed=None, similarity_threshold: float = 0.92, max_questions_per_group: int = 500):
+        self.answers = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.max_questions_per_group = max_questions_per_group
+        self.semantic_hits = 0
+        self.embedding_failures = 0
+        self._embeddings = TTLCache(maxsize=1000, ttl=ttl)
+        self._indexes = {}
+
+    async def get(self, group_id: int, question: str):
+        """
+        returns:
+        - str: the cached answer, or none on a miss.
+        """
+        normalized = normalize_text(question)
+        found, answer = self.answers.get((group_id, normalized))
+        if found:
+            return answer
+
+        index = self._indexes.get(group_id)
+        if self.embed is None or index is None:
+            return None
+        vector = await self._embedding(normalized)
+        if vector is None:
+            return None
+        for similarity, cached_question in index.search(vector):
+            if similarity < self.similarity_threshold:
+                break
+            found, answer = self.answers.peek((group_id, cached_question))
+            if found:
+                self.semantic_hits += 1
+                logger.debug(f"Answer cache semantic match ({similarity:.3f}): {normalized!r} -> {cached_question!r}")
+                return answer
+        return None
+
+    async def set(self, group_id: int, question: str, answer: str):
+        normalized = normalize_text(question)
+        self.answers.set((group_id, normalized), answer)
+        if self.embed is None:
+            return
+        vector = await self._embedding(normalized)
+        if vector is None:
+            return
+        index = self._indexes.get(group_id)
+        if index is None:
+            index = self._indexes[group_id] = _GroupQuestionIndex(len(vector))
+        index.keep(lambda cached_question: (group_id, cached_question) in self.answers)
+        index.add(normalized, vector, self.max_questions_per_group)
+
+    async def _embedding(self, normalized: str):
+        found, vector = self._embeddings.peek(normalized)
+        if found:
+            return vector
+        try:
+            vector = np.asarray(await self.embed(normalized), dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        except Exception as e:
+            self.embedding_failures += 1
+            logger.error(f"Failed to embed question: {e}")
+            return None
+        self._embeddings.set(normalized, vector)
+        return vector
+
+    def stats(self):
+        lookups = self.answers.hits + self.answers.misses
+        saved_runs = self.answers.hits + self.semantic_hits
+        return {
+            "size": len(self.answers),
+            "lookups": lookups,
+            "exact_hits": self.answers.hits,
+            "semantic_hits": self.semantic_hits,
+            "saved_runs": saved_runs,
+            "hit_rate": saved_runs / lookups if lookups else 0.0,
+            "embedding_failures": self.embedding_failures,
+        }
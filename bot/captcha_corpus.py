@@ -0,0 +1,161 @@
+from collections import deque
+import asyncio
+import logging
+import random
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CaptchaCorpus:
+    """
+    rotating corpus of CAPTCHA images uploaded once to a private storage chat and sent by file_id afterwards,
+    so verifications never upload image bytes on the hot path.
+
+    the corpus (file_id, answer, upload message) lives in the CaptchaCorpus collection and is restored on start.
+    every `rotation_interval` seconds the `rotation_batch` oldest images are replaced with fresh ones from the
+    CaptchaPool, so the corpus keeps changing without bursts of uploads. in sharded mode only one worker uploads &
+    rotates, the others run read-only and reload the corpus from the database every `refresh_interval` seconds.
+
+    parameters:
+    - db (MongoDBManager): database manager.
+    - captcha_pool (CaptchaPool): source of new CAPTCHA images.
+    - storage_chat_id (int): private chat/channel the images are uploaded to.
+    - size (int): number of images in the corpus.
+    - rotation_interval (float): seconds between two rotations.
+    - rotation_batch (int): images replaced per rotation.
+    - upload_interval (float): seconds between two uploads (keeps clear of telegram's per-chat limits).
+    - read_only (bool): only serve the corpus another worker maintains, never upload or retire images.
+    - refresh_interval (float): seconds between two reloads of a read-only corpus.
+
+    usage:
+    captcha_corpus = CaptchaCorpus(db, captcha_pool, storage_chat_id=-100123)
+    await captcha_corpus.start(application.bot)
+    file_id, answer = captcha_corpus.pick()
+    """
+
+    def __init__(self, db, captcha_pool, storage_chat_id: int, size: int = 200, rotation_interval: float = 3600, rotation_batch: int = 20, upload_interval: float = 3, read_only: bool = False, refresh_interval: float = 300):
+        self.db = db
+        self.captcha_pool = captcha_pool
+        self.storage_chat_id = storage_chat_id
+        self.size = size
+        self.rotation_interval = rotation_interval
+        self.rotation_batch = rotation_batch
+        self.upload_interval = upload_interval
+        self.read_only = read_only
+        self.refresh_interval = refresh_interval
+        self.served = 0
+        self.empty = 0
+        self.uploaded = 0
+        self.retired = 0
+        self.upload_failures = 0
+        self.refreshes = 0
+        self._captchas = deque()
+        self._bot = None
+        self._loop_task = None
+
+    def __len__(self):
+        return len(self._captchas)
+
+    async def start(self, bot):
+        """
+        restore the corpus from the database and start filling/rotating it in the background.
+        """
+        if self._loop_task is not None:
+            return
+        self._bot = bot
+        await self._load()
+        logger.info(f"Restored {len(self._captchas)} CAPTCHAs of the corpus" + (" (read-only)" if self.read_only else ""))
+        self._loop_task = asyncio.create_task(self._refresh() if self.read_only else self._run())
+
+    async def _load(self):
+        corpus = await self.db.get_captcha_corpus()
+        if corpus or not self.read_only:
+            self._captchas = deque((item["file_id"], item["answer"], item.get("message_id")) for item in corpus)
+
+    def pick(self):
+        """
+        returns:
+        - tuple: (file_id, answer) of a random corpus image, or none while the corpus is empty.
+        """
+        if not self._captchas:
+            self.empty += 1
+            return None
+        self.served += 1
+        file_id, answer, _ = random.choice(self._captchas)
+        return file_id, answer
+
+    async def _run(self):
+        while True:
+            try:
+                await self._fill_up()
+                await asyncio.sleep(self.rotation_interval)
+                await self._retire(min(self.rotation_batch, len(self._captchas)))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in CAPTCHA corpus loop: {e}")
+                await asyncio.sleep(self.upload_interval)
+
+    async def _refresh(self):
+        # read-only: follow the uploads & rotations of the maintaining worker, keep the last corpus if the load fails
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self._load()
+                self.refreshes += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing CAPTCHA corpus: {e}")
+
+    async def _fill_up(self):
+        while len(self._captchas) < self.size:
+            png_bytes, answer = await self.captcha_pool.pop()
+            if png_bytes is None:
+                raise RuntimeError("CAPTCHA pool returned no image")
+            try:
+                message = await self._bot.send_photo(self.storage_chat_id, photo=png_bytes, disable_notification=True)
+            except Exception as e:
+                self.upload_failures += 1
+                logger.error(f"Failed to upload CAPTCHA to storage chat {self.storage_chat_id}: {e}")
+                await asyncio.sleep(self.upload_interval * 10)
+                continue
+            file_id = message.photo[-1].file_id  # largest size
+            await self.db.add_captcha_to_corpus(file_id, answer, message.message_id)
+            self._captchas.append((file_id, answer, message.message_id))
+            self.uploaded += 1
+            await asyncio.sleep(self.upload_interval)
+
+    async def _retire(self, count: int):
+        # the oldest images make room for fresh uploads
+        retired = [self._captchas.popleft() for _ in range(count)]
+        if not retired:
+            return
+        await self.db.remove_captchas_from_corpus([file_id for file_id, _, _ in retired])
+        message_ids = [message_id for _, _, message_id in retired if message_id is not None]
+        if message_ids:
+            try:
+                await self._bot.delete_messages(self.storage_chat_id, message_ids)
+            except Exception as e:
+                logger.error(f"Failed to delete retired CAPTCHAs from storage chat: {e}")
+        self.retired += len(retired)
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+    def stats(self):
+        return {
+            "size": len(self._captchas),
+            "served": self.served,
+            "empty": self.empty,
+            "uploaded": self.uploaded,
+            "retired": self.retired,
+            "upload_failures": self.upload_failures,
+            "read_only": self.read_only,
+            "refreshes": self.refreshes,
+        }
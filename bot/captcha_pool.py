@@ -0,0 +1,170 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import multiprocessing
+import asyncio
+import logging
+import time
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def render_captcha(size_num: int, difficulty: int):
+    """
+    render a math CAPTCHA and PNG-encode it.
+
+    returns:
+    - tuple: (png_bytes, answer)
+    """
+    from multicolorcaptcha import CaptchaGenerator
+    generator = CaptchaGenerator(size_num)
+    math_captcha = generator.gen_math_captcha_image(difficult_level=difficulty)
+    image_bytes = BytesIO()
+    math_captcha.image.save(image_bytes, format='PNG')
+    return image_bytes.getvalue(), math_captcha.equation_result
+
+
+def _render_captcha_batch(count: int, size_num: int, difficulty: int):
+    """
+    worker side: render `count` CAPTCHAs and measure how long each took.
+
+    returns:
+    - list: [(png_bytes, answer, seconds), ...]
+    """
+    captchas = []
+    for _ in range(count):
+        start_time = time.perf_counter()
+        png_bytes, answer = render_captcha(size_num, difficulty)
+        captchas.append((png_bytes, answer, time.perf_counter() - start_time))
+    return captchas
+
+
+class CaptchaPool:
+    """
+    bounded pool of ready-made (png_bytes, answer) CAPTCHAs so /verify and "Regenerate" never render on the event loop.
+
+    a process pool worker refills the pool up to `high_watermark` whenever it drops below `low_watermark`.
+    if a raid drains the pool completely, the CAPTCHA is rendered on demand by a separate worker, so a /verify
+    never waits behind refill batches. while the pool is empty, refills render one CAPTCHA per call so fresh
+    ones reach the pool right away.
+
+    parameters:
+    - size_num (int): multicolorcaptcha image size number.
+    - difficulty (int): math CAPTCHA difficulty level.
+    - low_watermark (int): refill once fewer CAPTCHAs are left.
+    - high_watermark (int): max. number of CAPTCHAs kept ready.
+    - workers (int): number of worker processes rendering CAPTCHAs.
+    - refill_batch_size (int): CAPTCHAs rendered per worker call.
+    - on_demand_workers (int): worker processes reserved for CAPTCHAs requested while the pool is empty.
+
+    usage:
+    captcha_pool = CaptchaPool(size_num=2, difficulty=2)
+    captcha_pool.start()
+    png_bytes, answer = await captcha_pool.pop()
+    """
+
+    def __init__(self, size_num: int, difficulty: int, low_watermark: int = 20, high_watermark: int = 100, workers: int = 1, refill_batch_size: int = 10, on_demand_workers: int = 1):
+        self.size_num = size_num
+        self.difficulty = difficulty
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.workers = workers
+        self.refill_batch_size = refill_batch_size
+        self.on_demand_workers = on_demand_workers
+        self.generated = 0
+        self.served = 0
+        self.empty = 0
+        self.on_demand_renders = 0
+        self.failures = 0
+        self.generation_seconds = 0.0
+        self.last_generation_seconds = None
+        self._captchas = deque()
+        self._executor = None
+        self._on_demand_executor = None
+        self._refill_task = None
+
+    def __len__(self):
+        return len(self._captchas)
+
+    def start(self):
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._on_demand_executor = ProcessPoolExecutor(max_workers=self.on_demand_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._refill()
+        logger.info(f"CAPTCHA pool started with {self.workers} worker(s)")
+
+    async def pop(self):
+        """
+        take a CAPTCHA from the pool, rendering one in the worker pool if the pool is empty.
+
+        returns:
+        - tuple: (png_bytes, answer), or (none, none) if rendering failed.
+        """
+        self.start()
+        if len(self._captchas) <= self.low_watermark:
+            self._refill()
+        if self._captchas:
+            self.served += 1
+            return self._captchas.popleft()
+
+        self.empty += 1
+        try:
+            captchas = await self._render(1, self._on_demand_executor)
+            self.served += 1
+            self.on_demand_renders += 1
+            return captchas[0]
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Failed to generate CAPTCHA: {e}")
+            return None, None
+
+    def _refill(self):
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._fill_up())
+
+    async def _fill_up(self):
+        try:
+            while len(self._captchas) < self.high_watermark:
+                missing = self.high_watermark - len(self._captchas)
+                batch_size = self.refill_batch_size if self._captchas else 1  # drained: hand out each one as soon as it's ready
+                count = min(batch_size, -(-missing // self.workers))
+                for captchas in await asyncio.gather(*[self._render(count, self._executor) for _ in range(self.workers)]):
+                    self._captchas.extend(captchas)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Failed to refill CAPTCHA pool: {e}")
+
+    async def _render(self, count: int, executor):
+        loop = asyncio.get_running_loop()
+        captchas = await loop.run_in_executor(executor, _render_captcha_batch, count, self.size_num, self.difficulty)
+        for _, _, seconds in captchas:
+            self.generation_seconds += seconds
+            self.last_generation_seconds = seconds
+        self.generated += len(captchas)
+        return [(png_bytes, answer) for png_bytes, answer, _ in captchas]
+
+    async def shutdown(self):
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.gather(self._refill_task, return_exceptions=True)
+            self._refill_task = None
+        for executor in (self._executor, self._on_demand_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._on_demand_executor = None
+
+    def stats(self):
+        return {
+            "depth": len(self._captchas),
+            "generated": self.generated,
+            "served": self.served,
+            "empty": self.empty,
+            "on_demand_renders": self.on_demand_renders,
+            "failures": self.failures,
+            "avg_generation_ms": self.generation_seconds / self.generated * 1000 if self.generated else None,
+            "last_generation_ms": self.last_generation_seconds * 1000 if self.last_generation_seconds is not None else None,
+        }
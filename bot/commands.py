@@ -2,7 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 import bot.resource_utils as utils
-from app import verify_user_command
+import bot.verification as verification
 import bot.config as config
 import logging
 
@@ -43,19 +43,18 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE, db):
         if await utils.is_bot_admin(update, context, chat_id, display_warning=True):
             return
         
-        # check if the user is in db: Works in all cases
+        # add the user to the db if not present yet (single upsert)
         user_id = update.message.from_user.id
-        user_exists = db.check_if_user_exists(user_id=user_id)
-        if not user_exists:
-            db.add_new_private_user(user_id=user_id,
-                                    username=update.message.from_user.username,
-                                    first_name=update.message.from_user.first_name,
-                                    last_name=update.message.from_user.last_name
-            )
+        await db.add_new_private_user(user_id=user_id,
+                                      username=update.message.from_user.username,
+                                      first_name=update.message.from_user.first_name,
+                                      last_name=update.message.from_user.last_name
+        )
         
         # if user comes from the group (display verification for the given group on /start)
-        if payload == "verify":
-            await verify_user_command(update, context)
+        is_verification, group_id = verification.parse_verification_start_payload(payload)
+        if is_verification:
+            await verification.verify_user_command(update, context, db, group_id=group_id)
         
         # classic /start
         else:
@@ -175,7 +174,7 @@ async def show_config_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             return
         if not await utils.is_user_admin(update, context, chat_id, user_id, True):
             return
-        group_config = db.get_admin_config(group_id=chat_id)
+        group_config = await db.get_admin_config(group_id=chat_id)
         if group_config:
             config_message = (
                 "🔧 <b>Group Configuration</b>\n\n"
@@ -294,7 +293,7 @@ async def disable_guardy_command(update: Update, context: ContextTypes.DEFAULT_T
             return
         if not await utils.is_user_admin(update, context, chat_id, user_id, True):
             return
-        group_config = db.get_admin_config(group_id=chat_id)
+        group_config = await db.get_admin_config(group_id=chat_id)
         if group_config:
             disable_message = (
                 "🚫 <b>Confirm Disable Guardy</b>\n\n"
@@ -327,7 +326,7 @@ async def enable_guardy_command(update: Update, context: ContextTypes.DEFAULT_TY
             return
         if not await utils.is_user_admin(update, context, chat_id, user_id, True):
             return
-        group_config = db.get_admin_config(group_id=chat_id)
+        group_config = await db.get_admin_config(group_id=chat_id)
         if group_config:
             enable_message = (
                 "✅ <b>Confirm Enable Guardy</b>\n\n"
@@ -355,8 +354,8 @@ async def admin_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     try:
         if not await utils.is_group_or_supergroup(update, context, chat_id, True):
             return
-        admins = await context.bot.get_chat_administrators(chat_id)
-        admin_usernames = [f"- @{admin.user.username}" for admin in admins if admin.user.username]
+        admins = await context.bot_data['admin_roster'].get_admins(context.bot, chat_id)
+        admin_usernames = [f"- @{admin.user.username}" for admin in admins.values() if admin.user.username]
         admins_list_str = "\n".join(admin_usernames)
         config_message = (
             f"🧑‍💻 <b>Group Admins in {update.effective_chat.title}</b>\n\n"
@@ -377,7 +376,7 @@ async def rules_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE,
         if not await utils.is_group_or_supergroup(update, context, chat_id, True):
             return
         SETTINGS_MAPPING = config.group_settings_mapping['settings_descriptions']
-        group_config = db.get_admin_config(group_id=chat_id)
+        group_config = await db.get_admin_config(group_id=chat_id)
 
         if group_config['guardy_status'] == "enabled":
             rules_messages = [f"⚖️ <b>{chat_title} Chat Rules</b>\n\n"]
@@ -30,6 +30,57 @@ group_settings_mapping = read_yaml(CONFIG_PATHS["group_settings_desc"])
 class Config:
     """Base configuration class with default settings."""
     ENVIRONMENT = os.getenv('ENVIRONMENT', 'prod')
+    GROUP_CONFIG_CACHE_SIZE = int(os.getenv('GROUP_CONFIG_CACHE_SIZE', 10000))
+    GROUP_CONFIG_CACHE_TTL = int(os.getenv('GROUP_CONFIG_CACHE_TTL', 300))  # seconds
+    ADMIN_ROSTER_TTL = int(os.getenv('ADMIN_ROSTER_TTL', 600))  # seconds
+    SPAM_INFERENCE_WORKERS = int(os.getenv('SPAM_INFERENCE_WORKERS', 1))
+    SPAM_INFERENCE_QUEUE_SIZE = int(os.getenv('SPAM_INFERENCE_QUEUE_SIZE', 256))
+    SPAM_INFERENCE_TIMEOUT = float(os.getenv('SPAM_INFERENCE_TIMEOUT', 10))  # seconds
+    SPAM_MODEL_BACKEND = os.getenv('SPAM_MODEL_BACKEND', 'pytorch')  # pytorch | quantized | onnx
+    SPAM_MODEL_ONNX_DIR = os.getenv('SPAM_MODEL_ONNX_DIR', 'models/otis-onnx')  # onnx export, created on first start
+    SPAM_MODEL_PRELOAD = os.getenv('SPAM_MODEL_PRELOAD', 'yes') == 'yes'  # warm up at startup instead of on first use
+    SPAM_BATCH_MAX_SIZE = int(os.getenv('SPAM_BATCH_MAX_SIZE', 16))
+    SPAM_BATCH_MAX_WAIT_MS = float(os.getenv('SPAM_BATCH_MAX_WAIT_MS', 10))
+    SPAM_INFERENCE_GROUP_QUEUE_SIZE = int(os.getenv('SPAM_INFERENCE_GROUP_QUEUE_SIZE', 128))  # pending texts per group
+    SPAM_VERDICT_CACHE_SIZE = int(os.getenv('SPAM_VERDICT_CACHE_SIZE', 50000))
+    SPAM_VERDICT_CACHE_TTL = int(os.getenv('SPAM_VERDICT_CACHE_TTL', 21600))  # seconds
+    SPAM_VERDICT_CACHE_SHARED = os.getenv('SPAM_VERDICT_CACHE_SHARED', 'no') == 'yes'  # share verdicts via mongodb
+    SPAM_OVERLOAD_DEGRADE_DEPTH = int(os.getenv('SPAM_OVERLOAD_DEGRADE_DEPTH', 32))  # pending texts of the group: skip low-risk messages
+    SPAM_OVERLOAD_DEGRADE_AGE = float(os.getenv('SPAM_OVERLOAD_DEGRADE_AGE', 2))  # seconds the oldest text of the group waited
+    SPAM_OVERLOAD_SHED_DEPTH = int(os.getenv('SPAM_OVERLOAD_SHED_DEPTH', 96))  # pending texts of the group: heuristic scoring & sampling
+    SPAM_OVERLOAD_SHED_AGE = float(os.getenv('SPAM_OVERLOAD_SHED_AGE', 5))  # seconds the oldest text of the group waited
+    SPAM_OVERLOAD_SAMPLE_RATE = float(os.getenv('SPAM_OVERLOAD_SAMPLE_RATE', 0.1))  # share still sent to the model while shedding
+    STATS_LOG_INTERVAL = int(os.getenv('STATS_LOG_INTERVAL', 300))  # seconds between two service stats log lines, 0 disables
+    MONGO_VERIFY_QUERY_PLANS = os.getenv('MONGO_VERIFY_QUERY_PLANS', 'no') == 'yes'  # log queries running a collection scan
+    MONGO_COUNT_ROUND_TRIPS = os.getenv('MONGO_COUNT_ROUND_TRIPS', 'no') == 'yes'  # count commands sent to mongodb
+    VERIFICATION_RETENTION = int(os.getenv('VERIFICATION_RETENTION', 86400))  # seconds, unfinished verifications
+    SCAM_VOTING_RETENTION = int(os.getenv('SCAM_VOTING_RETENTION', 3600))  # seconds after the voting deadline
+    RECORD_SWEEP_INTERVAL = int(os.getenv('RECORD_SWEEP_INTERVAL', 3600))  # seconds
+    CAPTCHA_POOL_LOW_WATERMARK = int(os.getenv('CAPTCHA_POOL_LOW_WATERMARK', 20))
+    CAPTCHA_POOL_HIGH_WATERMARK = int(os.getenv('CAPTCHA_POOL_HIGH_WATERMARK', 100))
+    CAPTCHA_POOL_WORKERS = int(os.getenv('CAPTCHA_POOL_WORKERS', 1))
+    CAPTCHA_STORAGE_CHAT_ID = os.getenv('CAPTCHA_STORAGE_CHAT_ID')  # private chat for the uploaded CAPTCHA corpus, unset disables it
+    CAPTCHA_CORPUS_SIZE = int(os.getenv('CAPTCHA_CORPUS_SIZE', 200))
+    CAPTCHA_CORPUS_ROTATION_INTERVAL = int(os.getenv('CAPTCHA_CORPUS_ROTATION_INTERVAL', 3600))  # seconds
+    CAPTCHA_CORPUS_ROTATION_BATCH = int(os.getenv('CAPTCHA_CORPUS_ROTATION_BATCH', 20))
+    CAPTCHA_CORPUS_REFRESH_INTERVAL = int(os.getenv('CAPTCHA_CORPUS_REFRESH_INTERVAL', 300))  # seconds, shards other than 0 reload the corpus shard 0 maintains
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # e.g. a local stub server, unset uses api.openai.com
+    ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', 2000))
+    ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', 86400))  # seconds
+    ANSWER_CACHE_SEMANTIC = os.getenv('ANSWER_CACHE_SEMANTIC', 'no') == 'yes'  # match rephrased questions by embedding similarity
+    ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', 0.92))
+    GUARDY_UPDATE_MODE = os.getenv('GUARDY_UPDATE_MODE', 'polling')  # polling | webhook
+    GUARDY_WORKERS = int(os.getenv('GUARDY_WORKERS', 1))  # > 1 shards the chats across worker processes (polling ingress)
+    UPDATE_MAX_CONCURRENT = int(os.getenv('UPDATE_MAX_CONCURRENT', 128))  # updates processed at the same time (all lanes)
+    UPDATE_LANE_INTERACTIVE = int(os.getenv('UPDATE_LANE_INTERACTIVE', 64))  # callbacks, commands, joins & private chats
+    UPDATE_LANE_MODERATION = int(os.getenv('UPDATE_LANE_MODERATION', 32))  # link & forward removal
+    UPDATE_LANE_SCANNING = int(os.getenv('UPDATE_LANE_SCANNING', 32))  # antiflood & spam scanning
+    UPDATE_LANE_QA = int(os.getenv('UPDATE_LANE_QA', 8))  # premium assistant questions
+    GUARDY_WEBHOOK_URL = os.getenv('GUARDY_WEBHOOK_URL')  # public https url, e.g. https://guardy.example.com/telegram
+    GUARDY_WEBHOOK_SECRET = os.getenv('GUARDY_WEBHOOK_SECRET')  # 1-256 chars of A-Z, a-z, 0-9, _ and -
+    GUARDY_WEBHOOK_PORT = int(os.getenv('GUARDY_WEBHOOK_PORT', 8000))
+    GUARDY_WEBHOOK_PATH = os.getenv('GUARDY_WEBHOOK_PATH', '/telegram')
+    GUARDY_WEBHOOK_MAX_CONNECTIONS = int(os.getenv('GUARDY_WEBHOOK_MAX_CONNECTIONS', 100))
 
 class ProductionConfig(Config):
     """Production specific configuration."""
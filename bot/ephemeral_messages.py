@@ -0,0 +1,201 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from telegram.error import BadRequest
+import asyncio
+import heapq
+import logging
+import time
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGES_PER_REQUEST = 100  # bot api limit of deleteMessages
+
+
+class EphemeralMessageManager:
+    """
+    deletes short-lived bot messages (warnings, welcome, status & thanks messages) once they expire.
+
+    schedule() returns immediately. a single background loop groups the due messages per chat and removes
+    them with bulk deleteMessages requests. messages living longer than `persist_after` seconds are stored
+    in the PendingDeletions collection so they are still removed after a restart.
+
+    a failed request is retried up to `max_retries` times with exponential backoff (or after the flood wait
+    telegram asks for), the persisted records are only removed once the messages are gone. messages telegram
+    reports as not found are dropped right away, messages given up on stay persisted for the next start.
+
+    parameters:
+    - db (MongoDBManager, optional): enables persistence of pending deletions.
+    - batch_window (float): messages expiring within this many seconds are deleted together.
+    - persist_after (float): min. lifetime of a message before it is persisted.
+    - owns (callable, optional): `owns(chat_id)` filters the deletions restored on start (sharded mode).
+    - retry_delay (float): seconds before the first retry of a failed request, doubled per attempt.
+    - max_retries (int): retries of a message before it is left to the next start.
+
+    usage:
+    ephemeral_messages = EphemeralMessageManager(db)
+    await ephemeral_messages.start(application.bot)
+    ephemeral_messages.schedule(chat_id, message_id, expires_at)
+    """
+
+    def __init__(self, db=None, batch_window: float = 0.5, persist_after: float = 5, owns=None, retry_delay: float = 5, max_retries: int = 5):
+        self.db = db
+        self.owns = owns
+        self.batch_window = batch_window
+        self.persist_after = persist_after
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.deleted = 0
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.already_gone = 0
+        self.given_up = 0
+        self._attempts = {}  # (chat_id, message_id) -> failed requests so far
+        self._heap = []
+        self._unsaved = []
+        self._persisted = set()
+        self._wakeup = asyncio.Event()
+        self._bot = None
+        self._loop_task = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def start(self, bot):
+        """
+        restore pending deletions from the database and start the deletion loop.
+        """
+        if self._loop_task is not None:
+            return
+        self._bot = bot
+        if self.db is not None:
+            pending = await self.db.get_pending_deletions()
+            if self.owns is not None:
+                pending = [item for item in pending if self.owns(item["chat_id"])]
+            for item in pending:
+                expires_at = item["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+                heapq.heappush(self._heap, (expires_at, item["chat_id"], item["message_id"]))
+                self._persisted.add((item["chat_id"], item["message_id"]))
+            logger.info(f"Restored {len(pending)} pending message deletions")
+        self._loop_task = asyncio.create_task(self._run())
+
+    def schedule(self, chat_id: int, message_id: int, expires_at: datetime):
+        """
+        delete a message once `expires_at` is reached. returns immediately.
+        """
+        if message_id is None:
+            return
+        expires_ts = expires_at.timestamp()
+        if not self._heap or expires_ts < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (expires_ts, chat_id, message_id))
+        if self.db is not None and expires_ts - time.time() >= self.persist_after:
+            self._unsaved.append({"chat_id": chat_id, "message_id": message_id, "expires_at": expires_at})
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._persist_new()
+                self._wakeup.clear()
+                timeout = self._heap[0][0] - time.time() if self._heap else None
+                if timeout is None or timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                        continue  # schedule changed, recompute the next expiry
+                    except asyncio.TimeoutError:
+                        pass
+                await self._delete_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in ephemeral message loop: {e}")
+                await asyncio.sleep(1)
+
+    async def _persist_new(self):
+        if not self._unsaved:
+            return
+        unsaved, self._unsaved = self._unsaved, []
+        await self.db.add_pending_deletions(unsaved)
+        self._persisted.update((item["chat_id"], item["message_id"]) for item in unsaved)
+
+    async def _delete_due(self):
+        # collect everything expiring within the batch window, grouped per chat
+        due_by_chat = defaultdict(list)
+        horizon = time.time() + self.batch_window
+        while self._heap and self._heap[0][0] <= horizon:
+            _, chat_id, message_id = heapq.heappop(self._heap)
+            due_by_chat[chat_id].append(message_id)
+
+        for chat_id, message_ids in due_by_chat.items():
+            done = []
+            for i in range(0, len(message_ids), MAX_MESSAGES_PER_REQUEST):
+                chunk = message_ids[i:i + MAX_MESSAGES_PER_REQUEST]
+                try:
+                    self.requests += 1
+                    await self._bot.delete_messages(chat_id, chunk)
+                    self.deleted += len(chunk)
+                    done += chunk
+                except BadRequest as e:
+                    if "not found" not in str(e).lower():
+                        self._retry_later(chat_id, chunk, e)
+                        continue
+                    self.already_gone += len(chunk)
+                    done += chunk
+                except Exception as e:
+                    self._retry_later(chat_id, chunk, e)
+
+            for message_id in done:
+                self._attempts.pop((chat_id, message_id), None)
+            persisted = [message_id for message_id in done if (chat_id, message_id) in self._persisted]
+            if persisted:
+                self._persisted.difference_update((chat_id, message_id) for message_id in persisted)
+                await self.db.remove_pending_deletions(chat_id, persisted)
+
+    def _retry_later(self, chat_id: int, chunk: list, error: Exception):
+        self.failures += 1
+        retry_after = getattr(error, "retry_after", None)  # flood control
+        attempts = 1 + max(self._attempts.get((chat_id, message_id), 0) for message_id in chunk)
+        if retry_after is not None:
+            delay = retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+        else:
+            delay = self.retry_delay * 2 ** (attempts - 1)
+        if attempts > self.max_retries:
+            # the persisted records stay, the next start tries again
+            self.given_up += len(chunk)
+            for message_id in chunk:
+                self._attempts.pop((chat_id, message_id), None)
+                self._persisted.discard((chat_id, message_id))
+            logger.error(f"Giving up deleting {len(chunk)} messages in chat {chat_id} after {attempts} attempts: {error}")
+            return
+        self.retries += len(chunk)
+        retry_at = time.time() + delay
+        for message_id in chunk:
+            self._attempts[(chat_id, message_id)] = attempts
+            heapq.heappush(self._heap, (retry_at, chat_id, message_id))
+        logger.warning(f"Error deleting {len(chunk)} messages in chat {chat_id}, retrying in {delay:.0f}s: {error}")
+
+    async def stop(self):
+        """
+        stop the loop and persist the messages scheduled in the meantime. pending deletions are resumed on the next start.
+        """
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        if self.db is not None:
+            await self._persist_new()
+
+    def stats(self):
+        return {
+            "pending": len(self._heap),
+            "persisted": len(self._persisted),
+            "deleted": self.deleted,
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "already_gone": self.already_gone,
+            "given_up": self.given_up,
+        }
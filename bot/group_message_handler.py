@@ -1,10 +1,13 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ChatPermissions
 from telegram.constants import ParseMode, ReactionEmoji
 import bot.resource_utils as utils
-import asyncio
 import logging
-from scam_algo_src.otis_spam_model import analyze_message
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from scam_algo_src.prefilter import CLEARLY_HAM, CLEARLY_SPAM, heuristic_spam_probability
+from scam_algo_src.overload_control import SKIP, USE_HEURISTIC
+from scam_algo_src.inference_service import UNAVAILABLE
+
+VOTING_DURATION_SECONDS = 60
 
 # analyse group message
 async def analyse_group_msg_from_user(update, context, db, chat_id:int):
@@ -13,9 +16,30 @@ async def analyse_group_msg_from_user(update, context, db, chat_id:int):
         message_id = update.message.id
         chat_id = update.effective_chat.id
 
-        # calculate scam score
-        analysis_result = analyze_message(input_text=message)
-        
+        # cheap pre-filter: obvious chat skips the model, obvious scams skip it too
+        entity_types = [entity.type for entity in update.message.entities]
+        decision, probability, features = context.bot_data['spam_prefilter'].analyze(message, entity_types)
+        if decision == CLEARLY_HAM:
+            return
+        elif decision == CLEARLY_SPAM:
+            analysis_result = {"probability": probability, "label": "spam"}
+        else:
+            # under overload: skip low-risk messages, score the rest heuristically or sample them (see scam_algo_src/overload_control.py)
+            scan_decision = context.bot_data['overload_control'].decide(features, chat_id=chat_id)
+            if scan_decision == SKIP:
+                return
+            elif scan_decision == USE_HEURISTIC:
+                analysis_result = {"probability": heuristic_spam_probability(features), "label": "spam"}
+            else:
+                # calculate scam score (off the event loop, in the inference worker pool)
+                spam_inference = context.bot_data['spam_inference']
+                analysis_result = await spam_inference.classify(message, chat_id=chat_id)
+                if not analysis_result:
+                    return # model not ready yet, unavailable or overloaded
+                if analysis_result['label'] == UNAVAILABLE:
+                    # the worker died with this batch, the pool is being rebuilt
+                    analysis_result = {"probability": heuristic_spam_probability(features), "label": "spam"}
+
         if analysis_result['label'] == "spam" and analysis_result['probability'] > 0.6:
             keyboard = [
                 [InlineKeyboardButton("Yes", callback_data='msg_check_vote_scam_yes'),
@@ -28,12 +52,11 @@ async def analyse_group_msg_from_user(update, context, db, chat_id:int):
             alert_message = await update.message.reply_text(text=scam_alert_message, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
             await update.message.set_reaction(reaction=ReactionEmoji.EYES) # set reaction to potential scam message
 
-            # initialize in db
-            db.initialize_scam_voting(group_id=chat_id, scam_message_id=message_id, alert_message_id=alert_message.message_id)
+            # initialize in db, the vote scheduler concludes it after 1 minute
+            deadline = datetime.now(timezone.utc) + timedelta(seconds=VOTING_DURATION_SECONDS)
+            await db.initialize_scam_voting(group_id=chat_id, scam_message_id=message_id, alert_message_id=alert_message.message_id, deadline=deadline)
+            context.bot_data['vote_scheduler'].schedule(chat_id, message_id, deadline)
             logging.info(f"Scam message with {message_id} ID initialized in DB!")
-
-            await asyncio.sleep(60) # 1 minute
-            await conclude_voting(context, chat_id, db, message_id)
         else:
             return # break if not spam
     except Exception as e:
@@ -43,11 +66,11 @@ async def analyse_group_msg_from_user(update, context, db, chat_id:int):
 # conclude voting
 async def conclude_voting(context, chat_id, db, scam_message_id):
     try:
-        voting_record = db.delete_scam_voting(chat_id, scam_message_id)
-        alert_message_id = voting_record['alert_message_id']
+        voting_record = await db.delete_scam_voting(chat_id, scam_message_id)
         thanks_text = ""
 
         if voting_record:
+            alert_message_id = voting_record['alert_message_id']
             total_votes = voting_record['vote_scam_yes'] + voting_record['vote_scam_no']
 
             if total_votes > 0:
@@ -80,21 +103,22 @@ async def dispatch_group_msg_voting(query, update, db):
         chat_id = update.callback_query.message.chat.id
         scam_message_id = query.message.message_thread_id # get scam_message_id from thread
         
-        # check if user has voted or not
-        if db.check_if_user_voted(chat_id, scam_message_id, user_id):
+        if data not in ('msg_check_vote_scam_yes', 'msg_check_vote_scam_no'):
+            return
+
+        # add voter & count vote in one atomic update
+        outcome = await db.register_vote(chat_id, scam_message_id, user_id, vote_yes=data == 'msg_check_vote_scam_yes')
+        if outcome == db.VOTE_ALREADY_CAST:
             logging.info(f"USER {user_id} ALREADY VOTED!")
             await query.answer("You've already voted!", show_alert=True)
             return
-
-        db.add_voter(chat_id, scam_message_id, user_id)
+        if outcome == db.VOTE_CLOSED:
+            await query.answer("This voting is already closed.", show_alert=True)
+            return
+        if outcome == db.VOTE_FAILED:
+            await query.answer("Failed to process your vote.")
+            return
         logging.info(f"USER VOTED: {user_id}")
-        
-        # count vote Yes
-        if data == 'msg_check_vote_scam_yes':
-            db.update_scam_voting(chat_id, scam_message_id, vote_yes=True)
-        # count vote No
-        elif data == 'msg_check_vote_scam_no':
-            db.update_scam_voting(chat_id, scam_message_id, vote_yes=False)
     except Exception as e:
         logging.error(f"Error during dispatch of group message voting: {e}")
         await query.answer("Failed to process your vote.")
@@ -104,31 +128,17 @@ async def antiflood_checker(update, context, interval=10):
     try:
         user_id = update.effective_user.id
         group_id = update.effective_chat.id
-        now = datetime.now()
-
-        # initialize a placeholder in context for flood control, if doesn't exist
-        if 'flood_control' not in context.bot_data:
-            context.bot_data['flood_control'] = {}
-        user_key = f"{group_id}_{user_id}"
-
-        # add current message timestamp + update_id
-        if user_key not in context.bot_data['flood_control']:
-            context.bot_data['flood_control'][user_key] = [(now, update.update_id)]
-        else:
-            context.bot_data['flood_control'][user_key].append((now, update.update_id))
-            context.bot_data['flood_control'][user_key] = [
-                (timestamp, update_id) for timestamp, update_id in context.bot_data['flood_control'][user_key] 
-                if now - timestamp < timedelta(seconds=20)
-            ]
 
-            if len(context.bot_data['flood_control'][user_key]) > interval:
-                mute_duration = timedelta(minutes=5)
-                until_time = now + mute_duration
-                await context.bot.restrict_chat_member(group_id, user_id, permissions=ChatPermissions(can_send_messages=False), until_date=until_time.timestamp())
-                antiflood_warning_message = f"⛔ Stop flooding! ⛔\n\nTo prevent spamming chats with unnecessary information, group admins have set a limit of max. <b>{interval} messages every 20 seconds</b>!"
-                message = await context.bot.send_message(group_id, antiflood_warning_message, parse_mode=ParseMode.HTML)
-                await utils.delete_message_after(context, group_id, message.message_id, delay_seconds=30)
-                context.bot_data['flood_control'][user_key] = []
+        # per-user sliding window over the last 20 seconds (see bot/flood_control.py)
+        flood_control = context.bot_data['flood_control']
+        if flood_control.hit(group_id, user_id, limit=int(interval)):
+            mute_duration = timedelta(minutes=5)
+            until_time = datetime.now() + mute_duration
+            await context.bot.restrict_chat_member(group_id, user_id, permissions=ChatPermissions(can_send_messages=False), until_date=until_time.timestamp())
+            antiflood_warning_message = f"⛔ Stop flooding! ⛔\n\nTo prevent spamming chats with unnecessary information, group admins have set a limit of max. <b>{interval} messages every 20 seconds</b>!"
+            message = await context.bot.send_message(group_id, antiflood_warning_message, parse_mode=ParseMode.HTML)
+            flood_control.reset(group_id, user_id)
+            await utils.delete_message_after(context, group_id, message.message_id, delay_seconds=30)
     except Exception as e:
         logging.error(f"Error in antiflood_checker: {e}")
         await context.bot.send_message(group_id, "Failed to enforce anti-flood measures.")
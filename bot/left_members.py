@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import bot.resource_utils as utils
 
@@ -16,7 +17,7 @@ async def handle_left_guardy(update, context, db):
     # check if the Guardy has been removed from the group
     if new_status == 'left' or new_status == 'kicked':
         logger.info(f"GUARDY has been removed from the group with ID: {group_id}")
-        db.delete_group_data(group_id=group_id)
-        db.delete_admin_config(group_id=group_id)
+        # two collections, deleted concurrently
+        await asyncio.gather(db.delete_group_data(group_id=group_id), db.delete_admin_config(group_id=group_id))
 
     await utils.delete_service_message(update, context)
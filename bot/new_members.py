@@ -1,5 +1,6 @@
 import logging
 import bot.resource_utils as utils
+from bot.verification import verification_start_payload
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ChatPermissions
 from telegram.constants import ParseMode
 
@@ -12,7 +13,7 @@ async def handle_external_bots(member, update, context, db, chat_id):
     # check if the member is a bot and not the bot itself
     if member.is_bot and member.id != context.bot.id:
         try:
-            bot_removal = db.get_admin_config(group_id=chat_id).get('bot_removal', 'no')
+            bot_removal = (await db.get_admin_config(group_id=chat_id)).get('bot_removal', 'no')
             # if bot removal is enabled, kick the bot and send a warning message
             if bot_removal == "yes":
                 await context.bot.kick_chat_member(chat_id, member.id)
@@ -27,12 +28,12 @@ async def handle_bot_as_new_admin(member, update, context, db):
     if member.username == context.bot.username:
         try:
             group_id = update.effective_chat.id
-            group_exists = db.check_if_group_exists(group_id)
+            group_exists = await db.check_if_group_exists(group_id)
             # if the group doesn't exist in the db, add it
             if not group_exists:
                 chat = await context.bot.get_chat(group_id)
                 member_count = await chat.get_member_count()
-                db.add_new_public_group(
+                await db.add_new_public_group(
                     group_id=group_id,
                     added_by=update.effective_user.id,
                     member_count=member_count,
@@ -70,16 +71,14 @@ async def handle_new_group_member(member, update, context, group_id, group_confi
                     chat_id=group_id,
                     text=f"Welcome {username}! Please verify yourself!",
                     reply_markup=InlineKeyboardMarkup([
-                        [InlineKeyboardButton("Verify me", url=GUARDY_URL + "?start=verify")]
+                        [InlineKeyboardButton("Verify me", url=f"{GUARDY_URL}?start={verification_start_payload(group_id)}")]
                     ])
                 )
                 welcome_message_id = welcome_message.message_id
                 user_id = member.id
 
-                context.user_data['welcome_message_id'] = welcome_message_id
-                context.user_data['to_verify_in_group_id'] = group_id
-
-                db.store_verification_data(
+                # the private chat the user verifies in reads the group & welcome message from here
+                await db.store_verification_data(
                     group_id=group_id,
                     group_username=update.message.chat.username,
                     group_title=update.message.chat.title,
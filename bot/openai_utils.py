@@ -1,7 +1,7 @@
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
-import asyncio
 import logging
+import time
 import bot.resource_utils as utils
 import bot.config as config
 from telegram.constants import ParseMode
@@ -14,57 +14,105 @@ CONFIG = config.get_config()
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# embedding model for semantic answer cache matches
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# min. seconds between two progressive edits of the answer (telegram rate limits message edits)
+STREAM_EDIT_INTERVAL = 1.0
+
 # assistants api class
 class SupportAssistant:
-
-    def __init__(self, assistant_id, api_key):
-        self.client = AsyncOpenAI(api_key=api_key)
+    """
+    streams answers of the guardy assistant. one instance (and its http connection pool) is shared by the
+    whole process, see get_support_assistant().
+
+    parameters:
+    - assistant_id (str): openai assistant id.
+    - api_key (str): openai api key.
+    - base_url (str, optional): alternative api endpoint, e.g. a local stub server.
+    """
+
+    def __init__(self, assistant_id, api_key, base_url=None):
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
         self.assistant_id = assistant_id
+        self.runs = 0
+        self.failures = 0
+        self.first_token_seconds = 0.0
+        self.total_seconds = 0.0
 
     async def create_thread_and_run(self, user_message: str):
         try:
-            thread = await self.client.beta.threads.create()
-            run = await self.submit_message(thread, user_message)
-            return thread, run
-        except Exception as e:
-            logger.error(f"Error creating thread or submitting message: {e}")
-            raise
-
-    async def submit_message(self, thread, user_message: str):
-        try:
-            await self.client.beta.threads.messages.create(
-                thread_id=thread.id, role="user", content=user_message
-            )
-            return await self.client.beta.threads.runs.create(
-                thread_id=thread.id,
+            # thread, message & run in a single request, run events are streamed back
+            return await self.client.beta.threads.create_and_run(
                 assistant_id=self.assistant_id,
+                thread={"messages": [{"role": "user", "content": user_message}]},
+                stream=True,
             )
         except Exception as e:
-            logger.error(f"Error submitting message or creating run: {e}")
+            logger.error(f"Error creating thread or run: {e}")
             raise
 
-    async def get_response(self, thread):
+    async def stream_answer(self, user_message: str):
+        """
+        yields the answer text as it is generated.
+        """
+        start_time = time.monotonic()
+        first_token_time = None
         try:
-            messages = await self.client.beta.threads.messages.list(thread_id=thread.id)
-            assistant_answer = messages.data[0].content[0].text.value
-            return assistant_answer
-        except Exception as e:
-            logger.error(f"Error retrieving assistant response: {e}")
-            raise
-
-    async def wait_on_run(self, run, thread):
-        try:
-            while run.status == "queued" or run.status == "in_progress":
-                run = await self.client.beta.threads.runs.retrieve(
-                    thread_id=thread.id,
-                    run_id=run.id
-                )
-                logger.debug('Responding...')
-                await asyncio.sleep(0.5)
-            return run
-        except Exception as e:
-            logger.error(f"Error during run waiting: {e}")
+            stream = await self.create_thread_and_run(user_message)
+            async for event in stream:
+                if event.event == "thread.message.delta":
+                    for content in event.data.delta.content or []:
+                        if content.type == "text" and content.text and content.text.value:
+                            if first_token_time is None:
+                                first_token_time = time.monotonic() - start_time
+                            yield content.text.value
+                elif event.event in ("thread.run.failed", "thread.run.cancelled", "thread.run.expired"):
+                    raise RuntimeError(f"{event.event}: {event.data.last_error}")
+        except Exception:
+            self.failures += 1
             raise
+        total_time = time.monotonic() - start_time
+        self.runs += 1
+        self.first_token_seconds += first_token_time or total_time
+        self.total_seconds += total_time
+        logger.info(f"Assistant answered (time to first token: {first_token_time or total_time:.2f}s, total: {total_time:.2f}s)")
+
+    async def embed(self, text: str):
+        """
+        returns:
+        - list: embedding of the text (used by the answer cache to match rephrased questions).
+        """
+        response = await self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+        return response.data[0].embedding
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "avg_first_token_seconds": self.first_token_seconds / self.runs if self.runs else None,
+            "avg_total_seconds": self.total_seconds / self.runs if self.runs else None,
+        }
+
+
+_support_assistant = None
+
+# process-wide assistant (shared client & connection pool)
+def get_support_assistant(assistant_id, api_key):
+    global _support_assistant
+    if _support_assistant is None:
+        _support_assistant = SupportAssistant(assistant_id=assistant_id, api_key=api_key, base_url=CONFIG.OPENAI_BASE_URL)
+    return _support_assistant
+
+# edit the placeholder with the answer so far
+async def edit_answer_message(context, placeholder_message, text: str):
+    try:
+        await context.bot.edit_message_text(text, chat_id=placeholder_message.chat_id, message_id=placeholder_message.message_id, parse_mode=ParseMode.HTML)
+        return True
+    except Exception as e:
+        # partial answers may contain unclosed html tags, the next edit catches up
+        logger.debug(f"Skipped progressive answer edit: {e}")
+        return False
 
 # activate premium in guardy community
 async def activate_premium_assistance(update, context, chat_id:int, OPENAI_GUARDY_ASSISTANT_ID:str, OPENAI_GUARDY_ASSISTANT_API_KEY:str):
@@ -79,7 +127,7 @@ async def activate_premium_assistance(update, context, chat_id:int, OPENAI_GUARD
         
         # config oai assistant
         placeholders = config.config_data['placeholders']
-        assistant = SupportAssistant(assistant_id=OPENAI_GUARDY_ASSISTANT_ID, api_key=OPENAI_GUARDY_ASSISTANT_API_KEY)
+        assistant = get_support_assistant(assistant_id=OPENAI_GUARDY_ASSISTANT_ID, api_key=OPENAI_GUARDY_ASSISTANT_API_KEY)
 
         # remove bot mention
         message = message.replace("@" + context.bot.username, "").strip()
@@ -90,21 +138,38 @@ async def activate_premium_assistance(update, context, chat_id:int, OPENAI_GUARD
             await utils.delete_message_after(context, chat_id, empty_message.message_id, delay_seconds=10)
             return
 
+        # repeat questions are answered from the cache without an assistant run
+        answer_cache = context.bot_data.get('answer_cache')
+        if answer_cache is not None:
+            cached_answer = await answer_cache.get(chat_id, message)
+            if cached_answer is not None:
+                await update.message.reply_text(cached_answer, parse_mode=ParseMode.HTML)
+                return
+
         try:
             # placeholder init
             placeholder_message = await update.message.reply_text("🔍 Looking in my mind palace...")
             await update.message.chat.send_action(action="typing")
-            await asyncio.sleep(3)
 
             try:                
-                # openai call
-                thread, run = await assistant.create_thread_and_run(message)
-                run = await assistant.wait_on_run(run, thread)
-                answer = await assistant.get_response(thread)
+                # openai call: edit the placeholder progressively while the answer streams in
+                answer = ""
+                shown_answer = ""
+                last_edit = time.monotonic()
+                async for text in assistant.stream_answer(message):
+                    answer += text
+                    if time.monotonic() - last_edit >= STREAM_EDIT_INTERVAL:
+                        partial_answer = utils.remove_sources_from_response(answer).strip()
+                        if partial_answer and partial_answer != shown_answer and await edit_answer_message(context, placeholder_message, partial_answer):
+                            shown_answer = partial_answer
+                        last_edit = time.monotonic()
                 cleaned_answer = utils.remove_sources_from_response(answer)
 
                 # send successful answer
-                await context.bot.edit_message_text(cleaned_answer, chat_id=placeholder_message.chat_id, message_id=placeholder_message.message_id, parse_mode=ParseMode.HTML)
+                if cleaned_answer.strip() != shown_answer:
+                    await context.bot.edit_message_text(cleaned_answer, chat_id=placeholder_message.chat_id, message_id=placeholder_message.message_id, parse_mode=ParseMode.HTML)
+                if answer_cache is not None:
+                    await answer_cache.set(chat_id, message, cleaned_answer)
 
             except Exception as e:
                 error_text = f"Something went wrong during completion. Reason: {e}"
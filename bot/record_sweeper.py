@@ -0,0 +1,63 @@
+from collections import Counter
+import asyncio
+import logging
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RecordSweeper:
+    """
+    periodically removes verification and scam voting records past their retention.
+
+    the ttl indexes (see MongoDBManager.ensure_indexes) expire these records on their own, the sweeper reclaims
+    whatever the ttl monitor has not reached yet and reports how many stale records it removed.
+
+    parameters:
+    - db (MongoDBManager): database manager.
+    - interval (float): seconds between two sweeps.
+
+    usage:
+    sweeper = RecordSweeper(db, interval=3600)
+    sweeper.start()
+    """
+
+    def __init__(self, db, interval: float = 3600):
+        self.db = db
+        self.interval = interval
+        self.sweeps = 0
+        self.reclaimed = Counter()
+        self._loop_task = None
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self.sweep()
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self):
+        """
+        returns:
+        - dict: number of records removed per collection by this sweep.
+        """
+        reclaimed = await self.db.sweep_expired_records()
+        self.sweeps += 1
+        self.reclaimed.update(reclaimed)
+        logger.info(f"Record sweep reclaimed {sum(reclaimed.values())} stale records: {reclaimed}")
+        return reclaimed
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+    def stats(self):
+        return {
+            "sweeps": self.sweeps,
+            "reclaimed": dict(self.reclaimed),
+        }
@@ -3,8 +3,9 @@ from telegram.ext import ContextTypes, CallbackContext
 import logging
 import re
 import random
-from telegram.constants import ParseMode
+from telegram.constants import ParseMode, ChatType
 import asyncio
+from datetime import datetime, timedelta, timezone
 
 # enable logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
@@ -55,7 +56,7 @@ async def remove_url_message(update: Update, context: CallbackContext, db):
     chat_id = update.effective_chat.id
     user_id = update.message.from_user.id
     username = update.message.from_user.username
-    group_config = db.get_admin_config(group_id=chat_id)
+    group_config = await db.get_admin_config(group_id=chat_id)
     link_removal = group_config.get('link_removal', 'no')
     if link_removal == "no":
         return
@@ -77,7 +78,7 @@ async def remove_forwarded_message(update: Update, context: CallbackContext, db)
     chat_id = update.effective_chat.id
     user_id = update.message.from_user.id
     username = update.message.from_user.username
-    group_config = db.get_admin_config(group_id=chat_id)
+    group_config = await db.get_admin_config(group_id=chat_id)
     forwarded_removal = group_config.get('forwarded_removal', 'no')
     if forwarded_removal == "no":
         return
@@ -97,7 +98,7 @@ async def remove_forwarded_message(update: Update, context: CallbackContext, db)
 async def remove_external_bots(member, update, context, db):
     chat_id = update.message.chat_id
     user_id = update.message.from_user.id
-    group_config = db.get_admin_config(group_id=chat_id)
+    group_config = await db.get_admin_config(group_id=chat_id)
     bot_removal = group_config.get('bot_removal', 'no')
     if bot_removal == "no":
         return
@@ -132,6 +133,11 @@ async def remove_service_message(update: Update, context: CallbackContext):
 
 # delete bot message
 async def delete_message_after(context: CallbackContext, chat_id: int, message_id: int, delay_seconds: int = 10):
+    ephemeral_messages = context.bot_data.get('ephemeral_messages')
+    if ephemeral_messages is not None:
+        # returns immediately, the deletion is batched in the background
+        ephemeral_messages.schedule(chat_id, message_id, datetime.now(timezone.utc) + timedelta(seconds=delay_seconds))
+        return
     await asyncio.sleep(delay_seconds)
     try:
         await context.bot.delete_message(chat_id, message_id)
@@ -213,10 +219,10 @@ async def is_group_or_supergroup(update, context, chat_id, display_warning=True)
         return False
     return True
 
-# check if user is an admin
+# check if user is an admin (answered from the cached admin roster)
 async def is_user_admin(update, context, chat_id, user_id, display_warning=True):
-    user_member = await context.bot.get_chat_member(chat_id, user_id)
-    if user_member.status not in [ChatMember.ADMINISTRATOR, ChatMember.OWNER]:
+    admin_roster = context.bot_data['admin_roster']
+    if not await admin_roster.is_admin(context.bot, chat_id, user_id):
         if display_warning:
             if update.message:
                 warning_msg = await update.message.reply_text(
@@ -233,8 +239,11 @@ async def is_user_admin(update, context, chat_id, user_id, display_warning=True)
 async def is_bot_admin(update, context, chat_id, display_warning=True):
     bot_user_id = context.bot.id
     try:
-        bot_member = await context.bot.get_chat_member(chat_id, bot_user_id)
-        if bot_member.status in [ChatMember.ADMINISTRATOR, ChatMember.OWNER]:
+        # the bot can't be an admin of a private chat
+        if update.effective_chat and update.effective_chat.type == ChatType.PRIVATE:
+            return False
+        admin_roster = context.bot_data['admin_roster']
+        if await admin_roster.is_admin(context.bot, chat_id, bot_user_id):
             if display_warning:
                 if update.message:
                     warning_msg = await update.message.reply_text(
@@ -251,9 +260,21 @@ async def is_bot_admin(update, context, chat_id, display_warning=True):
         logger.error(f"Error in is_bot_admin: {e}")
         return False
 
+# keep cached admin rosters fresh from chat member updates
+async def track_admin_changes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        chat_member_update = update.chat_member or update.my_chat_member
+        admin_roster = context.bot_data['admin_roster']
+        if chat_member_update.new_chat_member.user.id == context.bot.id and chat_member_update.new_chat_member.status in [ChatMember.LEFT, ChatMember.BANNED]:
+            admin_roster.invalidate(chat_member_update.chat.id)
+        else:
+            admin_roster.apply_update(chat_member_update)
+    except Exception as e:
+        logger.error(f"Error in track_admin_changes: {e}")
+
 # check if user is verified or not
 async def is_user_verified(user_id: int, group_id: int, db):
-    verification_data = db.get_verification_data(user_id, group_id)
+    verification_data = await db.get_verification_data(user_id, group_id)
     if verification_data and not verification_data.get('verified'):
         return True
     return False
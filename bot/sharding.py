@@ -0,0 +1,196 @@
+from telegram import Bot, Update
+import multiprocessing
+import asyncio
+import logging
+import signal
+import time
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def jump_consistent_hash(key: int, num_buckets: int):
+    """
+    jump consistent hash (lamping & veach): maps a key to one of `num_buckets` buckets, only ~1/n of the
+    keys move when a bucket is added.
+    """
+    key &= 0xFFFFFFFFFFFFFFFF  # chat ids of groups are negative
+    bucket, j = -1, 0
+    while j < num_buckets:
+        bucket = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def update_chat_id(update: Update):
+    """
+    returns:
+    - int: the chat an update belongs to (the user for chat-less updates like inline queries), 0 if none.
+    """
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return 0
+
+
+class Shard:
+    """
+    the part of the chats a worker process is responsible for.
+
+    usage:
+    shard = Shard(index=0, count=4)
+    if shard.owns(chat_id):
+        ...
+    """
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.count = count
+
+    def owns(self, chat_id: int):
+        return jump_consistent_hash(chat_id, self.count) == self.index
+
+
+def _run_worker(index: int, count: int, updates):
+    """
+    worker process: runs the regular guardy application for one shard, fed by the ingress.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the ingress stops the workers
+    from app import build_application
+    application = build_application(shard=Shard(index, count))
+    asyncio.run(_serve_shard(application, updates))
+
+
+async def _serve_shard(application, updates):
+    loop = asyncio.get_running_loop()
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    try:
+        while True:
+            update_data = await loop.run_in_executor(None, updates.get)
+            if update_data is None:  # shutdown
+                break
+            await application.update_queue.put(Update.de_json(update_data, application.bot))
+    finally:
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+class ShardedIngress:
+    """
+    fetches updates once and routes each one to a worker process by a consistent hash of its chat_id,
+    so per-chat state (flood windows, open votes, ...) stays local to one worker and handler work scales
+    with cores. a supervisor restarts crashed workers, the other workers keep running. state a group and the
+    private chat of a user share (pending verifications) lives in the database, the two may be served by
+    different workers. the ingress polls, webhook mode is not supported with more than one worker.
+
+    parameters:
+    - token (str): bot token.
+    - workers (int): number of worker processes.
+    - poll_timeout (int): long polling timeout in seconds.
+    - supervise_interval (float): seconds between two worker health checks.
+
+    usage:
+    ingress = ShardedIngress(token, workers=4)
+    asyncio.run(ingress.run())
+    """
+
+    def __init__(self, token: str, workers: int, poll_timeout: int = 30, supervise_interval: float = 1):
+        self.token = token
+        self.workers = workers
+        self.poll_timeout = poll_timeout
+        self.supervise_interval = supervise_interval
+        self.routed = [0] * workers
+        self.restarts = [0] * workers
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = [self._context.Queue() for _ in range(workers)]
+        self._processes = [None] * workers
+        self._stop_event = None
+
+    def _start_worker(self, index: int):
+        process = self._context.Process(target=_run_worker,
+                                        args=(index, self.workers, self._queues[index]),
+                                        name=f"guardy-shard-{index}")
+        process.start()
+        self._processes[index] = process
+        logger.info(f"Started shard worker {index} (pid {process.pid})")
+
+    async def _supervise(self):
+        while not self._stop_event.is_set():
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    self.restarts[index] += 1
+                    logger.error(f"Shard worker {index} died (exit code {process.exitcode}), restarting")
+                    self._start_worker(index)
+            await asyncio.sleep(self.supervise_interval)
+
+    def route(self, update: Update):
+        index = jump_consistent_hash(update_chat_id(update), self.workers)
+        self._queues[index].put(update.to_dict())
+        self.routed[index] += 1
+
+    async def run(self):
+        """
+        start the workers and route updates to them until SIGINT/SIGTERM.
+        """
+        self._stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for stop_signal in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(stop_signal, self._stop_event.set)
+
+        for index in range(self.workers):
+            self._start_worker(index)
+        supervisor = asyncio.create_task(self._supervise())
+        try:
+            async with Bot(self.token) as bot:
+                webhook_info = await bot.get_webhook_info()
+                if webhook_info.url:
+                    logger.warning(f"Removing the webhook {webhook_info.url}, the sharded ingress polls for updates")
+                await bot.delete_webhook()
+                offset = None
+                stopped = asyncio.create_task(self._stop_event.wait())
+                while not self._stop_event.is_set():
+                    fetch = asyncio.create_task(bot.get_updates(offset=offset, timeout=self.poll_timeout, allowed_updates=Update.ALL_TYPES))
+                    await asyncio.wait({fetch, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                    if not fetch.done():
+                        fetch.cancel()  # not confirmed via offset, telegram delivers these updates again
+                        break
+                    try:
+                        updates = fetch.result()
+                    except Exception as e:
+                        logger.error(f"Error fetching updates: {e}")
+                        await asyncio.sleep(1)
+                        continue
+                    for update in updates:
+                        self.route(update)
+                        offset = update.update_id + 1
+        finally:
+            supervisor.cancel()
+            await asyncio.gather(supervisor, return_exceptions=True)
+            self.stop_workers()
+
+    def stop_workers(self, timeout: float = 30):
+        for updates in self._queues:
+            updates.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            if process is not None:
+                process.join(max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "routed": list(self.routed),
+            "restarts": list(self.restarts),
+            "alive": [process is not None and process.is_alive() for process in self._processes],
+        }
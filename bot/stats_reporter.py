@@ -0,0 +1,64 @@
+import asyncio
+import json
+import logging
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StatsReporter:
+    """
+    collects the stats() of the bot's services into one snapshot, logs it every `interval` seconds and serves it
+    on the /health endpoint of the webhook server.
+
+    parameters:
+    - sources (dict): name -> callable returning the stats dict of a service.
+    - interval (float): seconds between two stats log lines, 0 disables the periodic log.
+
+    usage:
+    stats_reporter = StatsReporter({"overload_control": overload_control.stats}, interval=300)
+    stats_reporter.start()
+    snapshot = stats_reporter.snapshot()  # {"overload_control": {"level": "normal", ...}}
+    """
+
+    def __init__(self, sources: dict = None, interval: float = 300):
+        self.sources = dict(sources or {})
+        self.interval = interval
+        self.reports = 0
+        self._loop_task = None
+
+    def add(self, name: str, source):
+        self.sources[name] = source
+
+    def snapshot(self):
+        """
+        returns:
+        - dict: stats per service, {"error": ...} for a service whose stats() failed.
+        """
+        snapshot = {}
+        for name, source in self.sources.items():
+            try:
+                snapshot[name] = source()
+            except Exception as e:
+                snapshot[name] = {"error": str(e)}
+        return snapshot
+
+    def start(self):
+        if self._loop_task is None and self.interval > 0:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.report()
+
+    def report(self):
+        logger.info(f"Service stats: {json.dumps(self.snapshot(), default=str, sort_keys=True)}")
+        self.reports += 1
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
@@ -0,0 +1,160 @@
+from collections import deque
+from telegram import Update
+from telegram.constants import ChatType
+from telegram.ext import BaseUpdateProcessor
+import asyncio
+import logging
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# lanes, most latency-critical first
+LANE_INTERACTIVE = "interactive"  # callbacks (verification, config, votes), commands, joins/leaves, private chats
+LANE_MODERATION = "moderation"    # link & forward removal
+LANE_SCANNING = "scanning"        # antiflood & spam scanning of group messages
+LANE_QA = "qa"                    # premium assistant questions
+LANES = (LANE_INTERACTIVE, LANE_MODERATION, LANE_SCANNING, LANE_QA)
+
+MODERATION_ENTITIES = {"url", "text_link"}
+
+
+def update_lane(update: Update):
+    """
+    returns:
+    - str: the lane an update is processed in.
+    """
+    message = update.message
+    if message is None or message.chat.type == ChatType.PRIVATE:
+        return LANE_INTERACTIVE
+    if message.new_chat_members or message.left_chat_member or message.web_app_data:
+        return LANE_INTERACTIVE
+    text = message.text or ""
+    if text.startswith("/"):
+        return LANE_INTERACTIVE
+    if message.forward_origin is not None or any(entity.type in MODERATION_ENTITIES for entity in message.entities or ()):
+        return LANE_MODERATION
+    try:
+        if text.startswith("@" + update.get_bot().username):
+            return LANE_QA
+    except Exception:
+        pass  # bot not initialized yet
+    return LANE_SCANNING
+
+
+class _Lane:
+    __slots__ = ("name", "limit", "running", "waiting", "processed", "max_waiting")
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.running = 0
+        self.waiting = deque()
+        self.processed = 0
+        self.max_waiting = 0
+
+
+class PriorityUpdateProcessor(BaseUpdateProcessor):
+    """
+    processes updates concurrently in priority lanes, each with its own concurrency limit.
+
+    at most `max_concurrent_updates` updates run at once. whenever a slot frees up, the waiting update of the
+    most latency-critical lane with spare capacity runs next, so a raid of scanned group messages cannot starve
+    verification callbacks or admin clicks. within a lane updates run in arrival order.
+
+    parameters:
+    - max_concurrent_updates (int): max. number of updates processed at the same time (all lanes).
+    - lane_limits (dict): max. concurrent updates per lane, e.g. {"scanning": 32}. lanes missing are only
+      bounded by `max_concurrent_updates`.
+
+    usage:
+    processor = PriorityUpdateProcessor(128, lane_limits={"interactive": 64, "moderation": 32, "scanning": 32, "qa": 8})
+    application = Application.builder().token(token).concurrent_updates(processor).build()
+    """
+
+    def __init__(self, max_concurrent_updates: int, lane_limits: dict = None):
+        super().__init__(max_concurrent_updates)
+        lane_limits = lane_limits or {}
+        self.max_running = max_concurrent_updates
+        self.running = 0
+        self.lanes = {name: _Lane(name, lane_limits.get(name, max_concurrent_updates)) for name in LANES}
+        self._ordered_lanes = [self.lanes[name] for name in LANES]
+
+    async def process_update(self, update, coroutine):
+        # the lanes replace the fifo semaphore of the base class
+        await self.do_process_update(update, coroutine)
+
+    async def do_process_update(self, update, coroutine):
+        lane = self.lanes[update_lane(update) if isinstance(update, Update) else LANE_INTERACTIVE]
+        if self._has_priority(lane):
+            self._reserve(lane)
+        else:
+            slot = asyncio.get_running_loop().create_future()
+            lane.waiting.append(slot)
+            lane.max_waiting = max(lane.max_waiting, len(lane.waiting))
+            try:
+                await slot  # resolved by _dispatch() once a slot was reserved for it
+            except asyncio.CancelledError:
+                if slot.done() and not slot.cancelled():
+                    self._release(lane)
+                elif slot in lane.waiting:
+                    lane.waiting.remove(slot)
+                coroutine.close()
+                raise
+        try:
+            await coroutine
+        finally:
+            lane.processed += 1
+            self._release(lane)
+
+    def _has_priority(self, lane: _Lane):
+        # runs right away only if no update of this or a more critical lane could take the slot first
+        if self.running >= self.max_running or lane.running >= lane.limit or lane.waiting:
+            return False
+        for other in self._ordered_lanes:
+            if other is lane:
+                return True
+            if other.waiting and other.running < other.limit:
+                return False
+        return True
+
+    def _reserve(self, lane: _Lane):
+        self.running += 1
+        lane.running += 1
+
+    def _release(self, lane: _Lane):
+        self.running -= 1
+        lane.running -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        for lane in self._ordered_lanes:
+            while lane.waiting and lane.running < lane.limit and self.running < self.max_running:
+                slot = lane.waiting.popleft()
+                if slot.done():  # waiting update was cancelled
+                    continue
+                self._reserve(lane)
+                slot.set_result(None)
+            if self.running >= self.max_running:
+                return
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "lanes": {
+                lane.name: {
+                    "limit": lane.limit,
+                    "running": lane.running,
+                    "waiting": len(lane.waiting),
+                    "max_waiting": lane.max_waiting,
+                    "processed": lane.processed,
+                }
+                for lane in self._ordered_lanes
+            },
+        }
@@ -6,10 +6,9 @@ from telegram.error import BadRequest
 
 import json
 import random
-from io import BytesIO
 import os
 
-from multicolorcaptcha import CaptchaGenerator
+from bot.captcha_pool import render_captcha
 import bot.resource_utils as utils
 
 
@@ -37,21 +36,23 @@ RANDOM_NUMBERS_COUNT = 4
 # generate CAPTCHA
 def generate_captcha():
     try:
-        generator = CaptchaGenerator(CAPTCHA_SIZE_NUM)
-        math_captcha = generator.gen_math_captcha_image(difficult_level=CAPTCHA_DIFFICULTY)
-        math_image = math_captcha.image
-        math_equation_result = math_captcha.equation_result
-
-        # Convert image to a bytes-like object
-        image_bytes = BytesIO()
-        math_image.save(image_bytes, format='PNG')
-        image_bytes.seek(0)
-
-        return image_bytes, math_equation_result
+        return render_captcha(CAPTCHA_SIZE_NUM, CAPTCHA_DIFFICULTY)
     except Exception as e:
         logger.error(f"Failed to generate CAPTCHA: {e}")
         return None, None
 
+# get CAPTCHA: uploaded corpus image (file_id) first, then the pre-generated pool (see bot/captcha_corpus.py & bot/captcha_pool.py)
+async def get_captcha(context):
+    captcha_corpus = context.bot_data.get('captcha_corpus')
+    if captcha_corpus is not None:
+        captcha = captcha_corpus.pick()
+        if captcha is not None:
+            return captcha
+    captcha_pool = context.bot_data.get('captcha_pool')
+    if captcha_pool is not None:
+        return await captcha_pool.pop()
+    return generate_captcha()
+
 # generate CAPTCHA random options
 def generate_random_options(correct_answer: int, range_limits: tuple, count: int):
     try:
@@ -85,7 +86,7 @@ def create_captcha_reply_markup(correct_answer: int, include_reg_btn: bool = Tru
 # verification via CAPTCHA command
 async def captcha_command(update, context):
     try:
-        image, correct_answer = generate_captcha()
+        image, correct_answer = await get_captcha(context)
         if image is not None and correct_answer is not None:
             reply_markup = create_captcha_reply_markup(correct_answer)
             caption_msg = "🔒 Solve the CAPTCHA below to verify that you're a human. \n\nPlease note: You can regenerate CAPTCHA only 3x times."
@@ -105,7 +106,7 @@ async def regenerate_captcha(update: Update, context: ContextTypes.DEFAULT_TYPE)
         context.user_data.setdefault("regen_attempts", 0)
         context.user_data["regen_attempts"] += 1
 
-        image, correct_answer = generate_captcha()
+        image, correct_answer = await get_captcha(context)
         if image is not None and correct_answer is not None:
             reply_markup = create_captcha_reply_markup(correct_answer, include_reg_btn=context.user_data['regen_attempts'] < 3)
 
@@ -174,6 +175,59 @@ async def web_app_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         await update.message.reply_text("Failed to process web verification data. Please try again.")
 
 
+# deep link of the welcome message, carries the group the user verifies for
+def verification_start_payload(group_id: int):
+    return f"verify_{group_id}"
+
+def parse_verification_start_payload(payload: str):
+    """
+    returns:
+    - tuple: (is_verification, group_id), group_id is none for the plain "verify" payload of older welcome messages.
+    """
+    if payload == "verify":
+        return True, None
+    if payload.startswith("verify_"):
+        try:
+            return True, int(payload[len("verify_"):])
+        except ValueError:
+            return True, None
+    return False, None
+
+# /verify command
+async def verify_user_command(update, context, db, group_id: int = None):
+
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+
+    try:
+        # check if there is pending verification (for the group of the deep link, else the most recent one)
+        verif_data = await db.get_pending_verification(user_id, group_id)
+        if verif_data is None:
+            return
+        group_id = verif_data["group_id"]
+        # the answer callbacks arrive in this private chat, served by this shard
+        context.user_data['to_verify_in_group_id'] = group_id
+
+        # fetch group configuration
+        group_config = await db.get_admin_config(group_id=group_id)
+        if group_config:
+            verification_type = group_config.get('human_verification', 'no')
+
+            if verification_type == 'web':
+                await web_command(update, context)
+            elif verification_type == 'image':
+                await captcha_command(update, context)
+            elif verification_type == 'no':
+                pass  # No action required if no verification type is set
+            else:
+                logger.error(f"Unexpected verification type: {verification_type} for group: {chat_id}")
+        else:
+            logger.warning(f"No group configuration found for group: {chat_id}")
+    except Exception as e:
+        logger.error(f"Error during verification process for user {user_id} in group {chat_id}: {e}")
+        await update.message.reply_text("An error occurred during the verification process. Please contact support.")
+
+
 ################################### SUCCESS & FAILURE ###################################
 
 # web verification successful
@@ -401,7 +455,7 @@ async def set_manual_security(db, update, context):
             return
 
         # update group config in db
-        db.set_admin_config(chat_id, new_config)
+        await db.set_admin_config(chat_id, new_config)
         print(f"Updated Configuration for {chat_id}: {new_config}")
     except Exception as e:
         logger.error(f"Error in set_manual_security: {e}")
@@ -423,7 +477,7 @@ async def set_full_security(database, query, update, user_id, context, chat_id:
             'bot_removal': 'yes',
             'antiflood': '10'
         }
-        database.set_admin_config(chat_id, full_security_config)
+        await database.set_admin_config(chat_id, full_security_config)
         message = await query.message.edit_text("🛡️ Guardy enabled maximum security for this group 🛡️")
         await utils.delete_message_after(context, chat_id, message.message_id, delay_seconds=5)
     except Exception as e:
@@ -446,7 +500,7 @@ async def disable_all_functionality(database, query, update, user_id, context, c
             'bot_removal': 'no',
             'antiflood': 'no'
         }
-        database.set_admin_config(chat_id, full_security_config)
+        await database.set_admin_config(chat_id, full_security_config)
         message = await query.message.edit_text("🚫 Guardy is now disabled!")
         await utils.delete_message_after(context, chat_id, message.message_id, delay_seconds=5)
     except Exception as e:
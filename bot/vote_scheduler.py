@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+import asyncio
+import heapq
+import logging
+import time
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _to_timestamp(deadline):
+    # mongodb returns naive utc datetimes
+    if deadline is None:
+        return 0.0
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=timezone.utc)
+    return deadline.timestamp()
+
+
+class VoteScheduler:
+    """
+    concludes scam votes at their deadline from a single timer loop.
+
+    deadlines are persisted with the voting record (GroupChatScamVoting.deadline), so open votes survive
+    a restart: start() reloads them and concludes the overdue ones right away.
+
+    parameters:
+    - db (MongoDBManager): database manager.
+    - conclude (coroutine function): called as `await conclude(group_id, scam_message_id)` once a vote is due.
+    - max_concurrent (int): max. number of votes concluded at the same time.
+    - owns (callable, optional): `owns(group_id)` filters the votes restored on start (sharded mode).
+
+    usage:
+    scheduler = VoteScheduler(db, conclude=my_conclude_coroutine)
+    await scheduler.start()
+    scheduler.schedule(group_id, scam_message_id, deadline)
+    """
+
+    def __init__(self, db, conclude, max_concurrent: int = 20, owns=None):
+        self.db = db
+        self.conclude = conclude
+        self.owns = owns
+        self.concluded = 0
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._tasks = set()
+        self._loop_task = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def start(self):
+        """
+        load the open votes from the database and start the timer loop.
+        """
+        if self._loop_task is not None:
+            return
+        open_votes = await self.db.get_open_scam_votings()
+        if self.owns is not None:
+            open_votes = [vote for vote in open_votes if self.owns(vote["group_id"])]
+        for vote in open_votes:
+            heapq.heappush(self._heap, (_to_timestamp(vote.get("deadline")), vote["group_id"], vote["scam_message_id"]))
+        overdue = sum(1 for deadline, _, _ in self._heap if deadline <= time.time())
+        logger.info(f"Vote scheduler restored {len(open_votes)} open votes ({overdue} overdue)")
+        self._loop_task = asyncio.create_task(self._run())
+
+    def schedule(self, group_id: int, scam_message_id: int, deadline: datetime):
+        deadline_ts = _to_timestamp(deadline)
+        if not self._heap or deadline_ts < self._heap[0][0]:
+            self._wakeup.set()  # new earliest deadline
+        heapq.heappush(self._heap, (deadline_ts, group_id, scam_message_id))
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    continue  # schedule changed, recompute the next deadline
+                except asyncio.TimeoutError:
+                    pass
+
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, group_id, scam_message_id = heapq.heappop(self._heap)
+                task = asyncio.create_task(self._conclude(group_id, scam_message_id))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _conclude(self, group_id: int, scam_message_id: int):
+        async with self._slots:
+            try:
+                await self.conclude(group_id, scam_message_id)
+                self.concluded += 1
+            except Exception as e:
+                logger.error(f"Error concluding vote {scam_message_id} in group {group_id}: {e}")
+
+    async def stop(self):
+        """
+        stop the timer loop. open votes stay in the database and are restored on the next start.
+        """
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._heap.clear()
+
+    def stats(self):
+        return {
+            "open_votes": len(self._heap),
+            "concluding": len(self._tasks),
+            "concluded": self.concluded,
+        }
@@ -0,0 +1,125 @@
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+from urllib.parse import urlparse
+import asyncio
+import hmac
+import json
+import logging
+import signal
+
+# enable logging
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """
+    receives telegram updates via webhook and hands them to the update queue of the application.
+
+    requests without the right secret token are rejected, valid updates are acknowledged as soon as
+    they are queued, the handlers run afterwards.
+
+    parameters:
+    - application (Application): the bot application (initialized and started by run()).
+    - webhook_url (str): public https url telegram posts the updates to (must end with `path`).
+    - secret_token (str): secret telegram sends in the X-Telegram-Bot-Api-Secret-Token header.
+    - host (str): interface to listen on.
+    - port (int): port to listen on.
+    - path (str): url path of the webhook endpoint.
+    - max_connections (int): max. simultaneous connections telegram opens to the webhook.
+
+    usage:
+    server = WebhookServer(application, "https://guardy.example.com/telegram", secret_token="...")
+    asyncio.run(server.run())
+    """
+
+    def __init__(self, application: Application, webhook_url: str, secret_token: str, host: str = "0.0.0.0", port: int = 8000, path: str = "/telegram", max_connections: int = 100):
+        if not secret_token:
+            raise ValueError("webhook mode requires a secret token")
+        if not webhook_url:
+            raise ValueError("webhook mode requires a webhook url")
+        parsed_url = urlparse(webhook_url)
+        if parsed_url.scheme != "https" or not parsed_url.hostname:
+            raise ValueError(f"webhook url must be a public https url, got {webhook_url!r}")
+        if not parsed_url.path.rstrip("/").endswith(path.rstrip("/")):
+            raise ValueError(f"webhook url {webhook_url!r} does not end with the webhook path {path!r}")
+        self.application = application
+        self.webhook_url = webhook_url
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.path = path
+        self.max_connections = max_connections
+        self.received = 0
+        self.rejected = 0
+        self.invalid = 0
+
+    def build_app(self):
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get("/health", self.handle_health)
+        return app
+
+    async def handle_update(self, request: web.Request):
+        if not hmac.compare_digest(request.headers.get(SECRET_TOKEN_HEADER, ""), self.secret_token):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), self.application.bot)
+        except Exception as e:
+            self.invalid += 1
+            logger.error(f"Invalid webhook update: {e}")
+            return web.Response(status=400)
+        self.received += 1
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def handle_health(self, request: web.Request):
+        health = {"webhook": self.stats()}
+        stats_reporter = self.application.bot_data.get('stats_reporter')
+        if stats_reporter is not None:
+            health.update(stats_reporter.snapshot())
+        return web.json_response(health, dumps=lambda data: json.dumps(data, default=str))
+
+    async def run(self):
+        """
+        start the application and the http server, register the webhook and serve until SIGINT/SIGTERM.
+        """
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for stop_signal in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(stop_signal, stop_event.set)
+
+        await self.application.initialize()
+        if self.application.post_init:
+            await self.application.post_init(self.application)
+        await self.application.start()
+
+        runner = web.AppRunner(self.build_app())
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+            await self.application.bot.set_webhook(url=self.webhook_url,
+                                                   secret_token=self.secret_token,
+                                                   allowed_updates=Update.ALL_TYPES,
+                                                   max_connections=self.max_connections)
+            logger.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+            await stop_event.wait()
+        finally:
+            await runner.cleanup()
+            if self.application.running:
+                await self.application.stop()
+            await self.application.shutdown()
+            if self.application.post_shutdown:
+                await self.application.post_shutdown(self.application)
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "invalid": self.invalid,
+            "queued": self.application.update_queue.qsize(),
+        }
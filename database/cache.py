@@ -0,0 +1,98 @@
+from collections import OrderedDict
+import time
+
+
+class TTLCache:
+    """
+    bounded in-memory cache with least-recently-used eviction and per-entry time-to-live.
+
+    entries expire `ttl` seconds after they were written. once `maxsize` entries are stored,
+    the least recently used entry is evicted to make room for a new one.
+
+    usage:
+    cache = TTLCache(maxsize=10000, ttl=300)
+    cache.set(123456, {"link_removal": "yes"})
+    found, value = cache.get(123456)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        found, _ = self.peek(key)
+        return found
+
+    def peek(self, key):
+        """
+        look up a key without touching the hit/miss counters or the lru order.
+
+        returns:
+        - tuple: (found, value), value is none if the key is missing or expired.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, None
+        return True, value
+
+    def get(self, key):
+        """
+        fetch a cached value.
+
+        returns:
+        - tuple: (found, value). `found` distinguishes a cached none from a miss.
+        """
+        found, value = self.peek(key)
+        if not found:
+            self.misses += 1
+            return False, None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        store a value, replacing any previous entry and evicting the lru entry if the cache is full.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = (expires_at, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        drop a single key from the cache. returns true if an entry was removed.
+        """
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        """
+        returns:
+        - dict: current size, hit/miss/eviction counters and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,7 +1,11 @@
-from pymongo import MongoClient
-from typing import Dict
-from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from typing import Dict, List
+from datetime import datetime, timedelta, timezone
 import logging
+from database.cache import TTLCache
+from database.round_trips import RoundTripCounter
 
 class MongoDBManager:
     # collections
@@ -10,26 +14,139 @@ class MongoDBManager:
     GROUP_CHAT_CONFIGS = "GroupChatConfigs"
     GROUP_CHAT_VERIFICATIONS = "GroupChatVerifications"
     GROUP_CHAT_SCAM_VOTING = "GroupChatScamVoting"
+    SPAM_VERDICTS = "SpamVerdicts"
+    PENDING_DELETIONS = "PendingDeletions"
+    CAPTCHA_CORPUS = "CaptchaCorpus"
 
-    def __init__(self, uri):
+    # register_vote outcomes
+    VOTE_COUNTED = "counted"
+    VOTE_ALREADY_CAST = "already_voted"
+    VOTE_CLOSED = "closed"  # concluded or never opened
+    VOTE_FAILED = "failed"
+
+    def __init__(self, uri, db_name:str="ChatDB", config_cache_size:int=10000, config_cache_ttl:float=300, verification_retention:int=86400, scam_voting_retention:int=3600, verdict_retention:int=21600, count_round_trips:bool=False):
         """
         initialize the MongoDBManager with a uri and database name.
 
         parameters:
         - uri (str): mongodb uri connection string.
         - db_name (str): the name of the database to connect to.
+        - config_cache_size (int): max. number of group configs kept in memory.
+        - config_cache_ttl (float): seconds a cached group config stays valid.
+        - verification_retention (int): seconds an unfinished verification record is kept after date_added.
+        - scam_voting_retention (int): seconds a scam voting record is kept after its deadline.
+        - verdict_retention (int): seconds a shared spam verdict is kept after its last update.
+        - count_round_trips (bool): count the commands sent to mongodb (see get_round_trip_stats).
 
         usage:
         db_manager = MongoDBManager("mongodb://localhost:27017/", "mydatabase")
         """
-        self.client = MongoClient(uri)
-        self.db = self.client["ChatDB"]
-        self.collections = self.db.list_collection_names()
+        self.round_trips = RoundTripCounter() if count_round_trips else None
+        self.client = AsyncIOMotorClient(uri, event_listeners=[self.round_trips] if self.round_trips else [])
+        self.db = self.client[db_name]
+        self.config_cache = TTLCache(maxsize=config_cache_size, ttl=config_cache_ttl)
+        self.verification_retention = verification_retention
+        self.scam_voting_retention = scam_voting_retention
+        self.verdict_retention = verdict_retention
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
+    # create indexes
+    async def ensure_indexes(self):
+        """
+        creates the indexes every lookup of the manager relies on. idempotent, safe to call on each start-up.
+
+        GroupChats.group_id is not unique because add_new_public_group inserts a new record whenever the bot is
+        added to a group again. GroupChatVerifications uses a compound (user_id, group_id) index, its prefix serves
+        the lookups by user_id alone. the ttl indexes on GroupChatVerifications.date_added,
+        GroupChatScamVoting.deadline and SpamVerdicts.updated_at let mongodb expire abandoned verifications,
+        orphaned votes and stale verdicts.
+
+        usage:
+        await db_manager.ensure_indexes()
+        """
+        indexes = {
+            self.PRIVATE_CHATS: [([("user_id", ASCENDING)], {"unique": True})],
+            self.GROUP_CHATS: [([("group_id", ASCENDING)], {})],
+            self.GROUP_CHAT_CONFIGS: [([("group_id", ASCENDING)], {"unique": True})],
+            self.GROUP_CHAT_VERIFICATIONS: [([("user_id", ASCENDING), ("group_id", ASCENDING)], {}),
+                                            ([("date_added", ASCENDING)], {"expireAfterSeconds": self.verification_retention})],
+            self.GROUP_CHAT_SCAM_VOTING: [([("group_id", ASCENDING), ("scam_message_id", ASCENDING)], {"unique": True}),
+                                          ([("deadline", ASCENDING)], {"expireAfterSeconds": self.scam_voting_retention})],
+            self.SPAM_VERDICTS: [([("fingerprint", ASCENDING)], {"unique": True}),
+                                 ([("updated_at", ASCENDING)], {"expireAfterSeconds": self.verdict_retention})],
+            self.PENDING_DELETIONS: [([("chat_id", ASCENDING), ("message_id", ASCENDING)], {})],
+            self.CAPTCHA_CORPUS: [([("file_id", ASCENDING)], {"unique": True})],
+        }
+        for collection, specs in indexes.items():
+            for keys, options in specs:
+                try:
+                    await self.db[collection].create_index(keys, **options)
+                except OperationFailure as e:
+                    if e.code == 85 and "expireAfterSeconds" in options:
+                        # IndexOptionsConflict: the retention changed, update the ttl in place
+                        await self._update_ttl(collection, keys, options["expireAfterSeconds"])
+                    else:
+                        self.logger.error(f"Failed to create index {keys} on {collection}: {e}")
+                except Exception as e:
+                    # e.g. duplicates left over from before the unique index existed
+                    self.logger.error(f"Failed to create index {keys} on {collection}: {e}")
+
+    async def _update_ttl(self, collection: str, keys: List, expire_after_seconds: int):
+        try:
+            await self.db.command("collMod", collection, index={"keyPattern": dict(keys), "expireAfterSeconds": expire_after_seconds})
+        except Exception as e:
+            self.logger.error(f"Failed to update the ttl of index {keys} on {collection}: {e}")
+
+    # check query plans
+    async def verify_query_plans(self):
+        """
+        explains the filter of every query the manager runs and logs the ones answered by a collection scan.
+
+        returns:
+        a dictionary mapping "collection: filter fields" to the winning plan's input stage (e.g. 'IXSCAN', 'COLLSCAN').
+
+        usage:
+        plans = await db_manager.verify_query_plans()
+        """
+        query_shapes = [
+            (self.PRIVATE_CHATS, {"user_id": 0}),
+            (self.GROUP_CHATS, {"group_id": 0}),
+            (self.GROUP_CHAT_CONFIGS, {"group_id": 0}),
+            (self.GROUP_CHAT_VERIFICATIONS, {"user_id": 0}),
+            (self.GROUP_CHAT_VERIFICATIONS, {"user_id": 0, "group_id": 0}),
+            (self.GROUP_CHAT_VERIFICATIONS, {"user_id": 0, "verified": False}),
+            (self.GROUP_CHAT_VERIFICATIONS, {"user_id": 0, "group_id": 0, "verified": False}),
+            (self.GROUP_CHAT_SCAM_VOTING, {"group_id": 0, "scam_message_id": 0}),
+            (self.GROUP_CHAT_SCAM_VOTING, {"group_id": 0, "scam_message_id": 0, "voters": {"$ne": 0}}),
+            (self.SPAM_VERDICTS, {"fingerprint": "", "updated_at": {"$gte": datetime.now(timezone.utc)}}),
+            (self.PENDING_DELETIONS, {"chat_id": 0, "message_id": {"$in": [0]}}),
+            (self.CAPTCHA_CORPUS, {"file_id": {"$in": [""]}}),
+        ]
+        plans = {}
+        for collection, query in query_shapes:
+            name = f"{collection}: {', '.join(query)}"
+            try:
+                explanation = await self.db[collection].find(query).explain()
+                stage = self._input_stage(explanation["queryPlanner"]["winningPlan"])
+                plans[name] = stage
+                if stage == "COLLSCAN":
+                    self.logger.warning(f"Query on {name} is not covered by an index (COLLSCAN)")
+            except Exception as e:
+                self.logger.error(f"Failed to explain query on {name}: {e}")
+        return plans
+
+    @staticmethod
+    def _input_stage(plan: Dict):
+        # walk down to the leaf stage that reads the documents (IXSCAN, COLLSCAN, ...)
+        while "inputStage" in plan:
+            plan = plan["inputStage"]
+        if "queryPlan" in plan:  # slot based execution engine
+            return MongoDBManager._input_stage(plan["queryPlan"])
+        return plan.get("stage")
+
     # add new group (public group): works
-    def add_new_public_group(self, group_id:int, added_by:int, member_count:int, chat_title:str="", chat_username:str="", chat_type:str=""):
+    async def add_new_public_group(self, group_id:int, added_by:int, member_count:int, chat_title:str="", chat_username:str="", chat_type:str=""):
         """
         add a new public group to the database.
 
@@ -41,7 +158,7 @@ class MongoDBManager:
         - added_by (int): user id of the person who added bot to the group.
 
         usage:
-        db_manager.add_new_public_group(12345, 321214, 250, "My Group", "mygroup", "supergroup", 98765)
+        await db_manager.add_new_public_group(12345, 321214, 250, "My Group", "mygroup", "supergroup", 98765)
         """
         try:
             group_data = {
@@ -53,15 +170,15 @@ class MongoDBManager:
                 "chat_type": chat_type,
                 "added_by": added_by
             }
-            self.db[self.GROUP_CHATS].insert_one(group_data)
+            await self.db[self.GROUP_CHATS].insert_one(group_data)
         except Exception as e:
             self.logger.error(f"Failed to add new public group: {e}")
 
     # add new user (private chat): works
-    def add_new_private_user(self, user_id:int, username:str="", first_name:str="", last_name:str=""):
+    async def add_new_private_user(self, user_id:int, username:str="", first_name:str="", last_name:str=""):
         """
         adds a new private chat user to the database. 
-        it first checks if the user already exists in the collection and adds only if the user is not present.
+        a single upsert adds the user only if the user is not present yet.
 
         args:
             user_id (int): the id of the user.
@@ -70,41 +187,51 @@ class MongoDBManager:
             first_name (str, optional): the first name of the user. defaults to an empty string.
             last_name (str, optional): the last name of the user. defaults to an empty string.
 
+        returns:
+            bool: true if the user was added, false if the user already existed.
+
         usage:
-            db_manager.add_new_private_user(123456, "username", "First", "Last")
+            await db_manager.add_new_private_user(123456, "username", "First", "Last")
         """
         try:
-            if not self.check_if_user_exists(user_id):
-                user_dict = {
-                    "date_added": datetime.now(),
-                    "user_id": user_id,
-                    "username": username,
-                    "first_name": first_name,
-                    "last_name": last_name,
-                }
-                self.db[self.PRIVATE_CHATS].insert_one(user_dict)
+            user_dict = {
+                "date_added": datetime.now(),
+                "user_id": user_id,
+                "username": username,
+                "first_name": first_name,
+                "last_name": last_name,
+            }
+            result = await self.db[self.PRIVATE_CHATS].update_one({"user_id": user_id}, {"$setOnInsert": user_dict}, upsert=True)
+            return result.upserted_id is not None
+        except DuplicateKeyError:
+            return False  # added concurrently
         except Exception as e:
             self.logger.error(f"Failed to add new private user: {e}")
+            return False
 
     # delete user by id: works
-    def delete_private_user_by_id(self, user_id:int):
+    async def delete_private_user_by_id(self, user_id:int):
         """
         deletes a user from the specified collection based on their user id.
 
         parameters:
         - user_id (int): the user id of the user to delete.
 
+        returns:
+        - bool: true if the user was deleted, false if the user did not exist.
+
         usage:
-        db_manager.delete_private_user_by_id(123456)
+        await db_manager.delete_private_user_by_id(123456)
         """
         try:
-            if self.check_if_user_exists(user_id):
-                self.db[self.PRIVATE_CHATS].delete_one({"user_id": user_id})
+            result = await self.db[self.PRIVATE_CHATS].delete_one({"user_id": user_id})
+            return result.deleted_count == 1
         except Exception as e:
             self.logger.error(f"Failed to delete private user by ID: {e}")
+            return False
 
     # check if user exists: works
-    def check_if_user_exists(self, user_id:int):
+    async def check_if_user_exists(self, user_id:int):
         """
         check if a user exists in the specified collection.
 
@@ -115,17 +242,17 @@ class MongoDBManager:
         - bool: true if the user exists, false otherwise.
 
         usage:
-        user_exists = db_manager.check_if_user_exists(123456)
+        user_exists = await db_manager.check_if_user_exists(123456)
         """
         try:
-            user_doc = self.db[self.PRIVATE_CHATS].find_one({"user_id": user_id})
+            user_doc = await self.db[self.PRIVATE_CHATS].find_one({"user_id": user_id})
             return user_doc is not None
         except Exception as e:
             self.logger.error(f"Failed to check if user exists: {e}")
             return False
 
     # check if group exists: works
-    def check_if_group_exists(self, group_id:int):
+    async def check_if_group_exists(self, group_id:int):
         """
         check if a group exists in the specified collection.
 
@@ -136,17 +263,17 @@ class MongoDBManager:
         - bool: true if the group exists, false otherwise.
 
         usage:
-        group_exists = db_manager.check_if_group_exists(123456)
+        group_exists = await db_manager.check_if_group_exists(123456)
         """
         try:
-            group_doc = self.db[self.GROUP_CHATS].find_one({"group_id": group_id})
+            group_doc = await self.db[self.GROUP_CHATS].find_one({"group_id": group_id})
             return group_doc is not None
         except Exception as e:
             self.logger.error(f"Failed to check if group exists: {e}")
             return False
 
     # check if group admin config exists: works
-    def check_if_admin_config_exists(self, group_id:int):
+    async def check_if_admin_config_exists(self, group_id:int):
         """
         checks if the admin configuration for a given group exists in the database.
 
@@ -157,26 +284,27 @@ class MongoDBManager:
             bool: true if the admin configuration exists, false otherwise.
 
         usage:
-            config_exists = db_manager.check_if_admin_config_exists(123456)
+            config_exists = await db_manager.check_if_admin_config_exists(123456)
         """
         try:
-            group_doc = self.db[self.GROUP_CHAT_CONFIGS].find_one({"group_id": group_id})
+            group_doc = await self.db[self.GROUP_CHAT_CONFIGS].find_one({"group_id": group_id})
             return group_doc is not None
         except Exception as e:
             self.logger.error(f"Failed to check if admin config exists: {e}")
             return False
 
     # set group admin configuration: works
-    def set_admin_config(self, group_id: int, config_data: Dict):
+    async def set_admin_config(self, group_id: int, config_data: Dict):
         """
         set or update the admin configuration for a specific group.
+        the cached config of the group is replaced with the updated document (write-through).
 
         parameters:
         - group_id (int): the id of the group.
         - config_data (Dict): the configuration data to set or update.
 
         usage:
-        db_manager.set_admin_configuration(123456789, {"link_removal": "Yes", "forwarded_removal": "No", ...})
+        await db_manager.set_admin_configuration(123456789, {"link_removal": "Yes", "forwarded_removal": "No", ...})
         """
         try:
             current_time = datetime.now()
@@ -185,49 +313,86 @@ class MongoDBManager:
                 "$setOnInsert": {"group_id": group_id, "created_at": current_time},
                 "$currentDate": {"last_updated": True}
             }
-            self.db[self.GROUP_CHAT_CONFIGS].update_one({"group_id": group_id}, updated_data, upsert=True)
+            config_data = await self.db[self.GROUP_CHAT_CONFIGS].find_one_and_update(
+                {"group_id": group_id}, updated_data, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            self.config_cache.set(group_id, config_data)
         except Exception as e:
+            self.config_cache.invalidate(group_id)
             self.logger.error(f"Failed to set admin configuration: {e}")
 
     # show group admin configuration: works
-    def get_admin_config(self, group_id: int):
+    async def get_admin_config(self, group_id: int):
         """
         fetches the admin configuration for a given group.
 
         parameters:
         - group_id (int): the group id.
 
+        served from the in-memory config cache when possible, so the same group config
+        is read from mongodb at most once per cache ttl.
+
         returns:
         a dictionary containing the group's configuration or none if not found.
         """
         try:
-            config_data = self.db[self.GROUP_CHAT_CONFIGS].find_one({"group_id": group_id})
-            return config_data  # This will be None if not found
+            found, config_data = self.config_cache.get(group_id)
+            if not found:
+                config_data = await self.db[self.GROUP_CHAT_CONFIGS].find_one({"group_id": group_id})
+                self.config_cache.set(group_id, config_data)
+            return dict(config_data) if config_data is not None else None  # This will be None if not found
         except Exception as e:
             self.logger.error(f"Failed to get admin configuration: {e}")
             return None
 
+    # group config cache stats
+    def get_config_cache_stats(self):
+        """
+        returns hit/miss counters of the in-memory group config cache.
+
+        usage:
+        stats = db_manager.get_config_cache_stats()  # {"hits": 42, "misses": 3, ...}
+        """
+        return self.config_cache.stats()
+
+    # mongodb round trip stats
+    def get_round_trip_stats(self):
+        """
+        returns the number of commands sent to mongodb, or none if counting is disabled.
+
+        usage:
+        stats = db_manager.get_round_trip_stats()  # {"round_trips": 42, "commands": {"find": 30, ...}, ...}
+        """
+        return self.round_trips.stats() if self.round_trips else None
+
     # delete admin config: works
-    def delete_admin_config(self, group_id: int):
+    async def delete_admin_config(self, group_id: int):
         """
         deletes the admin configuration for a specific group from the database.
 
         this function should be used when the admin configuration for a group is no longer needed or relevant.
+        the cached config of the group is dropped immediately.
 
         args:
             group_id (int): the id of the group whose admin configuration is to be deleted.
 
+        returns:
+            bool: true if a configuration was deleted, false if the group had none.
+
         usage:
-            db_manager.delete_admin_config(123456789)
+            await db_manager.delete_admin_config(123456789)
         """
         try:
-            if self.check_if_admin_config_exists(group_id):
-                self.db[self.GROUP_CHAT_CONFIGS].delete_one({"group_id": group_id})
+            result = await self.db[self.GROUP_CHAT_CONFIGS].delete_one({"group_id": group_id})
+            self.config_cache.set(group_id, None)
+            return result.deleted_count == 1
         except Exception as e:
+            self.config_cache.invalidate(group_id)
             self.logger.error(f"Failed to delete admin configuration: {e}")
+            return False
 
     # store user verification data: works
-    def store_verification_data(self, group_id: int, group_username:str, group_title:str, welcome_message_id:int, user_id:int, verification_type:str, verified:bool):
+    async def store_verification_data(self, group_id: int, group_username:str, group_title:str, welcome_message_id:int, user_id:int, verification_type:str, verified:bool):
         """
         store verification data for a group chat in the database.
 
@@ -241,11 +406,11 @@ class MongoDBManager:
         - verified (bool): verification status of the user.
 
         usage:
-        db_manager.store_verification_data(123456, "mygroup", "My Group", 654321, 123456, "web", False)
+        await db_manager.store_verification_data(123456, "mygroup", "My Group", 654321, 123456, "web", False)
         """
         try:
             verification_data = {
-                "date_added": datetime.now(),
+                "date_added": datetime.now(timezone.utc),
                 "group_id": group_id,
                 "group_username": group_username,
                 "group_title": group_title,
@@ -255,29 +420,36 @@ class MongoDBManager:
                 "verified": verified
             }
 
-            self.db[self.GROUP_CHAT_VERIFICATIONS].insert_one(verification_data)
+            await self.db[self.GROUP_CHAT_VERIFICATIONS].insert_one(verification_data)
         except Exception as e:
             self.logger.error(f"Failed to store verification data: {e}")
 
     # delete verification data based on the user_id & verification status
-    def delete_verification_data(self, user_id:int):
+    async def delete_verification_data(self, user_id:int, group_id:int=None):
         """
         deletes verification data from the GroupChatVerifications collection for a specific user based on their user id.
 
         parameters:
         - user_id (int): the id of the user whose verification data is to be deleted.
+        - group_id (int): only delete the verification for this group (default: any group of the user).
+
+        returns:
+        - bool: true if verification data was deleted, false if there was none.
 
         usage:
-        db_manager.delete_verification_data(123456)
+        await db_manager.delete_verification_data(123456)
+        await db_manager.delete_verification_data(123456, group_id=-100123)
         """
         try:
-            if self.check_if_verification_data_exists(user_id):
-                self.db[self.GROUP_CHAT_VERIFICATIONS].delete_one({"user_id": user_id})
+            query = {"user_id": user_id} if group_id is None else {"user_id": user_id, "group_id": group_id}
+            result = await self.db[self.GROUP_CHAT_VERIFICATIONS].delete_one(query)
+            return result.deleted_count == 1
         except Exception as e:
             self.logger.error(f"Failed to delete verification data: {e}")
+            return False
 
     # fetch verification data
-    def get_verification_data(self, user_id: int, group_id: int):
+    async def get_verification_data(self, user_id: int, group_id: int):
         """
         fetches the verification data for a given user and group.
 
@@ -289,7 +461,7 @@ class MongoDBManager:
         a dictionary containing the verification data or none if not found.
         """
         try:
-            verification_data = self.db[self.GROUP_CHAT_VERIFICATIONS].find_one({
+            verification_data = await self.db[self.GROUP_CHAT_VERIFICATIONS].find_one({
                 "user_id": user_id,
                 "group_id": group_id
             })
@@ -298,8 +470,34 @@ class MongoDBManager:
             self.logger.error(f"Failed to fetch verification data: {e}")
             return None
 
+    # fetch the pending verification of a user
+    async def get_pending_verification(self, user_id: int, group_id: int = None):
+        """
+        fetches a pending (not yet verified) verification of a user. the private chat the user verifies in looks
+        the group up here, it may be served by another shard than the group (see bot/sharding.py).
+
+        parameters:
+        - user_id (int): the user id.
+        - group_id (int, optional): the group the user verifies for (from the welcome message's deep link).
+          without it the most recent pending verification of the user is returned.
+
+        returns:
+        a dictionary containing the verification data (group_id, welcome_message_id, ...) or none if there is none.
+
+        usage:
+        pending = await db_manager.get_pending_verification(123456, group_id=-100123)
+        """
+        try:
+            query = {"user_id": user_id, "verified": False}
+            if group_id is not None:
+                query["group_id"] = group_id
+            return await self.db[self.GROUP_CHAT_VERIFICATIONS].find_one(query, sort=[("date_added", DESCENDING), ("_id", DESCENDING)])
+        except Exception as e:
+            self.logger.error(f"Failed to fetch pending verification: {e}")
+            return None
+
     # delete group data
-    def delete_group_data(self, group_id: int):
+    async def delete_group_data(self, group_id: int):
         """
         deletes all data associated with a specific group from the database.
 
@@ -308,132 +506,310 @@ class MongoDBManager:
         parameters:
         - group_id (int): the id of the group to be deleted.
 
+        returns:
+        - bool: true if group data was deleted, false if the group was not stored.
+
         usage:
-        db_manager.delete_group_data(123456789)
+        await db_manager.delete_group_data(123456789)
         """
         try:
-            if self.check_if_group_exists(group_id):
-                self.db[self.GROUP_CHATS].delete_one({"group_id": group_id})
+            result = await self.db[self.GROUP_CHATS].delete_many({"group_id": group_id})
+            return result.deleted_count > 0
         except Exception as e:
             self.logger.error(f"Failed to delete group data: {e}")
+            return False
 
-    # add voter to set
-    def add_voter(self, group_id: int, scam_message_id: int, user_id: int):
+    # remove expired records
+    async def sweep_expired_records(self):
         """
-        add a user to the list of voters for a specific scam message in a group.
+        deletes the verification and scam voting records past their retention that the ttl monitor has not removed yet.
+
+        returns:
+        a dictionary with the number of deleted records per collection.
+
+        usage:
+        reclaimed = await db_manager.sweep_expired_records()  # {"GroupChatVerifications": 12, "GroupChatScamVoting": 0}
+        """
+        now = datetime.now(timezone.utc)
+        expired = {
+            self.GROUP_CHAT_VERIFICATIONS: {"date_added": {"$lt": now - timedelta(seconds=self.verification_retention)}},
+            self.GROUP_CHAT_SCAM_VOTING: {"deadline": {"$lt": now - timedelta(seconds=self.scam_voting_retention)}},
+        }
+        reclaimed = {}
+        for collection, query in expired.items():
+            try:
+                result = await self.db[collection].delete_many(query)
+                reclaimed[collection] = result.deleted_count
+            except Exception as e:
+                self.logger.error(f"Failed to sweep expired records from {collection}: {e}")
+                reclaimed[collection] = 0
+        return reclaimed
+
+    # register vote
+    async def register_vote(self, group_id: int, scam_message_id: int, user_id: int, vote_yes: bool) -> str:
+        """
+        atomically adds a user to the voters of a scam message and counts their vote, in one round trip.
+        the vote only counts if the user has not voted yet and the voting is still open, so concurrent
+        presses of the same user can never be counted twice. only a rejected vote costs a second round trip,
+        to tell a repeated vote from a concluded voting.
 
         parameters:
         - group_id (int): the id of the group.
         - scam_message_id (int): the id of the scam message.
         - user_id (int): the id of the user who voted.
+        - vote_yes (bool): true if the vote is 'Yes' for scam, false for 'No'.
+
+        returns:
+        - str: VOTE_COUNTED, VOTE_ALREADY_CAST, VOTE_CLOSED (concluded or unknown voting) or VOTE_FAILED.
 
         usage:
-        db_manager.add_voter(123456789, 987654321, 111222333)
+        outcome = await db_manager.register_vote(123456789, 987654321, 111222333, vote_yes=True)
         """
         try:
-            self.db[self.GROUP_CHAT_SCAM_VOTING].update_one(
-                {"group_id": group_id, "scam_message_id": scam_message_id},
-                {"$addToSet": {"voters": user_id}},
-                upsert=True
+            update_field = "vote_scam_yes" if vote_yes else "vote_scam_no"
+            query = {"group_id": group_id, "scam_message_id": scam_message_id}
+            result = await self.db[self.GROUP_CHAT_SCAM_VOTING].update_one(
+                {**query, "voters": {"$ne": user_id}},
+                {"$push": {"voters": user_id}, "$inc": {update_field: 1}}
             )
+            if result.modified_count == 1:
+                return self.VOTE_COUNTED
+            if await self.db[self.GROUP_CHAT_SCAM_VOTING].find_one(query, {"_id": 1}) is None:
+                return self.VOTE_CLOSED
+            return self.VOTE_ALREADY_CAST
         except Exception as e:
-            self.logger.error(f"Failed to add voter: {e}")
+            self.logger.error(f"Failed to register vote: {e}")
+            return self.VOTE_FAILED
 
-    # check if user has voted or not
-    def check_if_user_voted(self, group_id: int, scam_message_id: int, user_id: int) -> bool:
+    # init scam voting
+    async def initialize_scam_voting(self, group_id:int, scam_message_id:int, alert_message_id:int, deadline:datetime=None):
         """
-        check if a user has already voted on a specific scam message in a group.
+        initializes a scam voting record with 'vote_scam_yes' and 'vote_scam_no' set to 0, unless it exists already.
 
         parameters:
         - group_id (int): the id of the group.
         - scam_message_id (int): the id of the scam message.
-        - user_id (int): the id of the user to check.
+        - alert_message_id (int): the id of the alert message sent by Guardy
+        - deadline (datetime): when the voting is concluded (persisted so open votes survive restarts).
 
         returns:
-        - bool: true if the user has voted, false otherwise.
+        - bool: true if the voting was created, false if it already existed.
 
         usage:
-        has_voted = db_manager.check_if_user_voted(123456789, 987654321, 111222333)
+        await db_manager.initialize_scam_voting(123456789, 987654321, 987654322, deadline)
         """
         try:
-            voting_record = self.db[self.GROUP_CHAT_SCAM_VOTING].find_one(
-                {"group_id": group_id, "scam_message_id": scam_message_id, "voters": user_id}
+            result = await self.db[self.GROUP_CHAT_SCAM_VOTING].update_one(
+                {"group_id": group_id, "scam_message_id": scam_message_id},
+                {"$setOnInsert": {
+                    "alert_message_id": alert_message_id,
+                    "vote_scam_yes": 0,
+                    "vote_scam_no": 0,
+                    "deadline": deadline or datetime.now(timezone.utc)
+                }},
+                upsert=True
             )
-            return bool(voting_record)
+            return result.upserted_id is not None
+        except DuplicateKeyError:
+            return False  # created concurrently
         except Exception as e:
-            self.logger.error(f"Failed to check if user has voted: {e}")
+            self.logger.error(f"Failed to initialize scam voting: {e}")
             return False
 
-    # upsert scam voting
-    def update_scam_voting(self, group_id: int, scam_message_id: int, vote_yes: bool):
+    # fetch open scam votings
+    async def get_open_scam_votings(self):
         """
-        update the scam voting results for a specific message in a group. if the record does not exist, it creates one.
-        each call updates either the 'vote_scam_yes' or 'vote_scam_no' count.
+        fetches all scam votings that have not been concluded yet, e.g. to reschedule them after a restart.
 
-        parameters:
-        - group_id (int): the id of the group where the voting is taking place.
-        - scam_message_id (int): the id of the scam message being voted on.
-        - vote_yes (bool): true if the vote is 'Yes' for scam, false for 'No'.
+        returns:
+        a list of dictionaries with 'group_id', 'scam_message_id' and 'deadline' (none for records without deadline).
 
         usage:
-        db_manager.update_scam_voting(123456789, 987654321, true)  # for a 'Yes' vote
-        db_manager.update_scam_voting(123456789, 987654321, false) # for a 'No' vote
+        open_votes = await db_manager.get_open_scam_votings()
         """
         try:
-            update_field = "vote_scam_yes" if vote_yes else "vote_scam_no"
-            self.db[self.GROUP_CHAT_SCAM_VOTING].update_one(
-                {"group_id": group_id, "scam_message_id": scam_message_id},
-                {"$inc": {update_field: 1}},
-                upsert=True
-            )
+            cursor = self.db[self.GROUP_CHAT_SCAM_VOTING].find({}, {"_id": 0, "group_id": 1, "scam_message_id": 1, "deadline": 1})
+            return await cursor.to_list(length=None)
         except Exception as e:
-            self.logger.error(f"Failed to update scam voting: {e}")
+            self.logger.error(f"Failed to get open scam votings: {e}")
+            return []
 
-    # init scam voting
-    def initialize_scam_voting(self, group_id:int, scam_message_id:int, alert_message_id:int):
+    # delete scam voting
+    async def delete_scam_voting(self, group_id: int, scam_message_id: int):
         """
-        initializes a scam voting record with 'vote_scam_yes' and 'vote_scam_no' set to 0.
+        retrieves and deletes a scam voting record from the GroupChatScamVoting collection.
 
         parameters:
         - group_id (int): the id of the group.
         - scam_message_id (int): the id of the scam message.
-        - alert_message_id (int): the id of the alert message sent by Guardy
+
+        returns:
+        the scam voting record if found, none otherwise.
 
         usage:
-        db_manager.initialize_scam_voting(123456789, 987654321)
+        voting_record = await db_manager.delete_scam_voting(123456789, 987654321)
         """
         try:
-            if not self.check_if_scam_voting_item_exists(group_id, scam_message_id):
-                self.db[self.GROUP_CHAT_SCAM_VOTING].insert_one({
-                    "group_id": group_id,
-                    "alert_message_id": alert_message_id,
-                    "scam_message_id": scam_message_id,
-                    "vote_scam_yes": 0,
-                    "vote_scam_no": 0
-                })
+            # retrieve the record
+            query = {"group_id": group_id, "scam_message_id": scam_message_id}
+            record = await self.db[self.GROUP_CHAT_SCAM_VOTING].find_one_and_delete(query)
+            return record
         except Exception as e:
-            self.logger.error(f"Failed to initialize scam voting: {e}")
+            self.logger.error(f"Failed to delete scam voting: {e}")
+            return None
 
-    # delete scam voting
-    def delete_scam_voting(self, group_id: int, scam_message_id: int):
+    # fetch cached spam verdict
+    async def get_spam_verdict(self, fingerprint: str, max_age_seconds: float):
         """
-        retrieves and deletes a scam voting record from the GroupChatScamVoting collection.
+        fetches a cached spam verdict shared between bot instances.
 
         parameters:
-        - group_id (int): the id of the group.
-        - scam_message_id (int): the id of the scam message.
+        - fingerprint (str): hash of the normalized message text.
+        - max_age_seconds (float): verdicts older than this are ignored.
 
         returns:
-        the scam voting record if found, none otherwise.
+        a dictionary {"probability": float, "label": str} or none if not found.
 
         usage:
-        voting_record = db_manager.delete_scam_voting(123456789, 987654321)
+        verdict = await db_manager.get_spam_verdict("9f86d08...", 21600)
         """
         try:
-            # retrieve the record
-            query = {"group_id": group_id, "scam_message_id": scam_message_id}
-            record = self.db[self.GROUP_CHAT_SCAM_VOTING].find_one_and_delete(query)
+            min_updated_at = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+            record = await self.db[self.SPAM_VERDICTS].find_one(
+                {"fingerprint": fingerprint, "updated_at": {"$gte": min_updated_at}},
+                {"_id": 0, "probability": 1, "label": 1}
+            )
             return record
         except Exception as e:
-            self.logger.error(f"Failed to delete scam voting: {e}")
+            self.logger.error(f"Failed to get spam verdict: {e}")
             return None
+
+    # store spam verdict
+    async def set_spam_verdict(self, fingerprint: str, verdict: Dict):
+        """
+        stores (upserts) a spam verdict for a message fingerprint.
+
+        parameters:
+        - fingerprint (str): hash of the normalized message text.
+        - verdict (Dict): {"probability": float, "label": str}
+
+        usage:
+        await db_manager.set_spam_verdict("9f86d08...", {"probability": 0.97, "label": "spam"})
+        """
+        try:
+            await self.db[self.SPAM_VERDICTS].update_one(
+                {"fingerprint": fingerprint},
+                {"$set": {"probability": verdict["probability"], "label": verdict["label"], "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to set spam verdict: {e}")
+
+    # add pending message deletions
+    async def add_pending_deletions(self, items: List[Dict]):
+        """
+        stores messages the bot still has to delete.
+
+        parameters:
+        - items (List[Dict]): [{"chat_id": int, "message_id": int, "expires_at": datetime}, ...]
+
+        usage:
+        await db_manager.add_pending_deletions([{"chat_id": -100123, "message_id": 42, "expires_at": expires_at}])
+        """
+        try:
+            if items:
+                await self.db[self.PENDING_DELETIONS].insert_many(items, ordered=False)
+        except Exception as e:
+            self.logger.error(f"Failed to add pending deletions: {e}")
+
+    # get pending message deletions
+    async def get_pending_deletions(self):
+        """
+        returns all pending message deletions.
+
+        returns:
+        - List[Dict]: [{"chat_id": int, "message_id": int, "expires_at": datetime}, ...]
+
+        usage:
+        pending = await db_manager.get_pending_deletions()
+        """
+        try:
+            return await self.db[self.PENDING_DELETIONS].find(
+                {}, {"_id": 0, "chat_id": 1, "message_id": 1, "expires_at": 1}
+            ).to_list(None)
+        except Exception as e:
+            self.logger.error(f"Failed to get pending deletions: {e}")
+            return []
+
+    # remove pending message deletions
+    async def remove_pending_deletions(self, chat_id: int, message_ids: List[int]):
+        """
+        removes the pending deletions of messages that were deleted.
+
+        parameters:
+        - chat_id (int): chat id.
+        - message_ids (List[int]): deleted message ids.
+
+        usage:
+        await db_manager.remove_pending_deletions(-100123, [42, 43])
+        """
+        try:
+            await self.db[self.PENDING_DELETIONS].delete_many({"chat_id": chat_id, "message_id": {"$in": message_ids}})
+        except Exception as e:
+            self.logger.error(f"Failed to remove pending deletions: {e}")
+
+    # add uploaded captcha
+    async def add_captcha_to_corpus(self, file_id: str, answer, message_id: int):
+        """
+        stores an uploaded CAPTCHA image of the corpus.
+
+        parameters:
+        - file_id (str): telegram file_id of the uploaded image.
+        - answer: the CAPTCHA answer.
+        - message_id (int): id of the upload message in the storage chat.
+
+        usage:
+        await db_manager.add_captcha_to_corpus("AgACAgQAAxkDAAI...", "12", 345)
+        """
+        try:
+            await self.db[self.CAPTCHA_CORPUS].insert_one({
+                "file_id": file_id,
+                "answer": answer,
+                "message_id": message_id,
+                "created_at": datetime.now(timezone.utc)
+            })
+        except Exception as e:
+            self.logger.error(f"Failed to add CAPTCHA to corpus: {e}")
+
+    # get uploaded captchas
+    async def get_captcha_corpus(self):
+        """
+        returns the CAPTCHA corpus, oldest first.
+
+        returns:
+        - List[Dict]: [{"file_id": str, "answer": ..., "message_id": int, "created_at": datetime}, ...]
+
+        usage:
+        corpus = await db_manager.get_captcha_corpus()
+        """
+        try:
+            return await self.db[self.CAPTCHA_CORPUS].find({}, {"_id": 0}).sort("created_at", ASCENDING).to_list(None)
+        except Exception as e:
+            self.logger.error(f"Failed to get CAPTCHA corpus: {e}")
+            return []
+
+    # remove uploaded captchas
+    async def remove_captchas_from_corpus(self, file_ids: List[str]):
+        """
+        removes retired CAPTCHAs from the corpus.
+
+        parameters:
+        - file_ids (List[str]): file_ids of the retired images.
+
+        usage:
+        await db_manager.remove_captchas_from_corpus(["AgACAgQAAxkDAAI..."])
+        """
+        try:
+            await self.db[self.CAPTCHA_CORPUS].delete_many({"file_id": {"$in": file_ids}})
+        except Exception as e:
+            self.logger.error(f"Failed to remove CAPTCHAs from corpus: {e}")
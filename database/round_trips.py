@@ -0,0 +1,53 @@
+from collections import Counter
+from pymongo import monitoring
+import threading
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    """
+    pymongo command listener counting the round trips to mongodb per command (find, update, delete, ...).
+
+    snapshot the counters before and after a bot action to see how many round trips it costs.
+
+    usage:
+    counter = RoundTripCounter()
+    client = AsyncIOMotorClient(uri, event_listeners=[counter])
+    before = counter.snapshot()
+    await db_manager.add_new_private_user(123456)
+    round_trips = counter.since(before)  # {"update": 1}
+    """
+
+    def __init__(self):
+        self.commands = Counter()
+        self.failures = 0
+        self._lock = threading.Lock()  # motor runs commands on its thread pool
+
+    def started(self, event):
+        with self._lock:
+            self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        with self._lock:
+            self.failures += 1
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.commands)
+
+    def since(self, snapshot: Counter):
+        """
+        returns:
+        - dict: round trips per command since `snapshot` was taken.
+        """
+        return dict(self.snapshot() - snapshot)
+
+    def stats(self):
+        commands = self.snapshot()
+        return {
+            "round_trips": sum(commands.values()),
+            "commands": dict(commands),
+            "failures": self.failures,
+        }
@@ -0,0 +1,302 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import asyncio
+import logging
+import time
+from collections import Counter
+from scam_algo_src.micro_batcher import MicroBatcher
+from scam_algo_src.otis_spam_model import ONNX_EXPORT_DIR
+from scam_algo_src.verdict_cache import text_fingerprint
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# label of the texts of a batch lost with a crashed worker, callers score them without the model
+UNAVAILABLE = "unavailable"
+
+
+def _init_worker(backend: str, onnx_dir: str):
+    """
+    process pool initializer: loads the spam model once per worker process.
+    """
+    from scam_algo_src.otis_spam_model import load_model
+    load_model(backend, onnx_dir)
+
+
+def _warm_up_worker(backend: str, onnx_dir: str):
+    from scam_algo_src.otis_spam_model import warmup
+    return warmup(backend, onnx_dir)
+
+
+def _classify_batch_in_worker(input_texts: list):
+    from scam_algo_src.otis_spam_model import analyze_messages
+    return analyze_messages(input_texts) or [None] * len(input_texts)
+
+
+class SpamInferenceService:
+    """
+    runs the OTIS spam model in a process pool so forward passes never block the event loop.
+    concurrent requests are micro-batched, so a burst of short messages costs one padded forward pass.
+    with a verdict cache, repeated (normalized) texts skip inference and identical texts in flight share one request.
+    batches are filled fairly across groups, so a group under a spam raid cannot delay the scans of the other groups,
+    and a single group may only hold `max_pending_per_group` of the queue.
+
+    the pool and the model are started lazily: either explicitly via warm_up_in_background() (e.g. at startup)
+    or by the first classify() call. until the warmup pass finished `ready` is false and classify() returns none.
+    a failed warmup is retried with fresh workers after `warmup_retry_delay` seconds, doubling up to
+    `warmup_retry_max_delay`, so a broken model install costs one attempt per interval rather than one per message.
+    if a worker dies (crash, oom kill) the texts of its batch come back labelled UNAVAILABLE, the pool is torn down
+    and rebuilt by the same warmup path.
+
+    parameters:
+    - workers (int): number of worker processes, each holding its own copy of the model.
+    - max_queue_size (int): max. number of texts waiting for or in inference. new requests are rejected above it.
+    - timeout (float): seconds to wait for a single classification.
+    - max_batch_size (int): max. number of texts per forward pass.
+    - max_batch_wait_ms (float): max. time a text waits for its batch to fill up.
+    - verdict_cache (VerdictCache, optional): cache of verdicts keyed by the normalized text.
+    - model_backend (str): "pytorch", "quantized" or "onnx" (see otis_spam_model.load_pipeline).
+    - onnx_dir (str): directory the onnx graph is exported to once and loaded from by every worker.
+    - group_weights (dict, optional): batch share per chat_id, groups missing have weight 1.
+    - max_pending_per_group (int, optional): max. number of texts of one group waiting for or in inference,
+      defaults to half of `max_queue_size`.
+    - warmup_retry_delay (float): seconds before the first retry of a failed warmup.
+    - warmup_retry_max_delay (float): max. seconds between two warmup retries.
+
+    usage:
+    service = SpamInferenceService(workers=2)
+    service.warm_up_in_background()
+    result = await service.classify("Claim your prize now!", chat_id=chat_id)  # {"probability": 0.97, "label": "spam"}
+    await service.shutdown()
+    """
+
+    def __init__(self, workers: int = 1, max_queue_size: int = 256, timeout: float = 10, max_batch_size: int = 16, max_batch_wait_ms: float = 10, verdict_cache=None, model_backend: str = "pytorch", onnx_dir: str = ONNX_EXPORT_DIR, group_weights: dict = None, max_pending_per_group: int = None, warmup_retry_delay: float = 30, warmup_retry_max_delay: float = 3600):
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait_ms = max_batch_wait_ms
+        self.verdict_cache = verdict_cache
+        self.model_backend = model_backend
+        self.onnx_dir = onnx_dir
+        self.loaded_backends = []
+        self.group_weights = group_weights or {}
+        self.max_pending_per_group = max_pending_per_group or max(1, max_queue_size // 2)
+        self.warmup_retry_delay = warmup_retry_delay
+        self.warmup_retry_max_delay = warmup_retry_max_delay
+        self.ready = False
+        self.cold_start_seconds = None
+        self.warmup_failures = 0
+        self._next_warmup_at = 0.0
+        self.not_ready = 0
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.group_rejected = 0
+        self.pool_crashes = 0
+        self._pending_by_group = Counter()
+        self._executor = None
+        self._in_flight = {}
+        self._batcher = None
+        self._warmup_task = None
+        self._recovery_task = None
+
+    def start(self):
+        if self._executor is not None:
+            return
+        # spawn keeps torch/tokenizer threads of the parent out of the workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_backend, self.onnx_dir),
+        )
+        self._batcher = MicroBatcher(self._classify_batch,
+                                     max_batch_size=self.max_batch_size,
+                                     max_wait_ms=self.max_batch_wait_ms,
+                                     max_concurrent_batches=self.workers,
+                                     weights=self.group_weights)
+        self._batcher.start()
+        logger.info(f"Spam inference pool started with {self.workers} worker(s)")
+
+    def warm_up_in_background(self):
+        """
+        start the pool and load + warm up the model in every worker without blocking the caller.
+        does nothing while a warmup runs or a failed one waits for its retry.
+        """
+        if self._warmup_task is None and time.monotonic() >= self._next_warmup_at:
+            self.start()
+            self._warmup_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        start_time = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            loaded = await asyncio.gather(*[
+                loop.run_in_executor(self._executor, _warm_up_worker, self.model_backend, self.onnx_dir)
+                for _ in range(self.workers)
+            ])
+            if any(worker is None for worker in loaded):
+                raise RuntimeError("model failed to load in a worker")
+            self.cold_start_seconds = time.monotonic() - start_time
+            self.loaded_backends = [backend for _, backend in loaded]
+            self.warmup_failures = 0
+            self.ready = True
+            logger.info(f"Spam model ready in {self.cold_start_seconds:.2f}s (worker load times: {', '.join(f'{t:.2f}s ({backend})' for t, backend in loaded)})")
+            if any(backend != self.model_backend for backend in self.loaded_backends):
+                logger.warning(f"Spam model backend {self.model_backend} requested, workers run {', '.join(self.loaded_backends)}")
+        except Exception as e:
+            self.warmup_failures += 1
+            retry_delay = min(self.warmup_retry_delay * 2 ** (self.warmup_failures - 1), self.warmup_retry_max_delay)
+            self._next_warmup_at = time.monotonic() + retry_delay
+            logger.error(f"Spam model warmup failed (attempt {self.warmup_failures}): {e}. Retrying in {retry_delay:.0f}s")
+            # workers cache a failed load, the retry needs fresh ones
+            await self._stop_pool()
+            self._warmup_task = None  # retried by the first classify() after the delay
+
+    async def classify(self, input_text: str, chat_id: int = None):
+        """
+        classify a text of the group `chat_id` in the worker pool.
+
+        returns:
+        - dict: {"probability": float, "label": "spam" | "not spam" | "error" | UNAVAILABLE}, or none if the
+          model is not ready yet, the queue is full or the request timed out.
+        """
+        if not self.ready:
+            # skip scanning until the model is loaded and warmed up
+            self.not_ready += 1
+            self.warm_up_in_background()
+            return None
+        if self.verdict_cache is None:
+            return await self._classify_uncached(input_text, chat_id)
+
+        fingerprint = text_fingerprint(input_text)
+        verdict = await self.verdict_cache.get(input_text, fingerprint)
+        if verdict is not None:
+            return dict(verdict)
+
+        # identical text already in inference: wait for that result instead
+        in_flight = self._in_flight.get(fingerprint)
+        if in_flight is not None:
+            self.coalesced += 1
+            result = await asyncio.shield(in_flight)
+            return dict(result) if result else None
+
+        task = asyncio.ensure_future(self._classify_uncached(input_text, chat_id))
+        self._in_flight[fingerprint] = task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            self._in_flight.pop(fingerprint, None)
+        if result and result["label"] not in ("error", UNAVAILABLE):
+            await self.verdict_cache.set(input_text, result, fingerprint)
+        return dict(result) if result else None
+
+    async def _classify_uncached(self, input_text: str, chat_id: int = None):
+        if self.pending >= self.max_queue_size:
+            self.rejected += 1
+            logger.warning(f"Spam inference queue is full ({self.pending} pending). Message skipped.")
+            return None
+        if chat_id is not None and self._pending_by_group[chat_id] >= self.max_pending_per_group:
+            self.group_rejected += 1
+            logger.warning(f"Group {chat_id} has {self._pending_by_group[chat_id]} texts pending inference. Message skipped.")
+            return None
+
+        self.pending += 1
+        self._pending_by_group[chat_id] += 1
+        start_time = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._batcher.submit(input_text, key=chat_id), timeout=self.timeout)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Spam inference timed out after {time.monotonic() - start_time:.1f}s")
+            return None
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Spam inference failed: {e}")
+            return None
+        finally:
+            self.pending -= 1
+            self._pending_by_group[chat_id] -= 1
+            if not self._pending_by_group[chat_id]:
+                del self._pending_by_group[chat_id]
+
+    async def _classify_batch(self, input_texts: list):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, _classify_batch_in_worker, input_texts)
+        except BrokenProcessPool as e:
+            if self.ready:
+                self.ready = False
+                self.pool_crashes += 1
+                logger.error(f"Spam inference worker died: {e}. Rebuilding the pool")
+                # stopping the pool waits for the batches in flight, this one included
+                self._recovery_task = asyncio.create_task(self._recover_pool())
+            return [{"probability": 0.0, "label": UNAVAILABLE} for _ in input_texts]
+
+    async def _recover_pool(self):
+        await self._stop_pool()
+        self._warmup_task = None  # the next classify() warms up fresh workers
+        self._recovery_task = None
+
+    async def shutdown(self):
+        """
+        stop accepting work, cancel queued texts and wait for the workers to exit.
+        """
+        if self._recovery_task is not None:
+            await asyncio.gather(self._recovery_task, return_exceptions=True)
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+            self._warmup_task = None
+        self.ready = False
+        await self._stop_pool()
+
+    async def _stop_pool(self):
+        if self._executor is None:
+            return
+        await self._batcher.stop()
+        executor, self._executor = self._executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+        logger.info("Spam inference pool stopped")
+
+    def load(self, chat_id: int = None):
+        """
+        parameters:
+        - chat_id (int, optional): only count the texts of this group (default: all groups).
+
+        returns:
+        - tuple: (pending, oldest_wait), texts waiting for or in inference and seconds the oldest queued text waited.
+        """
+        if chat_id is None:
+            return self.pending, self._batcher.oldest_wait() if self._batcher else 0.0
+        return self._pending_by_group.get(chat_id, 0), self._batcher.oldest_wait(chat_id) if self._batcher else 0.0
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "ready": self.ready,
+            "cold_start_seconds": self.cold_start_seconds,
+            "warmup_failures": self.warmup_failures,
+            "model_backend": self.model_backend,
+            "loaded_backends": list(self.loaded_backends),
+            "not_ready": self.not_ready,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+            "group_rejected": self.group_rejected,
+            "pool_crashes": self.pool_crashes,
+            "pending_groups": len(self._pending_by_group),
+            "verdict_cache": self.verdict_cache.stats() if self.verdict_cache else {},
+            "batching": self._batcher.stats() if self._batcher else {},
+        }
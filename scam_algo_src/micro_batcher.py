@@ -0,0 +1,198 @@
+from collections import deque
+import asyncio
+import logging
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_ALL_KEYS = object()
+
+
+class MicroBatcher:
+    """
+    collects concurrent requests into batches of up to `max_batch_size` items, waiting at most
+    `max_wait_ms` milliseconds after the first item, and fans the batch results back to the callers.
+
+    items are queued per key (e.g. chat_id) and batches are filled by deficit round robin over the keys,
+    so one key flooding the batcher cannot make the other keys wait behind its backlog. a key with
+    weight 2 gets twice the share of a key with weight 1 while both have items queued.
+
+    parameters:
+    - process_batch (coroutine function): takes a list of items and returns a list of results in the same order.
+    - max_batch_size (int): max. number of items per batch.
+    - max_wait_ms (float): max. time the oldest item waits for the batch to fill up.
+    - max_concurrent_batches (int): number of batches processed at the same time (e.g. one per worker).
+    - weights (dict, optional): share per key, keys missing have weight 1.
+
+    usage:
+    batcher = MicroBatcher(run_model_on_texts, max_batch_size=16, max_wait_ms=10)
+    batcher.start()
+    result = await batcher.submit("some text", key=chat_id)
+    await batcher.stop()
+    """
+
+    def __init__(self, process_batch, max_batch_size: int = 16, max_wait_ms: float = 10, max_concurrent_batches: int = 1, weights: dict = None):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max_concurrent_batches
+        if any(weight <= 0 for weight in (weights or {}).values()):
+            raise ValueError("MicroBatcher weights must be positive")
+        self.weights = weights or {}
+        self.batches = 0
+        self.items = 0
+        self._queues = {}  # key -> deque of (item, future, enqueued_at)
+        self._active = deque()  # keys with queued items, in round robin order
+        self._deficits = {}
+        self._queued = 0
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_concurrent_batches)
+        self._in_flight = set()
+        self._loop_task = None
+
+    def __len__(self):
+        return self._queued
+
+    def _oldest_enqueued_at(self):
+        return min(entries[0][2] for entries in self._queues.values())
+
+    def oldest_wait(self, key=_ALL_KEYS):
+        """
+        parameters:
+        - key (optional): only look at the items of this key (default: all keys).
+
+        returns:
+        - float: seconds the oldest queued item has been waiting, 0 if the queue is empty.
+        """
+        if key is _ALL_KEYS:
+            if not self._queued:
+                return 0.0
+            enqueued_at = self._oldest_enqueued_at()
+        else:
+            entries = self._queues.get(key)
+            if not entries:
+                return 0.0
+            enqueued_at = entries[0][2]
+        return asyncio.get_running_loop().time() - enqueued_at
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def submit(self, item, key=None):
+        """
+        queue an item of `key` for the next batch and wait for its result.
+        """
+        if self._loop_task is None:
+            raise RuntimeError("MicroBatcher is not running")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entries = self._queues.get(key)
+        if entries is None:
+            entries = self._queues[key] = deque()
+            self._deficits[key] = 0.0
+            self._active.append(key)
+        entries.append((item, future, loop.time()))
+        self._queued += 1
+        self._has_items.set()
+        if self._queued >= self.max_batch_size:
+            self._batch_full.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_items.wait()
+
+            # give the batch until the oldest item waited max_wait to fill up
+            deadline = self._oldest_enqueued_at() + self.max_wait
+            while self._queued < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._batch_full.clear()
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            batch = self._take_batch()
+            if not self._queued:
+                self._has_items.clear()
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._process(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    def _take_batch(self):
+        # deficit round robin: each visit of a key adds its weight to its deficit, every item costs 1
+        batch = []
+        while self._active and len(batch) < self.max_batch_size:
+            key = self._active[0]
+            entries = self._queues[key]
+            if self._deficits[key] < 1:
+                self._deficits[key] += self.weights.get(key, 1)
+            while entries and self._deficits[key] >= 1 and len(batch) < self.max_batch_size:
+                item, future, _ = entries.popleft()
+                self._queued -= 1
+                if not future.done():  # skip callers that already gave up
+                    batch.append((item, future))
+                    self._deficits[key] -= 1
+            if not entries:
+                self._active.popleft()
+                del self._queues[key]
+                del self._deficits[key]
+            elif self._deficits[key] < 1:
+                self._active.rotate(-1)
+        return batch
+
+    async def _process(self, batch):
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(batch)}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    async def stop(self):
+        """
+        stop batching, fail queued items and wait for the batches in flight.
+        """
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        for entries in self._queues.values():
+            for _, future, _ in entries:
+                if not future.done():
+                    future.set_exception(RuntimeError("MicroBatcher stopped"))
+        self._queues.clear()
+        self._active.clear()
+        self._deficits.clear()
+        self._queued = 0
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "queued": self._queued,
+            "queued_keys": len(self._active),
+            "in_flight_batches": len(self._in_flight),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
@@ -1,4 +1,6 @@
-from transformers import pipeline
+import os
+import shutil
+import tempfile
 import time
 import logging
 
@@ -6,12 +8,117 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# load the spam classification model
-try:
-    classification_pipeline = pipeline("text-classification", model="Titeiiko/OTIS-Official-Spam-Model")
-except Exception as e:
-    logger.error(f"Failed to load model: {str(e)}")
-    classification_pipeline = None
+MODEL_NAME = "Titeiiko/OTIS-Official-Spam-Model"
+MODEL_BACKENDS = ("pytorch", "quantized", "onnx")
+ONNX_EXPORT_DIR = os.path.join("models", "otis-onnx")
+
+# loaded lazily (see load_model), importing this module does not pull in torch/transformers
+classification_pipeline = None
+model_load_seconds = None
+loaded_backend = None  # backend that actually loaded (differs from the requested one after a fallback)
+
+def export_onnx_model(export_dir: str = ONNX_EXPORT_DIR):
+    """
+    export the model to an onnx graph in `export_dir` unless an export is already there.
+    the export is written to a temporary directory and moved into place, so workers starting at the
+    same time never load a half-written graph.
+
+    returns:
+    - str: directory holding the exported model and its tokenizer
+    """
+    if os.path.isfile(os.path.join(export_dir, "model.onnx")):
+        return export_dir
+    from transformers import AutoTokenizer
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    parent_dir = os.path.dirname(os.path.abspath(export_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix=".otis-onnx-", dir=parent_dir)
+    try:
+        start_time = time.time()
+        ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True).save_pretrained(temp_dir)
+        AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(temp_dir)
+        os.rename(temp_dir, export_dir)
+        logger.info(f"Exported spam model to onnx in {time.time() - start_time:.2f}s ({export_dir})")
+    except OSError:
+        if not os.path.isfile(os.path.join(export_dir, "model.onnx")):
+            raise
+        # exported concurrently by another worker
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return export_dir
+
+def load_pipeline(backend: str = "pytorch", onnx_dir: str = ONNX_EXPORT_DIR):
+    """
+    build the text-classification pipeline for the requested cpu backend.
+
+    parameters:
+    - backend (str): "pytorch" (full precision), "quantized" (dynamic int8 linear layers) or
+      "onnx" (onnx runtime graph, requires optimum[onnxruntime])
+    - onnx_dir (str): directory the onnx graph is exported to once and loaded from afterwards
+
+    returns:
+    - pipeline: hugging face text-classification pipeline
+    """
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+
+    if backend == "pytorch":
+        return pipeline("text-classification", model=MODEL_NAME)
+    if backend == "quantized":
+        import torch
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("text-classification", model=model, tokenizer=tokenizer)
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        export_dir = export_onnx_model(onnx_dir)
+        model = ORTModelForSequenceClassification.from_pretrained(export_dir)
+        tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        return pipeline("text-classification", model=model, tokenizer=tokenizer)
+    raise ValueError(f"Unknown model backend: {backend}. Choose one of {MODEL_BACKENDS}")
+
+def load_model(backend: str = "pytorch", onnx_dir: str = ONNX_EXPORT_DIR):
+    """
+    load the spam classification model once per process. falls back to the pytorch backend
+    if the requested one can't be loaded, `loaded_backend` tells which one is in use.
+
+    returns:
+    - pipeline: the loaded pipeline, or none if loading failed
+    """
+    global classification_pipeline, model_load_seconds, loaded_backend
+    if classification_pipeline is not None or model_load_seconds is not None:
+        return classification_pipeline  # already loaded (or already failed) in this process
+
+    start_time = time.time()
+    try:
+        classification_pipeline = load_pipeline(backend, onnx_dir)
+        loaded_backend = backend
+    except Exception as e:
+        logger.error(f"Failed to load model with {backend} backend: {str(e)}")
+        if backend != "pytorch":
+            try:
+                classification_pipeline = load_pipeline("pytorch")
+                loaded_backend = "pytorch"
+                logger.warning(f"Falling back to the pytorch backend instead of {backend}")
+            except Exception as e:
+                logger.error(f"Failed to load model: {str(e)}")
+    model_load_seconds = time.time() - start_time
+    if classification_pipeline is not None:
+        logger.info(f"Spam model loaded with {loaded_backend} backend in {model_load_seconds:.2f}s")
+    return classification_pipeline
+
+def warmup(backend: str = "pytorch", onnx_dir: str = ONNX_EXPORT_DIR):
+    """
+    load the model and run one forward pass so the first real message doesn't pay for lazy initialisation.
+
+    returns:
+    - tuple: (seconds it took to load the model, backend that loaded), or none if loading failed
+    """
+    if load_model(backend, onnx_dir) is None:
+        return None
+    analyze_messages(["Hello everyone, welcome to the group!"])
+    return model_load_seconds, loaded_backend
 
 def is_greeting(input_text: str):
     """
@@ -30,34 +137,59 @@ def is_greeting(input_text: str):
             return True
     return False
 
-def analyze_message(input_text: str):
+def postprocess_result(input_text: str, result: dict):
     """
-    analyze the input text to determine if it is spam or not.
+    turn a raw pipeline result into the analysis dict, de-boosting greetings classified as spam.
 
     parameters:
-    - input_text (str): text to analyze
+    - input_text (str): analyzed text
+    - result (dict): raw pipeline output, e.g. {"label": "LABEL_1", "score": 0.93}
 
     returns:
     - dict: dictionary containing the probability of spam and the label (spam or not spam)
     """
-    if classification_pipeline is None:
-        logger.error("Model not loaded properly. Cannot classify the message.")
+    # check if the message is a greeting
+    if is_greeting(input_text):
+        # deboost greetings if classified as spam
+        if result["label"] == "LABEL_1":
+            result["score"] = max(result["score"] - 0.4, 0)  # deboost by 0.4
+
+    tag = "not spam" if result["label"] == "LABEL_0" else "spam"
+    return {"probability": result["score"], "label": tag}
+
+def analyze_messages(input_texts: list):
+    """
+    analyze a batch of texts with a single padded forward pass.
+
+    parameters:
+    - input_texts (list): texts to analyze
+
+    returns:
+    - list: one analysis dict per text (same order), or none if the model is not loaded
+    """
+    if load_model() is None:
+        logger.error("Model not loaded properly. Cannot classify the messages.")
         return None
 
     try:
         start_time = time.time()
-        result = classification_pipeline(input_text)[0]
+        results = classification_pipeline(input_texts, batch_size=len(input_texts), truncation=True)
         duration = time.time() - start_time
+        logger.info(f"Total time (s): {duration:.3f} for batch of {len(input_texts)}")
+        return [postprocess_result(text, result) for text, result in zip(input_texts, results)]
+    except Exception as e:
+        logger.error(f"Error analyzing messages: {str(e)}")
+        return [{"probability": 0, "label": "error"} for _ in input_texts]
 
-        # check if the message is a greeting
-        if is_greeting(input_text):
-            # deboost greetings if classified as spam
-            if result["label"] == "LABEL_1":
-                result["score"] = max(result["score"] - 0.4, 0)  # deboost by 0.4
+def analyze_message(input_text: str):
+    """
+    analyze the input text to determine if it is spam or not.
 
-        tag = "not spam" if result["label"] == "LABEL_0" else "spam"
-        logger.info(f"Total time (s): {duration:.3f}")
-        return {"probability": result["score"], "label": tag}
-    except Exception as e:
-        logger.error(f"Error analyzing message: {str(e)}")
-        return {"probability": 0, "label": "error"}
+    parameters:
+    - input_text (str): text to analyze
+
+    returns:
+    - dict: dictionary containing the probability of spam and the label (spam or not spam)
+    """
+    results = analyze_messages([input_text])
+    return results[0] if results else None
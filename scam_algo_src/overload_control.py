@@ -0,0 +1,116 @@
+from collections import Counter
+import logging
+import random
+from scam_algo_src.prefilter import is_low_risk
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# load levels
+NORMAL = "normal"
+DEGRADED = "degraded"
+SHEDDING = "shedding"
+
+# scan decisions
+USE_MODEL = "model"
+USE_HEURISTIC = "heuristic"
+SKIP = "skip"
+SAMPLED = "sampled"  # sent to the model while shedding
+
+
+class OverloadController:
+    """
+    decides how a message the pre-filter could not decide on is scanned, based on the inference backlog of
+    the group the message was sent in.
+
+    - normal: every message goes to the model.
+    - degraded (backlog past `degrade_depth` texts or `degrade_age` seconds): low-risk messages are skipped,
+      the others still go to the model.
+    - shedding (backlog past `shed_depth` texts or `shed_age` seconds): low-risk messages are skipped, a
+      `sample_rate` share of the others goes to the model and the rest is scored heuristically.
+
+    the inference queue serves the groups round robin, so the wait of a group's text depends on that group's
+    own backlog: a flooding group is degraded while the other groups are still scanned normally. if all groups
+    wait long because the workers cannot keep up, every group's oldest text ages and all of them degrade.
+
+    parameters:
+    - spam_inference (SpamInferenceService): service whose backlog is watched.
+    - degrade_depth (int), degrade_age (float): thresholds of the degraded level.
+    - shed_depth (int), shed_age (float): thresholds of the shedding level.
+    - sample_rate (float): share of the risky messages still sent to the model while shedding.
+
+    usage:
+    overload_control = OverloadController(spam_inference)
+    decision = overload_control.decide(features, chat_id=chat_id)  # "model", "heuristic", "skip" or "sampled"
+    """
+
+    def __init__(self, spam_inference, degrade_depth: int = 32, degrade_age: float = 2, shed_depth: int = 96, shed_age: float = 5, sample_rate: float = 0.1):
+        self.spam_inference = spam_inference
+        self.degrade_depth = degrade_depth
+        self.degrade_age = degrade_age
+        self.shed_depth = shed_depth
+        self.shed_age = shed_age
+        self.sample_rate = sample_rate
+        self.level = NORMAL  # of the last group decided on
+        self.decisions = Counter()
+        self.levels = Counter()
+        self._group_levels = {}  # groups above normal
+
+    def current_level(self, chat_id: int = None):
+        """
+        parameters:
+        - chat_id (int, optional): group whose backlog decides (default: the backlog of all groups).
+
+        returns:
+        - str: NORMAL, DEGRADED or SHEDDING.
+        """
+        pending, oldest_wait = self.spam_inference.load(chat_id)
+        if pending >= self.shed_depth or oldest_wait >= self.shed_age:
+            level = SHEDDING
+        elif pending >= self.degrade_depth or oldest_wait >= self.degrade_age:
+            level = DEGRADED
+        else:
+            level = NORMAL
+        previous = self._group_levels.get(chat_id, NORMAL)
+        if level != previous:
+            logger.warning(f"Spam scanning load level of group {chat_id} {previous} -> {level} ({pending} pending, oldest waiting {oldest_wait:.1f}s)")
+            if level == NORMAL:
+                del self._group_levels[chat_id]
+            else:
+                self._group_levels[chat_id] = level
+        self.level = level
+        return level
+
+    def decide(self, features, chat_id: int = None):
+        """
+        parameters:
+        - features (MessageFeatures, optional): pre-filter features of the message, none sends it to the model.
+        - chat_id (int, optional): group the message was sent in.
+
+        returns:
+        - str: USE_MODEL, USE_HEURISTIC, SKIP or SAMPLED.
+        """
+        level = self.current_level(chat_id)
+        self.levels[level] += 1
+        if level == NORMAL or features is None:
+            decision = USE_MODEL
+        elif is_low_risk(features):
+            decision = SKIP
+        elif level == DEGRADED:
+            decision = USE_MODEL
+        else:
+            decision = SAMPLED if random.random() < self.sample_rate else USE_HEURISTIC
+        self.decisions[decision] += 1
+        return decision
+
+    def stats(self):
+        total = sum(self.decisions.values())
+        shed = self.decisions[SKIP] + self.decisions[USE_HEURISTIC]
+        return {
+            "level": self.level,
+            "overloaded_groups": dict(Counter(self._group_levels.values())),
+            "decisions": dict(self.decisions),
+            "levels": dict(self.levels),
+            "shed_rate": shed / total if total else 0.0,
+        }
@@ -0,0 +1,171 @@
+from collections import Counter, defaultdict
+import ahocorasick
+import logging
+from scam_algo_src.verdict_cache import normalize_text
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# pre-filter decisions
+CLEARLY_HAM = "clearly_ham"
+CLEARLY_SPAM = "clearly_spam"
+NEEDS_MODEL = "needs_model"
+
+# entity types that give a scammer a way to move the victim elsewhere
+CONTACT_ENTITIES = {"url", "text_link", "mention", "text_mention", "phone_number", "email"}
+
+SPAM_KEYWORDS = [
+    "airdrop", "giveaway", "claim your", "claim now", "congratulations", "you won", "winner", "prize", "lottery",
+    "dm me", "inbox me", "message me", "contact me", "text me", "whatsapp", "click here", "join now",
+    "investment", "invest", "guaranteed", "profit", "double your", "earn", "per day", "per week", "passive income",
+    "crypto signals", "signals", "forex", "trading", "bitcoin", "btc", "usdt", "eth", "wallet", "seed phrase",
+    "recovery phrase", "private key", "withdraw", "presale", "pump", "free money", "limited offer", "loan",
+    "make money", "work from home", "spots left", "dear", "verify your", "suspended",
+]
+
+# words a plain greeting or thank-you is made of ("gm everyone", "good morning all", "thanks guys")
+GREETING_WORDS = {
+    "hi", "hello", "hey", "heya", "yo", "gm", "gn", "good", "morning", "afternoon", "evening", "night", "day",
+    "everyone", "everybody", "all", "guys", "team", "fam", "folks", "frens", "friends", "there",
+    "thanks", "thank", "you", "thx", "ty", "welcome", "bye", "cheers",
+}
+
+
+def build_keyword_automaton(keywords: list):
+    """
+    build an aho-corasick automaton matching whole words/phrases of the normalized text in one pass.
+    """
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        normalized = normalize_text(keyword)
+        automaton.add_word(f" {normalized} ", normalized)
+    automaton.make_automaton()
+    return automaton
+
+
+class MessageFeatures:
+    """
+    cheap features of a message used by the pre-filter stages.
+
+    parameters:
+    - input_text (str): raw message text
+    - entity_types (list): telegram entity types of the message (e.g. ["url", "mention"])
+    - automaton (ahocorasick.Automaton): spam keyword automaton
+    """
+
+    def __init__(self, input_text: str, entity_types, automaton):
+        normalized = normalize_text(input_text)
+        self.length = len(input_text)
+        self.words = normalized.split()
+        self.word_count = len(self.words)
+        self.entity_types = set(entity_types or [])
+        self.has_contact = bool(self.entity_types & CONTACT_ENTITIES)
+        self.letter_ratio = sum(char.isalpha() for char in input_text) / self.length if self.length else 0.0
+        self.digit_ratio = sum(char.isdigit() for char in input_text) / self.length if self.length else 0.0
+        self.keyword_hits = {keyword for _, keyword in automaton.iter(f" {normalized} ")} if normalized else set()
+
+
+# default stages: each returns (decision, probability) or none to pass the message on
+def short_message_stage(features: MessageFeatures):
+    """short replies without contacts, keywords or numbers ("ok", "thanks!", "see you tomorrow")"""
+    if features.word_count <= 3 and not features.has_contact and not features.keyword_hits and not features.digit_ratio:
+        return CLEARLY_HAM, 0.0
+    return None
+
+
+def greeting_stage(features: MessageFeatures):
+    """messages made of greeting words only ("gm everyone", "good morning guys", "thank you all")"""
+    if 0 < features.word_count <= 8 and not features.has_contact and all(word in GREETING_WORDS for word in features.words):
+        return CLEARLY_HAM, 0.0
+    return None
+
+
+def no_letters_stage(features: MessageFeatures):
+    """emoji, stickers-as-text, numbers and other messages with barely any letters"""
+    if features.letter_ratio < 0.3 and not features.has_contact and features.digit_ratio < 0.3:
+        return CLEARLY_HAM, 0.0
+    return None
+
+
+def keyword_stage(features: MessageFeatures):
+    """many scam keywords combined with a contact vector is spam. the absence of keywords proves nothing, the model decides"""
+    if features.has_contact and len(features.keyword_hits) >= 3:
+        return CLEARLY_SPAM, min(0.6 + 0.1 * len(features.keyword_hits), 0.99)
+    return None
+
+
+DEFAULT_STAGES = [short_message_stage, greeting_stage, no_letters_stage, keyword_stage]
+
+
+def heuristic_spam_probability(features: MessageFeatures):
+    """
+    rough spam probability from keywords & contact vectors, used in place of the model under overload.
+    a contact plus two keywords crosses the 0.6 alert threshold.
+    """
+    probability = 0.2 + 0.15 * len(features.keyword_hits) + (0.15 if features.has_contact else 0.0)
+    return min(probability, 0.95)
+
+
+def is_low_risk(features: MessageFeatures):
+    """no contact vector and at most one scam keyword"""
+    return not features.has_contact and len(features.keyword_hits) <= 1
+
+
+class SpamPreFilter:
+    """
+    pluggable pre-filter in front of the transformer. stages run in order, the first one that
+    returns a decision wins, messages no stage decides on are left to the model.
+
+    parameters:
+    - stages (list, optional): stage callables taking MessageFeatures and returning (decision, probability) or none.
+    - keywords (list, optional): spam keywords for the keyword automaton.
+
+    usage:
+    prefilter = SpamPreFilter()
+    decision, probability = prefilter.classify("gm everyone!", entity_types=[])  # ("clearly_ham", 0.0)
+    """
+
+    def __init__(self, stages: list = None, keywords: list = None):
+        self.stages = stages if stages is not None else list(DEFAULT_STAGES)
+        self.automaton = build_keyword_automaton(keywords if keywords is not None else SPAM_KEYWORDS)
+        self.decisions = Counter()
+        self.stage_decisions = defaultdict(Counter)
+
+    def classify(self, input_text: str, entity_types=None):
+        """
+        returns:
+        - tuple: (decision, probability), decision is CLEARLY_HAM, CLEARLY_SPAM or NEEDS_MODEL.
+        """
+        decision, probability, _ = self.analyze(input_text, entity_types)
+        return decision, probability
+
+    def analyze(self, input_text: str, entity_types=None):
+        """
+        like classify(), additionally returns the MessageFeatures (none if they could not be computed).
+
+        returns:
+        - tuple: (decision, probability, features)
+        """
+        features = None
+        try:
+            features = MessageFeatures(input_text, entity_types, self.automaton)
+            for stage in self.stages:
+                outcome = stage(features)
+                if outcome is not None:
+                    self.decisions[outcome[0]] += 1
+                    self.stage_decisions[stage.__name__][outcome[0]] += 1
+                    return outcome[0], outcome[1], features
+        except Exception as e:
+            logger.error(f"Error in spam pre-filter: {e}")
+        self.decisions[NEEDS_MODEL] += 1
+        return NEEDS_MODEL, None, features
+
+    def stats(self):
+        total = sum(self.decisions.values())
+        return {
+            "total": total,
+            "decisions": dict(self.decisions),
+            "stages": {stage: dict(counts) for stage, counts in self.stage_decisions.items()},
+            "model_rate": self.decisions[NEEDS_MODEL] / total if total else 0.0,
+        }
@@ -0,0 +1,99 @@
+import hashlib
+import logging
+import re
+import unicodedata
+from database.cache import TTLCache
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ZERO_WIDTH_CHARS = re.compile(r"[\u200b-\u200f\u2060\ufeff]")
+NON_WORD_CHARS = re.compile(r"[^\w\s]+")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(input_text: str):
+    """
+    normalize a message so trivially modified copies of the same text compare equal.
+    unicode look-alikes are folded (NFKC), case, zero-width characters, punctuation, emoji and
+    extra whitespace are dropped.
+
+    parameters:
+    - input_text (str): raw message text
+
+    returns:
+    - str: normalized text
+    """
+    text = unicodedata.normalize("NFKC", input_text).casefold()
+    text = ZERO_WIDTH_CHARS.sub("", text)
+    text = NON_WORD_CHARS.sub(" ", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def text_fingerprint(input_text: str):
+    """
+    returns:
+    - str: sha256 hex digest of the normalized text
+    """
+    return hashlib.sha256(normalize_text(input_text).encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """
+    two-tier cache of spam verdicts keyed by the fingerprint of the normalized message text.
+
+    tier 1 is an in-process LRU+TTL cache. tier 2 (optional) is the SpamVerdicts collection, shared
+    across restarts and replicas.
+
+    parameters:
+    - maxsize (int): max. number of verdicts kept in memory.
+    - ttl (float): seconds a verdict stays valid (both tiers).
+    - db (MongoDBManager, optional): enables the shared mongodb tier.
+
+    usage:
+    cache = VerdictCache(maxsize=50000, ttl=21600, db=db)
+    verdict = await cache.get("Claim your prize now!")
+    await cache.set("Claim your prize now!", {"probability": 0.97, "label": "spam"})
+    """
+
+    def __init__(self, maxsize: int = 50000, ttl: float = 21600, db=None):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.db = db
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    async def get(self, input_text: str, fingerprint: str = None):
+        """
+        returns:
+        - dict: the cached verdict, or none on a miss.
+        """
+        fingerprint = fingerprint or text_fingerprint(input_text)
+        found, verdict = self.local.get(fingerprint)
+        if found:
+            return verdict
+        if self.db is None:
+            return None
+
+        verdict = await self.db.get_spam_verdict(fingerprint, max_age_seconds=self.ttl)
+        if verdict is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        self.local.set(fingerprint, verdict)
+        return verdict
+
+    async def set(self, input_text: str, verdict: dict, fingerprint: str = None):
+        fingerprint = fingerprint or text_fingerprint(input_text)
+        self.local.set(fingerprint, verdict)
+        if self.db is not None:
+            await self.db.set_spam_verdict(fingerprint, verdict)
+
+    def stats(self):
+        stats = self.local.stats()
+        stats["shared_hits"] = self.shared_hits
+        stats["shared_misses"] = self.shared_misses
+        lookups = stats["hits"] + stats["misses"]
+        stats["overall_hit_rate"] = (stats["hits"] + self.shared_hits) / lookups if lookups else 0.0
+        return stats
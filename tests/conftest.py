@@ -0,0 +1,34 @@
+import os
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmarks", action="store_true", help="also run the tests marked as benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def mongo_uri():
+    """
+    mongodb the database tests run against (MONGO_TEST_CONNECTION_STRING, default a local server).
+    every test gets its own throwaway database, see db_helpers.test_database.
+    """
+    pymongo = pytest.importorskip("pymongo")
+    pytest.importorskip("motor")
+    uri = os.getenv("MONGO_TEST_CONNECTION_STRING", "mongodb://localhost:27017/")
+    client = pymongo.MongoClient(uri, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip(f"mongodb not reachable at {uri}")
+    finally:
+        client.close()
+    return uri
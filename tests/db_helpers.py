@@ -0,0 +1,165 @@
+from contextlib import asynccontextmanager
+import uuid
+
+
+@asynccontextmanager
+async def test_database(uri: str, **kwargs):
+    """
+    MongoDBManager on a fresh database with all indexes, dropped afterwards.
+
+    usage:
+    async with test_database(mongo_uri) as db:
+        await db.register_vote(...)
+    """
+    from database.database import MongoDBManager  # motor is only needed once a test reaches mongodb
+    db = MongoDBManager(uri, db_name=f"guardy_test_{uuid.uuid4().hex[:12]}", **kwargs)
+    try:
+        await db.ensure_indexes()
+        yield db
+    finally:
+        await db.client.drop_database(db.db.name)
+        db.client.close()
+
+
+test_database.__test__ = False  # not a test, despite the name
+
+
+class QueryRecorder:
+    """
+    pymongo command listener keeping the filter of every query sent to one database.
+
+    usage:
+    recorder = QueryRecorder.install()
+    recorder.database_name = db.db.name
+    ...
+    recorder.queries  # [("find", "PrivateChats", {"user_id": 1}), ...]
+    """
+    _installed = None
+
+    def __init__(self):
+        self.database_name = None
+        self.queries = []
+
+    @classmethod
+    def install(cls):
+        # listeners registered globally apply to clients created afterwards, register only once per process
+        if cls._installed is None:
+            from pymongo import monitoring
+
+            class _Listener(monitoring.CommandListener):
+                def started(self, event):
+                    cls._installed._record(event)
+
+                def succeeded(self, event):
+                    pass
+
+                def failed(self, event):
+                    pass
+
+            cls._installed = cls()
+            monitoring.register(_Listener())
+        cls._installed.database_name = None
+        cls._installed.queries = []
+        return cls._installed
+
+    def _record(self, event):
+        if event.database_name != self.database_name:
+            return
+        command = event.command
+        name = event.command_name
+        if name == "find":
+            self.queries.append((name, command["find"], dict(command.get("filter", {}))))
+        elif name == "update":
+            self.queries.extend((name, command["update"], dict(update["q"])) for update in command["updates"])
+        elif name == "delete":
+            self.queries.extend((name, command["delete"], dict(delete["q"])) for delete in command["deletes"])
+        elif name == "findAndModify":
+            self.queries.append((name, command["findAndModify"], dict(command["query"])))
+
+
+class LatencyProxy:
+    """
+    tcp proxy in a background thread that delays every chunk by `delay` seconds in each direction,
+    so each mongodb round trip costs 2 * `delay` more.
+
+    usage:
+    with LatencyProxy("localhost", 27017, delay=0.025) as proxy:
+        db = MongoDBManager(proxy.uri)
+    """
+
+    def __init__(self, host: str, port: int, delay: float):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.uri = None
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        import asyncio
+        import threading
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+            port = server.sockets[0].getsockname()[1]
+            self.uri = f"mongodb://127.0.0.1:{port}/?directConnection=true"
+            ready.set()
+            self._loop.run_forever()
+            server.close()
+            connections = asyncio.all_tasks(self._loop)
+            for connection in connections:
+                connection.cancel()
+            self._loop.run_until_complete(asyncio.gather(*connections, return_exceptions=True))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _handle(self, client_reader, client_writer):
+        import asyncio
+        try:
+            server_reader, server_writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            client_writer.close()
+            return
+        try:
+            await asyncio.gather(self._pipe(client_reader, server_writer), self._pipe(server_reader, client_writer),
+                                 return_exceptions=True)
+        except asyncio.CancelledError:
+            pass  # proxy shutting down
+        finally:
+            client_writer.close()
+            server_writer.close()
+
+    async def _pipe(self, reader, writer):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        async def forward():
+            # keeps the order of the chunks, each one leaves `delay` after it arrived
+            while True:
+                due, chunk = await chunks.get()
+                await asyncio.sleep(max(0.0, due - loop.time()))
+                if chunk is None:
+                    writer.close()
+                    return
+                writer.write(chunk)
+                await writer.drain()
+
+        forwarder = asyncio.ensure_future(forward())
+        try:
+            while chunk := await reader.read(65536):
+                chunks.put_nowait((loop.time() + self.delay, chunk))
+            chunks.put_nowait((loop.time() + self.delay, None))
+            await forwarder
+        finally:
+            forwarder.cancel()
@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("telegram")
+from telegram import ChatMember, Update  # noqa: E402
+from bot.admin_cache import AdminRosterCache  # noqa: E402
+from bot.resource_utils import track_admin_changes  # noqa: E402
+
+CHAT_ID = -1001234567890
+BOT_ID = 123456
+OWNER_ID, ADMIN_ID, MEMBER_ID = 1, 2, 3
+FETCH_SECONDS = 0.05
+
+
+def user(user_id):
+    return {"id": user_id, "is_bot": user_id == BOT_ID, "first_name": f"user {user_id}"}
+
+
+def member(user_id, status=ChatMember.MEMBER):
+    if status == ChatMember.OWNER:
+        return {"status": status, "user": user(user_id), "is_anonymous": False}
+    if status == ChatMember.ADMINISTRATOR:
+        rights = ("can_manage_chat", "can_delete_messages", "can_manage_video_chats", "can_restrict_members", "can_change_info",
+                  "can_invite_users", "can_post_stories", "can_edit_stories", "can_delete_stories")
+        return {"status": status, "user": user(user_id), "can_be_edited": False, "is_anonymous": False,
+                "can_promote_members": False, **{right: True for right in rights}}
+    return {"status": status, "user": user(user_id)}
+
+
+def chat_member_update(user_id, old_status, new_status):
+    return Update.de_json({
+        "update_id": 1,
+        "chat_member": {
+            "chat": {"id": CHAT_ID, "type": "supergroup", "title": "guardy test"},
+            "from": user(OWNER_ID),
+            "date": int(time.time()),
+            "old_chat_member": member(user_id, old_status),
+            "new_chat_member": member(user_id, new_status),
+        },
+    }, None)
+
+
+class FakeBot:
+    """
+    serves the admin list of one chat, counting the get_chat_administrators requests.
+    """
+
+    def __init__(self):
+        self.id = BOT_ID
+        self.admins = {OWNER_ID: ChatMember.OWNER, ADMIN_ID: ChatMember.ADMINISTRATOR}
+        self.admin_requests = 0
+
+    async def get_chat_administrators(self, chat_id):
+        self.admin_requests += 1
+        await asyncio.sleep(FETCH_SECONDS)
+        return [ChatMember.de_json(member(user_id, status), None) for user_id, status in self.admins.items()]
+
+
+def test_concurrent_lookups_share_one_fetch():
+    async def scenario():
+        bot, roster = FakeBot(), AdminRosterCache(ttl=600)
+        checks = await asyncio.gather(*[roster.is_admin(bot, CHAT_ID, user_id) for user_id in (OWNER_ID, ADMIN_ID, MEMBER_ID) * 10])
+        cached_check = await roster.is_admin(bot, CHAT_ID, ADMIN_ID)
+        return checks, cached_check, bot.admin_requests, roster.stats()
+
+    checks, cached_check, admin_requests, stats = asyncio.run(scenario())
+    assert checks == [True, True, False] * 10
+    assert cached_check is True
+    assert admin_requests == 1
+    assert stats["fetches"] == 1
+
+
+def test_chat_member_updates_are_applied_without_a_refetch():
+    async def scenario():
+        bot, roster = FakeBot(), AdminRosterCache(ttl=600)
+        context = SimpleNamespace(bot=bot, bot_data={"admin_roster": roster})
+        await roster.get_admins(bot, CHAT_ID)
+        await track_admin_changes(chat_member_update(MEMBER_ID, ChatMember.MEMBER, ChatMember.ADMINISTRATOR), context)
+        await track_admin_changes(chat_member_update(ADMIN_ID, ChatMember.ADMINISTRATOR, ChatMember.MEMBER), context)
+        promoted, demoted = await roster.is_admin(bot, CHAT_ID, MEMBER_ID), await roster.is_admin(bot, CHAT_ID, ADMIN_ID)
+        # the bot removed from the group: the roster is dropped, the next lookup fetches again
+        await track_admin_changes(chat_member_update(BOT_ID, ChatMember.ADMINISTRATOR, ChatMember.LEFT), context)
+        await roster.get_admins(bot, CHAT_ID)
+        return promoted, demoted, bot.admin_requests
+
+    promoted, demoted, admin_requests = asyncio.run(scenario())
+    assert promoted is True
+    assert demoted is False
+    assert admin_requests == 2  # the first lookup and the one after the bot left
+
+
+def test_update_for_an_uncached_chat_is_ignored():
+    async def scenario():
+        bot, roster = FakeBot(), AdminRosterCache(ttl=600)
+        context = SimpleNamespace(bot=bot, bot_data={"admin_roster": roster})
+        await track_admin_changes(chat_member_update(MEMBER_ID, ChatMember.MEMBER, ChatMember.ADMINISTRATOR), context)
+        return len(roster.rosters), bot.admin_requests
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_roster_is_refetched_after_the_ttl():
+    ttl = 0.1
+
+    async def scenario():
+        bot, roster = FakeBot(), AdminRosterCache(ttl=ttl)
+        before = await roster.is_admin(bot, CHAT_ID, MEMBER_ID)
+        bot.admins[MEMBER_ID] = ChatMember.ADMINISTRATOR  # promoted, but the chat member update never arrived
+        within_ttl = await roster.is_admin(bot, CHAT_ID, MEMBER_ID)
+        await asyncio.sleep(ttl)
+        after_ttl = await roster.is_admin(bot, CHAT_ID, MEMBER_ID)
+        return before, within_ttl, after_ttl, bot.admin_requests
+
+    assert asyncio.run(scenario()) == (False, False, True, 2)
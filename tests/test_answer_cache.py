@@ -0,0 +1,106 @@
+import asyncio
+import math
+import time
+from bot.answer_cache import AnswerCache
+
+GROUP_ID = -1001
+OTHER_GROUP_ID = -1002
+QUESTION = "How do I set up Guardy?"
+ANSWER = "Add Guardy to your group and make it an admin."
+
+
+def unit_vector(similarity):
+    # cosine similarity `similarity` to the cached question's vector (1, 0, 0)
+    return [similarity, math.sqrt(1 - similarity ** 2), 0.0]
+
+
+class FakeEmbeddings:
+    """
+    fixed embeddings per normalized text, counting the embedding requests.
+    """
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = 0
+
+    async def embed(self, text):
+        self.calls += 1
+        if text not in self.vectors:
+            raise ValueError(f"no embedding for {text!r}")
+        return self.vectors[text]
+
+
+EMBEDDINGS = {
+    "how do i set up guardy": [1.0, 0.0, 0.0],
+    "how can i configure guardy": unit_vector(0.95),
+    "how do i install guardy": unit_vector(0.93),
+    "how do i remove guardy": unit_vector(0.91),
+    "what is the price of premium": [0.0, 0.0, 1.0],
+}
+
+
+def test_near_duplicate_questions_hit_after_normalization():
+    async def scenario():
+        answer_cache = AnswerCache()
+        await answer_cache.set(GROUP_ID, QUESTION, ANSWER)
+        answers = [await answer_cache.get(GROUP_ID, question)
+                   for question in ("how do i set up guardy", "  HOW do I set up   Guardy?!", "How do I set up Guardy 🤔", "How do I set up Guar\u200bdy?")]
+        return answers, answer_cache.stats()
+
+    answers, stats = asyncio.run(scenario())
+    assert answers == [ANSWER] * 4
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["size"]) == (4, 0, 1)
+
+
+def test_answers_are_isolated_per_group():
+    async def scenario():
+        embeddings = FakeEmbeddings(EMBEDDINGS)
+        answer_cache = AnswerCache(embed=embeddings.embed)
+        await answer_cache.set(GROUP_ID, QUESTION, ANSWER)
+        await answer_cache.set(OTHER_GROUP_ID, "What is the price of premium?", "5 USDT per month.")
+        return (await answer_cache.get(OTHER_GROUP_ID, QUESTION),
+                await answer_cache.get(OTHER_GROUP_ID, "How can I configure Guardy?"),
+                await answer_cache.get(GROUP_ID, "How can I configure Guardy?"))
+
+    exact_in_other_group, rephrased_in_other_group, rephrased_in_group = asyncio.run(scenario())
+    assert exact_in_other_group is None
+    assert rephrased_in_other_group is None
+    assert rephrased_in_group == ANSWER
+
+
+def test_expired_answers_miss():
+    ttl = 0.05
+
+    async def scenario():
+        embeddings = FakeEmbeddings(EMBEDDINGS)
+        answer_cache = AnswerCache(ttl=ttl, embed=embeddings.embed)
+        await answer_cache.set(GROUP_ID, QUESTION, ANSWER)
+        fresh = await answer_cache.get(GROUP_ID, QUESTION)
+        time.sleep(2 * ttl)
+        return fresh, await answer_cache.get(GROUP_ID, QUESTION), await answer_cache.get(GROUP_ID, "How can I configure Guardy?")
+
+    fresh, expired, expired_rephrased = asyncio.run(scenario())
+    assert fresh == ANSWER
+    assert expired is None
+    assert expired_rephrased is None  # the semantic match does not bring the expired answer back
+
+
+def test_semantic_match_needs_the_similarity_threshold():
+    async def scenario():
+        embeddings = FakeEmbeddings(EMBEDDINGS)
+        answer_cache = AnswerCache(embed=embeddings.embed, similarity_threshold=0.92)
+        await answer_cache.set(GROUP_ID, QUESTION, ANSWER)
+        answers = {question: await answer_cache.get(GROUP_ID, question)
+                   for question in ("How can I configure Guardy?", "How do I install Guardy?", "How do I remove Guardy?", "Is Guardy open source?")}
+        return answers, answer_cache.stats(), embeddings.calls
+
+    answers, stats, embedding_calls = asyncio.run(scenario())
+    assert answers == {
+        "How can I configure Guardy?": ANSWER,  # similarity 0.95
+        "How do I install Guardy?": ANSWER,  # similarity 0.93
+        "How do I remove Guardy?": None,  # similarity 0.91, below the threshold
+        "Is Guardy open source?": None,  # no embedding: a miss, not an error
+    }
+    assert stats["semantic_hits"] == 2
+    assert stats["embedding_failures"] == 1
+    assert embedding_calls == 5  # the cached question once, then each lookup once
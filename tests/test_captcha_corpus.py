@@ -0,0 +1,46 @@
+import asyncio
+from bot.captcha_corpus import CaptchaCorpus
+
+
+class FakeCorpusDb:
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.writes = 0
+
+    async def get_captcha_corpus(self):
+        return list(self.corpus)
+
+    async def add_captcha_to_corpus(self, file_id, answer, message_id):
+        self.writes += 1
+
+    async def remove_captchas_from_corpus(self, file_ids):
+        self.writes += 1
+
+
+def corpus_item(number):
+    return {"file_id": f"file-{number}", "answer": str(number), "message_id": number}
+
+
+def test_read_only_corpus_follows_the_maintaining_worker():
+    db = FakeCorpusDb([corpus_item(1), corpus_item(2)])
+
+    async def scenario():
+        # no pool & no bot: a read-only corpus never renders or uploads
+        corpus = CaptchaCorpus(db, captcha_pool=None, storage_chat_id=-100, read_only=True, refresh_interval=0.01)
+        await corpus.start(bot=None)
+        restored = {corpus.pick() for _ in range(50)}
+        db.corpus = [corpus_item(2), corpus_item(3)]  # shard 0 rotated image 1 out
+        await asyncio.sleep(0.05)
+        rotated = {corpus.pick() for _ in range(50)}
+        db.corpus = []  # failed load
+        await asyncio.sleep(0.05)
+        kept = len(corpus)
+        await corpus.stop()
+        return restored, rotated, kept, corpus.stats()
+
+    restored, rotated, kept, stats = asyncio.run(scenario())
+    assert restored == {("file-1", "1"), ("file-2", "2")}
+    assert rotated == {("file-2", "2"), ("file-3", "3")}
+    assert kept == 2
+    assert stats["read_only"] and stats["refreshes"] >= 2
+    assert stats["uploaded"] == stats["retired"] == db.writes == 0
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+import pytest
+from bot import captcha_pool
+from bot.captcha_pool import CaptchaPool
+from bot.stats_reporter import StatsReporter
+
+RENDER_SECONDS = 0.05
+
+
+def slow_render_batch(count, size_num, difficulty):
+    captchas = []
+    for _ in range(count):
+        time.sleep(RENDER_SECONDS)
+        captchas.append((b"png", "42", RENDER_SECONDS))
+    return captchas
+
+
+@pytest.fixture(autouse=True)
+def thread_workers(monkeypatch):
+    # threads instead of spawned processes, so the patched renderer applies
+    monkeypatch.setattr(captcha_pool, "ProcessPoolExecutor", lambda max_workers, mp_context: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(captcha_pool, "_render_captcha_batch", slow_render_batch)
+
+
+def test_on_demand_captcha_does_not_wait_behind_refill_batches():
+    async def scenario():
+        pool = CaptchaPool(size_num=2, difficulty=2, low_watermark=5, high_watermark=50, workers=1, refill_batch_size=10)
+        pool.start()  # refill starts, the pool is still empty
+        started = time.perf_counter()
+        png_bytes, answer = await pool.pop()
+        waited = time.perf_counter() - started
+        stats = pool.stats()
+        await pool.shutdown()
+        return png_bytes, answer, waited, stats
+
+    png_bytes, answer, waited, stats = asyncio.run(scenario())
+    assert (png_bytes, answer) == (b"png", "42")
+    assert waited < 4 * RENDER_SECONDS  # one render, not a refill batch of 10 first
+    assert stats["empty"] == stats["on_demand_renders"] == 1
+
+
+def test_drained_pool_refills_one_captcha_at_a_time():
+    async def scenario():
+        pool = CaptchaPool(size_num=2, difficulty=2, low_watermark=5, high_watermark=50, workers=1, refill_batch_size=10)
+        pool.start()
+        await asyncio.sleep(1.5 * RENDER_SECONDS)
+        depth_after_one_render = len(pool)
+        await asyncio.sleep(12 * RENDER_SECONDS)
+        depth_after_refill_batch = len(pool)
+        await pool.shutdown()
+        return depth_after_one_render, depth_after_refill_batch
+
+    depth_after_one_render, depth_after_refill_batch = asyncio.run(scenario())
+    assert depth_after_one_render == 1
+    assert depth_after_refill_batch >= 10
+
+
+def test_pool_depth_and_on_demand_renders_are_reported():
+    async def scenario():
+        pool = CaptchaPool(size_num=2, difficulty=2, low_watermark=1, high_watermark=3, workers=1, refill_batch_size=3)
+        reporter = StatsReporter({"captcha_pool": pool.stats})
+        await pool.pop()  # empty pool: rendered on demand, refill starts
+        await asyncio.sleep(6 * RENDER_SECONDS)
+        snapshot = reporter.snapshot()
+        await pool.shutdown()
+        return snapshot["captcha_pool"]
+
+    stats = asyncio.run(scenario())
+    assert stats["on_demand_renders"] == 1
+    assert stats["depth"] == 3
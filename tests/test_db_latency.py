@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import quote_plus
+import asyncio
+import statistics
+import time
+import pytest
+from db_helpers import test_database, LatencyProxy
+
+GROUP_ID = -1001234567890
+SCAM_MESSAGE_ID = 4242
+ONE_WAY_DELAY = 0.025  # 50ms per round trip
+CONCURRENT_UPDATES = 300
+
+
+class FakeVoteQuery:
+    def __init__(self, user_id):
+        self.data = "msg_check_vote_scam_yes"
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = SimpleNamespace(message_thread_id=SCAM_MESSAGE_ID, chat=SimpleNamespace(id=GROUP_ID))
+
+    async def answer(self, text=None, show_alert=False):
+        pass
+
+
+def proxied(mongo_uri):
+    from pymongo.uri_parser import parse_uri
+    parsed = parse_uri(mongo_uri)
+    host, port = parsed["nodelist"][0]
+    return host, port, parsed
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+@pytest.mark.benchmark
+def test_handler_latency_under_slow_database(mongo_uri):
+    pytest.importorskip("telegram")
+    import bot.group_message_handler as gmh
+    host, port, parsed = proxied(mongo_uri)
+
+    async def press(db, user_id):
+        query = FakeVoteQuery(user_id)
+        started = time.perf_counter()
+        await gmh.dispatch_group_msg_voting(query, SimpleNamespace(callback_query=query), db)
+        return time.perf_counter() - started
+
+    async def measure_loop_lag(stop, lags, interval=0.005):
+        # how late a coroutine that wants to run every 5ms gets scheduled
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    async def scenario(uri):
+        async with test_database(uri) as db:
+            deadline = datetime.now(timezone.utc) + timedelta(minutes=5)
+            await db.initialize_scam_voting(GROUP_ID, SCAM_MESSAGE_ID, 1, deadline)
+            # open the connection pool first, a real bot runs warm
+            await asyncio.gather(*[press(db, -user_id) for user_id in range(1, 101)])
+
+            stop, lags = asyncio.Event(), []
+            ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*[press(db, user_id) for user_id in range(1, CONCURRENT_UPDATES + 1)])
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await ticker
+            record = await db.delete_scam_voting(GROUP_ID, SCAM_MESSAGE_ID)
+            return latencies, lags, elapsed, record
+
+    with LatencyProxy(host, port, ONE_WAY_DELAY) as proxy:
+        uri = proxy.uri
+        if parsed["username"]:
+            credentials = f"{quote_plus(parsed['username'])}:{quote_plus(parsed['password'] or '')}@"
+            uri = uri.replace("mongodb://", f"mongodb://{credentials}") + f"&authSource={parsed['options'].get('authsource', 'admin')}"
+        latencies, lags, elapsed, record = asyncio.run(scenario(uri))
+
+    round_trip = 2 * ONE_WAY_DELAY
+    p50, p99 = statistics.median(latencies), percentile(latencies, 0.99)
+    print(f"\n{CONCURRENT_UPDATES} concurrent vote updates with {round_trip * 1000:.0f}ms per db round trip: "
+          f"handler p50 {p50 * 1000:.0f}ms, p99 {p99 * 1000:.0f}ms, all done in {elapsed:.2f}s, "
+          f"max event loop lag {max(lags) * 1000:.1f}ms "
+          f"(a blocking driver would need >= {CONCURRENT_UPDATES * round_trip:.1f}s)")
+    assert record["vote_scam_yes"] == CONCURRENT_UPDATES + 100
+    assert p99 < 10 * round_trip  # requests overlap instead of queueing behind each other
+    assert max(lags) < round_trip  # the event loop never waits for mongodb
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+import pytest
+
+pytest.importorskip("telegram")
+from telegram.error import BadRequest, NetworkError
+from bot.ephemeral_messages import EphemeralMessageManager
+
+CHAT_ID = -1001234567890
+
+
+class FakeBot:
+    def __init__(self, errors=()):
+        self.errors = list(errors)  # raised by the first requests, in order
+        self.requests = []
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.requests.append((chat_id, list(message_ids)))
+        if self.errors:
+            raise self.errors.pop(0)
+        return True
+
+
+class FakeDeletionsDb:
+    def __init__(self):
+        self.records = set()
+
+    async def add_pending_deletions(self, items):
+        self.records.update((item["chat_id"], item["message_id"]) for item in items)
+
+    async def get_pending_deletions(self):
+        return []
+
+    async def remove_pending_deletions(self, chat_id, message_ids):
+        self.records.difference_update((chat_id, message_id) for message_id in message_ids)
+
+
+async def run_deletions(bot, db, message_ids, wait, **kwargs):
+    manager = EphemeralMessageManager(db, batch_window=0, persist_after=0, retry_delay=0.02, **kwargs)
+    await manager.start(bot)
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=0.05)
+    for message_id in message_ids:
+        manager.schedule(CHAT_ID, message_id, expires_at)
+    await asyncio.sleep(0.02)
+    persisted_before = set(db.records)
+    await asyncio.sleep(wait)
+    await manager.stop()
+    return persisted_before, manager.stats()
+
+
+def test_failed_bulk_delete_is_retried_and_keeps_its_records_until_it_succeeds():
+    bot, db = FakeBot([NetworkError("timed out"), NetworkError("timed out")]), FakeDeletionsDb()
+    persisted_before, stats = asyncio.run(run_deletions(bot, db, [1, 2, 3], wait=0.3))
+    assert persisted_before == {(CHAT_ID, 1), (CHAT_ID, 2), (CHAT_ID, 3)}
+    assert bot.requests == [(CHAT_ID, [1, 2, 3])] * 3
+    assert db.records == set()
+    assert (stats["deleted"], stats["failures"], stats["retries"], stats["given_up"]) == (3, 2, 6, 0)
+
+
+def test_messages_already_gone_are_dropped_without_retry():
+    bot, db = FakeBot([BadRequest("Message to delete not found")]), FakeDeletionsDb()
+    _, stats = asyncio.run(run_deletions(bot, db, [1, 2], wait=0.2))
+    assert len(bot.requests) == 1
+    assert db.records == set()
+    assert (stats["already_gone"], stats["retries"]) == (2, 0)
+
+
+def test_retries_are_bounded_and_the_records_stay_for_the_next_start():
+    bot, db = FakeBot([BadRequest("Message can't be deleted")] * 10), FakeDeletionsDb()
+    _, stats = asyncio.run(run_deletions(bot, db, [1, 2], wait=0.5, max_retries=2))
+    assert len(bot.requests) == 3  # first attempt + 2 retries
+    assert db.records == {(CHAT_ID, 1), (CHAT_ID, 2)}
+    assert (stats["given_up"], stats["pending"]) == (2, 0)
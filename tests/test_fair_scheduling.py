@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import statistics
+import time
+import pytest
+from scam_algo_src import inference_service
+from scam_algo_src.inference_service import SpamInferenceService
+from scam_algo_src.overload_control import OverloadController, NORMAL, DEGRADED, SHEDDING
+
+BATCH_SECONDS = 0.02
+BATCH_SIZE = 16
+FLOODING_GROUP = -1001
+SMALL_GROUPS = [-2000 - number for number in range(20)]
+
+
+def slow_classify_batch(input_texts):
+    time.sleep(BATCH_SECONDS)  # one model forward pass, whatever the batch size
+    return [{"probability": 0.1, "label": "not spam"} for _ in input_texts]
+
+
+@pytest.fixture(autouse=True)
+def thread_workers(monkeypatch):
+    # threads instead of spawned processes, so the patched model applies
+    monkeypatch.setattr(inference_service, "ProcessPoolExecutor", lambda max_workers, mp_context, initializer, initargs: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(inference_service, "_warm_up_worker", lambda backend, onnx_dir: (0.0, backend))
+    monkeypatch.setattr(inference_service, "_classify_batch_in_worker", slow_classify_batch)
+
+
+async def ready_service(**kwargs):
+    service = SpamInferenceService(workers=1, max_batch_size=BATCH_SIZE, max_batch_wait_ms=5, timeout=60, **kwargs)
+    service.warm_up_in_background()
+    await service._warmup_task
+    return service
+
+
+async def timed_classify(service, text, chat_id):
+    started = time.perf_counter()
+    await service.classify(text, chat_id=chat_id)
+    return time.perf_counter() - started
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def test_flooding_group_does_not_degrade_the_other_groups():
+    async def scenario():
+        service = await ready_service(max_queue_size=1024, max_pending_per_group=512)
+        overload_control = OverloadController(service, degrade_depth=32, shed_depth=96)
+        flood = [asyncio.create_task(service.classify(f"flood {number}", chat_id=FLOODING_GROUP)) for number in range(300)]
+        await asyncio.sleep(3 * BATCH_SECONDS)
+        flooding_level = overload_control.current_level(FLOODING_GROUP)
+        small_levels = {overload_control.current_level(chat_id) for chat_id in SMALL_GROUPS}
+        small_latency = await timed_classify(service, "hello from a small group", SMALL_GROUPS[0])
+        stats = overload_control.stats()
+        await asyncio.gather(*flood)
+        await service.shutdown()
+        return flooding_level, small_levels, small_latency, stats
+
+    flooding_level, small_levels, small_latency, stats = asyncio.run(scenario())
+    assert flooding_level == SHEDDING
+    assert small_levels == {NORMAL}
+    assert small_latency < 4 * BATCH_SECONDS  # the next batch, not behind ~280 flood texts (~0.35s)
+    assert stats["overloaded_groups"] == {SHEDDING: 1}
+
+
+def test_all_groups_degrade_when_the_workers_fall_behind():
+    async def scenario():
+        service = await ready_service(max_queue_size=4096, max_pending_per_group=512)
+        overload_control = OverloadController(service, degrade_depth=32, degrade_age=0.1, shed_depth=96, shed_age=5)
+        # 20 groups with 20 texts each: every group under the depth thresholds, but 400 texts take 25 batches
+        texts = [asyncio.create_task(service.classify(f"text {number} of {chat_id}", chat_id=chat_id))
+                 for chat_id in SMALL_GROUPS for number in range(20)]
+        await asyncio.sleep(0.25)
+        levels = {overload_control.current_level(chat_id) for chat_id in SMALL_GROUPS}
+        await asyncio.gather(*texts)
+        await service.shutdown()
+        return levels
+
+    assert asyncio.run(scenario()) == {DEGRADED}
+
+
+@pytest.mark.benchmark
+def test_small_group_tail_latency_during_a_flood():
+    flood_texts = 2000  # 2.5x what the worker handles per second
+    rounds, round_interval = 20, 0.1
+
+    async def replay(per_group_queues):
+        service = await ready_service(max_queue_size=100000, max_pending_per_group=100000)
+
+        def key(chat_id):
+            return chat_id if per_group_queues else None  # none: one shared fifo queue
+
+        flood = [asyncio.create_task(timed_classify(service, f"flood {number}", key(FLOODING_GROUP))) for number in range(flood_texts)]
+        small = []
+        for round_number in range(rounds):
+            small += [asyncio.create_task(timed_classify(service, f"round {round_number} of {chat_id}", key(chat_id))) for chat_id in SMALL_GROUPS]
+            await asyncio.sleep(round_interval)
+        small_latencies = await asyncio.gather(*small)
+        flood_latencies = await asyncio.gather(*flood)
+        await service.shutdown()
+        return small_latencies, flood_latencies
+
+    fifo_small, fifo_flood = asyncio.run(replay(per_group_queues=False))
+    fair_small, fair_flood = asyncio.run(replay(per_group_queues=True))
+
+    def summary(latencies):
+        return f"p50 {statistics.median(latencies) * 1000:.0f}ms p99 {percentile(latencies, 0.99) * 1000:.0f}ms"
+
+    print(f"\n{flood_texts} texts of one group, {len(SMALL_GROUPS)} groups with one text per {round_interval * 1000:.0f}ms, "
+          f"{BATCH_SIZE} texts per {BATCH_SECONDS * 1000:.0f}ms batch:\n"
+          f"  shared fifo queue:  small groups {summary(fifo_small)}, flooding group {summary(fifo_flood)}\n"
+          f"  per-group queues:   small groups {summary(fair_small)}, flooding group {summary(fair_flood)}")
+    assert percentile(fair_small, 0.99) < 5 * BATCH_SECONDS
+    assert percentile(fair_small, 0.99) < percentile(fifo_small, 0.99) / 10
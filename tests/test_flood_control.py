@@ -0,0 +1,108 @@
+import gc
+import time
+import tracemalloc
+import pytest
+from bot import flood_control
+from bot.flood_control import FloodController
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(flood_control.time, "monotonic", clock)
+    return clock
+
+
+def test_more_than_limit_messages_within_window_flood(clock):
+    controller = FloodController(window_seconds=20)
+    assert not any(controller.hit(-1, 7, limit=3) for _ in range(3))
+    assert controller.hit(-1, 7, limit=3)
+
+
+def test_messages_spread_over_the_window_do_not_flood(clock):
+    controller = FloodController(window_seconds=20)
+    for _ in range(10):
+        assert not controller.hit(-1, 7, limit=3)
+        clock.now += 7
+
+
+def test_users_are_tracked_per_group(clock):
+    controller = FloodController(window_seconds=20)
+    for group_id in range(-1, -5, -1):
+        assert not controller.hit(group_id, 7, limit=1)
+    assert controller.stats()["tracked_users"] == 4
+
+
+def test_idle_users_are_evicted_oldest_first(clock):
+    controller = FloodController(window_seconds=20, evictions_per_hit=2)
+    for user_id in range(5):
+        controller.hit(-1, user_id, limit=3)
+        clock.now += 1
+    controller.hit(-1, 0, limit=3)  # user 0 becomes the most recent
+    clock.now += 18  # users 1..3 are idle, users 4 and 0 are not
+    controller.hit(-1, 99, limit=3)  # evicts users 1 and 2
+    assert list(controller.windows) == [(-1, 3), (-1, 4), (-1, 0), (-1, 99)]
+    assert controller.evict_idle() == 1
+    assert list(controller.windows) == [(-1, 4), (-1, 0), (-1, 99)]
+    assert controller.stats()["evicted"] == 3
+
+
+def test_reset_forgets_the_window(clock):
+    controller = FloodController(window_seconds=20)
+    for _ in range(3):
+        controller.hit(-1, 7, limit=2)
+    controller.reset(-1, 7)
+    assert not controller.hit(-1, 7, limit=2)
+
+
+@pytest.mark.benchmark
+def test_million_users_memory_and_throughput():
+    users = 1_000_000
+    groups = 5000
+
+    gc.collect()
+    tracemalloc.start()
+    controller = FloodController(window_seconds=20)
+    for user_id in range(users):
+        controller.hit(-100 - user_id % groups, user_id, limit=10)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del controller
+    gc.collect()
+
+    controller = FloodController(window_seconds=20)
+    started = time.perf_counter()
+    for user_id in range(users):
+        controller.hit(-100 - user_id % groups, user_id, limit=10)
+    first_messages = time.perf_counter() - started
+    started = time.perf_counter()
+    for user_id in range(users):
+        controller.hit(-100 - user_id % groups, user_id, limit=10)
+    repeat_messages = time.perf_counter() - started
+
+    # every user idle at once: a message still only evicts a few windows
+    later = time.monotonic() + 30
+    slowest = 0.0
+    for _ in range(10000):
+        started = time.perf_counter()
+        controller.evict_idle(later, controller.evictions_per_hit)
+        slowest = max(slowest, time.perf_counter() - started)
+    started = time.perf_counter()
+    evicted = controller.evict_idle(later)
+    full_eviction = time.perf_counter() - started
+
+    print(f"\n{users} users: {memory / 1e6:.0f} MB ({memory / users:.0f} B/user), "
+          f"{first_messages / users * 1e6:.2f}us per first message, {repeat_messages / users * 1e6:.2f}us per repeat message, "
+          f"slowest bounded eviction {slowest * 1e3:.2f}ms, explicit full eviction of {evicted} users {full_eviction:.2f}s")
+    assert memory / users < 512
+    assert repeat_messages / users < 50e-6
+    assert slowest < 0.05
+    assert len(controller.windows) == 0
@@ -0,0 +1,131 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import multiprocessing
+import os
+import pytest
+from scam_algo_src import inference_service
+from scam_algo_src.inference_service import SpamInferenceService
+from scam_algo_src.micro_batcher import MicroBatcher
+
+
+def use_thread_pool(service):
+    # threads instead of spawned processes, so the patched worker functions apply
+    starts = []
+
+    def start():
+        if service._executor is not None:
+            return
+        starts.append(1)
+        service._executor = ThreadPoolExecutor(max_workers=service.workers)
+        service._batcher = MicroBatcher(service._classify_batch, max_batch_size=service.max_batch_size,
+                                        max_wait_ms=service.max_batch_wait_ms, max_concurrent_batches=service.workers)
+        service._batcher.start()
+
+    service.start = start
+    return starts
+
+
+def test_failed_warmup_is_not_retried_per_message(monkeypatch):
+    warmups = []
+    monkeypatch.setattr(inference_service, "_warm_up_worker", lambda backend, onnx_dir: warmups.append(backend))
+
+    async def scenario():
+        service = SpamInferenceService(workers=1, warmup_retry_delay=60)
+        starts = use_thread_pool(service)
+        service.warm_up_in_background()
+        await service._warmup_task
+        for _ in range(100):
+            assert await service.classify("some message", chat_id=1) is None
+        assert service._warmup_task is None
+        assert service._executor is None  # workers with the cached failure are gone
+        assert service.warmup_failures == 1
+        assert service.not_ready == 100
+        assert len(starts) == 1
+        await service.shutdown()
+
+    asyncio.run(scenario())
+    assert warmups == ["pytorch"]
+
+
+def test_warmup_retries_back_off_and_recover(monkeypatch):
+    outcomes = [None, None, (1.5, "pytorch")]
+    monkeypatch.setattr(inference_service, "_warm_up_worker", lambda backend, onnx_dir: outcomes.pop(0))
+
+    async def scenario():
+        service = SpamInferenceService(workers=1, warmup_retry_delay=10, warmup_retry_max_delay=15)
+        use_thread_pool(service)
+        delays = []
+        for _ in range(3):
+            service._next_warmup_at = 0.0  # skip the wait
+            service.warm_up_in_background()
+            await service._warmup_task
+            delays.append(round(service._next_warmup_at - inference_service.time.monotonic()))
+        assert delays[:2] == [10, 15]  # doubled, capped at warmup_retry_max_delay
+        assert service.ready
+        assert service.warmup_failures == 0
+        assert service.stats()["loaded_backends"] == ["pytorch"]
+        await service.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_worker_falling_back_to_pytorch_is_reported(monkeypatch):
+    monkeypatch.setattr(inference_service, "_warm_up_worker", lambda backend, onnx_dir: (2.0, "pytorch"))
+
+    async def scenario():
+        service = SpamInferenceService(workers=2, model_backend="onnx")
+        use_thread_pool(service)
+        service.warm_up_in_background()
+        await service._warmup_task
+        stats = service.stats()
+        await service.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["model_backend"] == "onnx"
+    assert stats["loaded_backends"] == ["pytorch", "pytorch"]
+
+
+def warm_up_fake_worker(backend, onnx_dir):
+    return 0.0, backend
+
+
+def classify_or_crash_in_worker(input_texts):
+    if "crash" in input_texts:
+        os._exit(1)  # the worker is killed mid-batch, like an oom kill
+    return [{"probability": 0.1, "label": "not spam"} for _ in input_texts]
+
+
+def test_classification_recovers_after_a_worker_dies(monkeypatch):
+    # real worker processes, forked so they see the patched worker functions
+    fork = multiprocessing.get_context("fork")
+    monkeypatch.setattr(inference_service, "ProcessPoolExecutor", lambda max_workers, mp_context, initializer, initargs: ProcessPoolExecutor(max_workers, mp_context=fork))
+    monkeypatch.setattr(inference_service, "_warm_up_worker", warm_up_fake_worker)
+    monkeypatch.setattr(inference_service, "_classify_batch_in_worker", classify_or_crash_in_worker)
+
+    async def scenario():
+        service = SpamInferenceService(workers=1, max_batch_wait_ms=1)
+        service.warm_up_in_background()
+        await service._warmup_task
+        before = await service.classify("hello", chat_id=1)
+        crashed = await service.classify("crash", chat_id=1)
+        while service._recovery_task is not None:
+            await asyncio.sleep(0.01)
+        while_rebuilding = await service.classify("hello again", chat_id=1)  # starts fresh workers
+        await service._warmup_task
+        after = await service.classify("hello again", chat_id=1)
+        stats = service.stats()
+        await service.shutdown()
+        return before, crashed, while_rebuilding, after, stats
+
+    before, crashed, while_rebuilding, after, stats = asyncio.run(scenario())
+    assert before == after == {"probability": 0.1, "label": "not spam"}
+    assert crashed["label"] == inference_service.UNAVAILABLE
+    assert while_rebuilding is None
+    assert stats["ready"] and stats["pool_crashes"] == 1
+
+
+@pytest.fixture(autouse=True)
+def no_spawned_pools(monkeypatch):
+    # a test reaching the real process pool would spawn model workers
+    monkeypatch.setattr(inference_service, "ProcessPoolExecutor", None)
@@ -0,0 +1,135 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from scam_algo_src import otis_spam_model  # noqa: E402
+
+SAMPLE_TEXTS = [
+    "Hey, does anyone know when the next community call is?",
+    "Thanks for the help yesterday, the fix worked.",
+    "I think the docs are outdated, the install command changed.",
+    "Can an admin pin the roadmap please?",
+    "Lunch was great, see you all next week",
+    "CONGRATULATIONS! You won 5000 USDT, claim your prize now by messaging me",
+    "Earn $500 per day from home, guaranteed profit, DM me for details",
+    "Free airdrop for the first 100 members, connect your wallet at the link",
+    "Send me your seed phrase and I will recover your lost funds",
+    "Crypto signals with 98% accuracy, join my VIP channel today",
+]
+
+# dynamic int8 quantization moves scores a little, the onnx graph runs the same fp32 weights
+SCORE_TOLERANCE = {"quantized": 0.05, "onnx": 1e-3}
+
+
+def spam_probabilities(pipeline, texts):
+    # probability of LABEL_1 (spam), independent of the label the pipeline ranked first
+    results = pipeline(texts, batch_size=len(texts), truncation=True)
+    return [result["score"] if result["label"] == "LABEL_1" else 1 - result["score"] for result in results]
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("models") / "otis-onnx")
+
+
+@pytest.fixture(scope="module")
+def pipelines(onnx_dir):
+    loaded = {}
+    for backend in otis_spam_model.MODEL_BACKENDS:
+        if backend == "onnx" and not _has_optimum():
+            continue
+        try:
+            loaded[backend] = otis_spam_model.load_pipeline(backend, onnx_dir)
+        except OSError as e:
+            pytest.skip(f"spam model not available: {e}")
+    return loaded
+
+
+def _has_optimum():
+    try:
+        import optimum.onnxruntime  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+@pytest.mark.parametrize("backend", ["quantized", "onnx"])
+def test_backend_matches_pytorch_scores(pipelines, backend):
+    if backend not in pipelines:
+        pytest.skip(f"{backend} backend not installed")
+    expected = spam_probabilities(pipelines["pytorch"], SAMPLE_TEXTS)
+    actual = spam_probabilities(pipelines[backend], SAMPLE_TEXTS)
+    for text, want, got in zip(SAMPLE_TEXTS, expected, actual):
+        assert (got >= 0.5) == (want >= 0.5), f"label differs for {text!r}: {got:.3f} vs {want:.3f}"
+        assert got == pytest.approx(want, abs=SCORE_TOLERANCE[backend]), text
+
+
+def test_onnx_export_is_reused(pipelines, onnx_dir):
+    if "onnx" not in pipelines:
+        pytest.skip("onnx backend not installed")
+    started = time.perf_counter()
+    assert otis_spam_model.export_onnx_model(onnx_dir) == onnx_dir
+    assert time.perf_counter() - started < 1  # no second export
+
+
+@pytest.mark.benchmark
+def test_backend_latency_and_throughput(pipelines):
+    rounds = 20
+    batch = SAMPLE_TEXTS + SAMPLE_TEXTS[:6]  # 16 texts, the default SPAM_BATCH_MAX_SIZE
+    print()
+    for backend, pipeline in pipelines.items():
+        pipeline(SAMPLE_TEXTS[:1])  # warm up
+        single = []
+        for text in SAMPLE_TEXTS * 2:
+            started = time.perf_counter()
+            pipeline([text], truncation=True)
+            single.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            pipeline(batch, batch_size=len(batch), truncation=True)
+        throughput = rounds * len(batch) / (time.perf_counter() - started)
+        single.sort()
+        print(f"{backend:>9}: single text p50 {statistics.median(single) * 1000:.1f}ms "
+              f"p95 {single[int(len(single) * 0.95) - 1] * 1000:.1f}ms, "
+              f"batch of {len(batch)} {throughput:.0f} texts/s")
+
+
+COLD_START_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from scam_algo_src import otis_spam_model
+imported = time.perf_counter() - started
+mode = sys.argv[1]
+if mode == "eager":  # the old module-level pipeline: loaded while the bot starts
+    otis_spam_model.load_model()
+elif mode == "warmed":  # lazy, warm-up pass done in the background before the first message
+    otis_spam_model.warmup()
+ready = time.perf_counter() - started
+first_started = time.perf_counter()
+result = otis_spam_model.analyze_messages(["Earn $500 per day from home, DM me for details"])
+first_classification = time.perf_counter() - first_started
+print(json.dumps({"import": imported, "ready": ready, "first": first_classification, "ok": bool(result) and result[0]["label"] != "error"}))
+"""
+
+
+@pytest.mark.benchmark
+def test_cold_start_lazy_vs_eager(pipelines):
+    # fresh interpreters, so every mode pays its own imports and model load
+    timings = {}
+    for mode in ("eager", "lazy", "warmed"):
+        output = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT, mode], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        timings[mode] = json.loads(output.stdout.strip().splitlines()[-1])
+        assert timings[mode]["ok"]
+    print(f"\neager load at startup: bot ready after {timings['eager']['ready']:.2f}s, first classification {timings['eager']['first'] * 1000:.0f}ms"
+          f"\nlazy, no warm-up:      bot ready after {timings['lazy']['ready']:.2f}s, first classification {timings['lazy']['first']:.2f}s"
+          f"\nlazy + warm-up:        warm-up done after {timings['warmed']['ready']:.2f}s (in the background), first classification {timings['warmed']['first'] * 1000:.0f}ms")
+    assert timings["lazy"]["import"] < timings["eager"]["ready"]  # importing no longer loads the model
+    assert timings["warmed"]["first"] < timings["lazy"]["first"]  # the warm-up pass takes the lazy initialisation off the first message
@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("telegram")
+from bot import openai_utils  # noqa: E402
+from bot.openai_utils import SupportAssistant, activate_premium_assistance  # noqa: E402
+
+CHAT_ID = -1001234
+BOT_USERNAME = "guardy_test_bot"
+EDIT_INTERVAL = 0.2
+CHUNK_DELAY = 0.05
+FIRST_TOKEN_DELAY = 0.1
+CHUNKS = ["Guardy ", "removes ", "spam ", "from ", "your ", "group ", "and ", "verifies ", "new ", "members ",
+          "with ", "a ", "captcha ", "or ", "a ", "web ", "check", "【4:0†source】", ".", ""]
+
+
+def text_delta(value):
+    content = SimpleNamespace(type="text", text=SimpleNamespace(value=value))
+    return SimpleNamespace(event="thread.message.delta", data=SimpleNamespace(delta=SimpleNamespace(content=[content])))
+
+
+class FakeRunStream:
+    """
+    the assistant run events of one answer, streamed with a fixed delay per text chunk.
+    """
+
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    async def __aiter__(self):
+        yield SimpleNamespace(event="thread.run.created", data=None)
+        await asyncio.sleep(FIRST_TOKEN_DELAY - CHUNK_DELAY)
+        for number, chunk in enumerate(self.chunks):
+            if number == self.fail_after:
+                raise ConnectionError("stream interrupted")
+            await asyncio.sleep(CHUNK_DELAY)
+            yield text_delta(chunk)
+        yield SimpleNamespace(event="thread.run.completed", data=None)
+
+
+class FakeBot:
+    def __init__(self):
+        self.username = BOT_USERNAME
+        self.edits = []
+
+    async def edit_message_text(self, text, chat_id, message_id, parse_mode=None):
+        self.edits.append((time.monotonic(), text))
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        return SimpleNamespace(chat_id=chat_id, message_id=2)
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+        self.chat = SimpleNamespace(send_action=self.send_action)
+        self.replies = []
+
+    async def reply_text(self, text, parse_mode=None):
+        self.replies.append(text)
+        return SimpleNamespace(chat_id=CHAT_ID, message_id=2)
+
+    async def send_action(self, action):
+        pass
+
+
+@pytest.fixture
+def assistant(monkeypatch):
+    assistant = SupportAssistant(assistant_id="asst_test", api_key="sk-test")
+    monkeypatch.setattr(openai_utils, "_support_assistant", assistant)
+    monkeypatch.setattr(openai_utils, "STREAM_EDIT_INTERVAL", EDIT_INTERVAL)
+    monkeypatch.setattr(openai_utils.CONFIG, "GUARDY_USERNAME", f"@{BOT_USERNAME}")
+    monkeypatch.setitem(openai_utils.config.premium_groups, "premium_groups_id", [CHAT_ID])
+    return assistant
+
+
+async def ask(assistant, stream):
+    async def create_thread_and_run(user_message):
+        return stream
+
+    assistant.create_thread_and_run = create_thread_and_run
+    bot = FakeBot()
+    message = FakeMessage(f"@{BOT_USERNAME} what does guardy do?")
+    context = SimpleNamespace(bot=bot, bot_data={})
+    started = time.monotonic()
+    await activate_premium_assistance(SimpleNamespace(message=message), context, CHAT_ID, "asst_test", "sk-test")
+    return bot.edits, time.monotonic() - started
+
+
+def test_streamed_answer_edits_the_placeholder_at_most_once_per_interval(assistant):
+    edits, elapsed = asyncio.run(ask(assistant, FakeRunStream(CHUNKS)))
+    edit_times = [edit_time for edit_time, _ in edits]
+    progressive_gaps = [later - earlier for earlier, later in zip(edit_times[:-2], edit_times[1:-1])]
+
+    assert 2 <= len(edits) <= elapsed / EDIT_INTERVAL + 1  # progressive edits plus the final answer
+    assert all(gap >= EDIT_INTERVAL for gap in progressive_gaps)
+    assert edits[0][1].startswith("Guardy removes")
+    assert edits[-1][1] == "Guardy removes spam from your group and verifies new members with a captcha or a web check."
+
+    stats = assistant.stats()
+    assert (stats["runs"], stats["failures"]) == (1, 0)
+    assert FIRST_TOKEN_DELAY <= stats["avg_first_token_seconds"] < 2 * FIRST_TOKEN_DELAY
+    assert FIRST_TOKEN_DELAY + (len(CHUNKS) - 1) * CHUNK_DELAY <= stats["avg_total_seconds"] <= elapsed
+
+
+def test_failed_stream_falls_back_to_the_error_message(assistant):
+    edits, _ = asyncio.run(ask(assistant, FakeRunStream(CHUNKS, fail_after=len(CHUNKS) // 2)))
+
+    assert edits[-1][1] == "Something went wrong. Try once again..."
+    assert assistant.stats() == {"runs": 0, "failures": 1, "avg_first_token_seconds": None, "avg_total_seconds": None}
+
+
+def test_failed_run_event_falls_back_to_the_error_message(assistant):
+    class FailedRunStream(FakeRunStream):
+        async def __aiter__(self):
+            yield text_delta("Guardy ")
+            yield SimpleNamespace(event="thread.run.failed", data=SimpleNamespace(last_error="rate_limit_exceeded"))
+
+    edits, _ = asyncio.run(ask(assistant, FailedRunStream(CHUNKS)))
+
+    assert [text for _, text in edits] == ["Something went wrong. Try once again..."]
+    assert assistant.stats()["failures"] == 1
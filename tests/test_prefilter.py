@@ -0,0 +1,53 @@
+import pytest
+from scam_algo_src.prefilter import SpamPreFilter, CLEARLY_HAM, CLEARLY_SPAM, NEEDS_MODEL
+
+
+@pytest.fixture
+def prefilter():
+    return SpamPreFilter()
+
+
+@pytest.mark.parametrize("text", [
+    "ok",
+    "thanks!",
+    "see you tomorrow",
+    "gm everyone!",
+    "Good morning guys",
+    "thank you all",
+    "😂😂🔥",
+    "👍",
+])
+def test_obvious_chat_is_clearly_ham(prefilter, text):
+    assert prefilter.classify(text, entity_types=[])[0] == CLEARLY_HAM
+
+
+@pytest.mark.parametrize("text", [
+    "Hi everyone, I made $5,000 this week with Mr. Smith's program, contact him now!",
+    "Urgent: your account will be suspended, verify your identity at the admin's DM",
+    "Hello dear, who wants to make money from home? Only 10 spots left",
+    "Hello dear",
+    "send 100 now",
+    "Does anyone know when the next release ships? I could not find it in the docs.",
+])
+def test_anything_else_reaches_the_model(prefilter, text):
+    assert prefilter.classify(text, entity_types=[])[0] == NEEDS_MODEL
+
+
+def test_greeting_with_contact_reaches_the_model(prefilter):
+    assert prefilter.classify("gm everyone @somebody", entity_types=["mention"])[0] == NEEDS_MODEL
+
+
+def test_keywords_with_contact_are_clearly_spam(prefilter):
+    decision, probability = prefilter.classify("Claim your airdrop now, guaranteed profit! t.me/scam", entity_types=["url"])
+    assert decision == CLEARLY_SPAM
+    assert probability > 0.6
+
+
+def test_stats_count_decisions_per_stage(prefilter):
+    prefilter.classify("ok", entity_types=[])
+    prefilter.classify("Hello dear, who wants to make money from home?", entity_types=[])
+    stats = prefilter.stats()
+    assert stats["total"] == 2
+    assert stats["decisions"] == {CLEARLY_HAM: 1, NEEDS_MODEL: 1}
+    assert stats["stages"] == {"short_message_stage": {CLEARLY_HAM: 1}}
+    assert stats["model_rate"] == 0.5
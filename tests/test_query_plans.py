@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+from db_helpers import test_database, QueryRecorder
+
+GROUP_ID = -1001234567890
+USER_ID = 111222333
+
+
+async def run_every_query(db):
+    """
+    calls every MongoDBManager method that reads, updates or deletes by a filter.
+    """
+    await db.add_new_public_group(GROUP_ID, added_by=USER_ID, member_count=10, chat_title="Group")
+    await db.check_if_group_exists(GROUP_ID)
+    await db.add_new_private_user(USER_ID, "user")
+    await db.check_if_user_exists(USER_ID)
+    await db.delete_private_user_by_id(USER_ID)
+    await db.set_admin_config(GROUP_ID, {"link_removal": "yes"})
+    db.config_cache.invalidate(GROUP_ID)
+    await db.get_admin_config(GROUP_ID)
+    await db.check_if_admin_config_exists(GROUP_ID)
+    await db.delete_admin_config(GROUP_ID)
+    await db.store_verification_data(GROUP_ID, "group", "Group", 5, USER_ID, "captcha", False)
+    await db.get_verification_data(USER_ID, GROUP_ID)
+    await db.get_pending_verification(USER_ID)
+    await db.get_pending_verification(USER_ID, GROUP_ID)
+    await db.delete_verification_data(USER_ID)
+    await db.initialize_scam_voting(GROUP_ID, 42, 43, datetime.now(timezone.utc) + timedelta(seconds=60))
+    await db.register_vote(GROUP_ID, 42, USER_ID, vote_yes=True)
+    await db.register_vote(GROUP_ID, 42, USER_ID, vote_yes=True)  # repeated: second lookup
+    await db.delete_scam_voting(GROUP_ID, 42)
+    await db.set_spam_verdict("f" * 64, {"probability": 0.9, "label": "spam"})
+    await db.get_spam_verdict("f" * 64, max_age_seconds=60)
+    await db.add_pending_deletions([{"chat_id": GROUP_ID, "message_id": 7, "expires_at": datetime.now(timezone.utc)}])
+    await db.remove_pending_deletions(GROUP_ID, [7])
+    await db.add_captcha_to_corpus("file-id", "12", 8)
+    await db.remove_captchas_from_corpus(["file-id"])
+    await db.sweep_expired_records()
+    await db.delete_group_data(GROUP_ID)
+
+
+async def explain_stage(db, collection, query):
+    explanation = await db.db.command("explain", {"find": collection, "filter": query}, verbosity="queryPlanner")
+    return db._input_stage(explanation["queryPlanner"]["winningPlan"])
+
+
+def test_every_manager_query_uses_an_index(mongo_uri):
+    async def scenario():
+        recorder = QueryRecorder.install()
+        async with test_database(mongo_uri) as db:
+            recorder.database_name = db.db.name
+            await run_every_query(db)
+            recorder.database_name = None
+            stages = {}
+            for command, collection, query in recorder.queries:
+                if not query:
+                    continue  # whole-collection loads at start-up (open votes, pending deletions, corpus)
+                name = f"{command} {collection} {sorted(query)}"
+                stages[name] = await explain_stage(db, collection, query)
+            return stages
+
+    stages = asyncio.run(scenario())
+    collections = {name.split()[1] for name in stages}
+    assert collections == {"PrivateChats", "GroupChats", "GroupChatConfigs", "GroupChatVerifications",
+                           "GroupChatScamVoting", "SpamVerdicts", "PendingDeletions", "CaptchaCorpus"}
+    collection_scans = [name for name, stage in stages.items() if stage == "COLLSCAN"]
+    assert not collection_scans, f"queries without an index: {collection_scans}"
+
+
+def test_verify_query_plans_reports_no_collection_scan(mongo_uri):
+    async def scenario():
+        async with test_database(mongo_uri) as db:
+            return await db.verify_query_plans()
+
+    plans = asyncio.run(scenario())
+    assert plans
+    assert "COLLSCAN" not in plans.values()
+
+
+def test_ensure_indexes_is_idempotent_and_updates_ttl(mongo_uri):
+    async def scenario():
+        async with test_database(mongo_uri, verification_retention=600) as db:
+            db.verification_retention = 1200
+            await db.ensure_indexes()
+            await db.ensure_indexes()
+            indexes = await db.db[db.GROUP_CHAT_VERIFICATIONS].index_information()
+            return [index.get("expireAfterSeconds") for index in indexes.values() if "expireAfterSeconds" in index]
+
+    assert asyncio.run(scenario()) == [1200]
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+from db_helpers import test_database
+
+GROUP_ID = -1001234567890
+USER_ID = 111222333
+SCAM_MESSAGE_ID = 42
+
+
+# the database calls each handler makes, in handler order
+async def start(db):
+    # commands.start_command
+    await db.add_new_private_user(USER_ID, "user", "First", "Last")
+
+
+async def join(db):
+    # app.handle_new_members -> new_members.handle_new_group_member, group config served from the cache
+    group_config = await db.get_admin_config(group_id=GROUP_ID)
+    if group_config.get("human_verification", "no") != "no":
+        await db.store_verification_data(GROUP_ID, "group", "Group", 5, USER_ID, group_config["human_verification"], False)
+
+
+async def vote(db):
+    # group_message_handler.dispatch_group_msg_voting
+    await db.register_vote(GROUP_ID, SCAM_MESSAGE_ID, USER_ID, vote_yes=True)
+
+
+async def leave(db):
+    # left_members.handle_left_guardy: one delete per collection, sent concurrently
+    await asyncio.gather(db.delete_group_data(group_id=GROUP_ID), db.delete_admin_config(group_id=GROUP_ID))
+
+
+def test_round_trips_per_bot_action(mongo_uri):
+    async def scenario():
+        async with test_database(mongo_uri, count_round_trips=True) as db:
+            await db.add_new_public_group(GROUP_ID, added_by=USER_ID, member_count=10)
+            await db.set_admin_config(GROUP_ID, {"human_verification": "captcha"})  # warms the config cache
+            await db.initialize_scam_voting(GROUP_ID, SCAM_MESSAGE_ID, 43, datetime.now(timezone.utc) + timedelta(seconds=60))
+            round_trips = {}
+            for action in (start, join, vote, leave):
+                before = db.round_trips.snapshot()
+                await action(db)
+                round_trips[action.__name__] = db.round_trips.since(before)
+            return round_trips
+
+    round_trips = asyncio.run(scenario())
+    assert round_trips == {
+        "start": {"update": 1},
+        "join": {"insert": 1},
+        "vote": {"update": 1},
+        "leave": {"delete": 2},
+    }
+
+
+def test_repeated_start_stays_a_single_round_trip(mongo_uri):
+    async def scenario():
+        async with test_database(mongo_uri, count_round_trips=True) as db:
+            await start(db)
+            before = db.round_trips.snapshot()
+            await start(db)  # user already stored: still one upsert, no lookup first
+            repeated_start = db.round_trips.since(before)
+            return repeated_start
+
+    assert asyncio.run(scenario()) == {"update": 1}
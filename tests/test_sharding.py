@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from db_helpers import test_database
+
+GROUP_ID = -1001234567890
+OTHER_GROUP_ID = -1009876543210
+USER_ID = 111222333
+
+
+def test_group_and_private_chat_of_a_user_are_routed_independently():
+    pytest.importorskip("telegram")
+    from bot.sharding import Shard, jump_consistent_hash
+    workers = 4
+    shards = [Shard(index, workers) for index in range(workers)]
+    assert [shard.owns(GROUP_ID) for shard in shards].count(True) == 1
+    # most users verify in a private chat another shard serves than the group they joined
+    users = range(1, 1001)
+    other_shard = sum(jump_consistent_hash(user_id, workers) != jump_consistent_hash(GROUP_ID, workers) for user_id in users)
+    assert other_shard > 0.6 * len(users)
+
+
+def test_pending_verification_is_visible_to_every_shard(mongo_uri):
+    from database.database import MongoDBManager
+
+    async def scenario():
+        async with test_database(mongo_uri) as group_shard_db:
+            # every shard process has its own manager, they only share the database
+            private_shard_db = MongoDBManager(mongo_uri, db_name=group_shard_db.db.name)
+            try:
+                await group_shard_db.store_verification_data(OTHER_GROUP_ID, "other", "Other", 4, USER_ID, "image", False)
+                await group_shard_db.store_verification_data(GROUP_ID, "group", "Group", 5, USER_ID, "image", False)
+                latest = await private_shard_db.get_pending_verification(USER_ID)
+                await private_shard_db.delete_verification_data(USER_ID, latest["group_id"])
+                remaining = await private_shard_db.get_pending_verification(USER_ID)
+                await private_shard_db.delete_verification_data(USER_ID, remaining["group_id"])
+                none_left = await private_shard_db.get_pending_verification(USER_ID)
+            finally:
+                private_shard_db.client.close()
+            return latest, remaining, none_left
+
+    latest, remaining, none_left = asyncio.run(scenario())
+    assert (latest["group_id"], latest["welcome_message_id"]) == (GROUP_ID, 5)
+    assert (remaining["group_id"], remaining["welcome_message_id"]) == (OTHER_GROUP_ID, 4)
+    assert none_left is None
+
+
+def test_pending_verification_of_a_given_group(mongo_uri):
+    async def scenario():
+        async with test_database(mongo_uri) as db:
+            await db.store_verification_data(OTHER_GROUP_ID, "other", "Other", 4, USER_ID, "image", False)
+            await db.store_verification_data(GROUP_ID, "group", "Group", 5, USER_ID, "image", False)
+            older = await db.get_pending_verification(USER_ID, OTHER_GROUP_ID)
+            newer = await db.get_pending_verification(USER_ID, GROUP_ID)
+            await db.delete_verification_data(USER_ID, OTHER_GROUP_ID)
+            after_verifying_older = await db.get_pending_verification(USER_ID, OTHER_GROUP_ID)
+            still_pending = await db.get_pending_verification(USER_ID, GROUP_ID)
+            return older, newer, after_verifying_older, still_pending
+
+    older, newer, after_verifying_older, still_pending = asyncio.run(scenario())
+    assert older["welcome_message_id"] == 4
+    assert newer["welcome_message_id"] == still_pending["welcome_message_id"] == 5
+    assert after_verifying_older is None
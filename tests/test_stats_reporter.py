@@ -0,0 +1,63 @@
+import asyncio
+import json
+import logging
+from scam_algo_src.overload_control import OverloadController, SHEDDING
+from scam_algo_src.prefilter import SpamPreFilter
+from bot.stats_reporter import StatsReporter
+
+
+class BackloggedInference:
+    def load(self, chat_id=None):
+        return 500, 10.0  # pending texts, oldest wait
+
+
+def shed_messages(overload_control, count):
+    _, _, features = SpamPreFilter().analyze("check this amazing investment opportunity out", [])
+    for _ in range(count):
+        overload_control.decide(features, chat_id=-100)
+
+
+def test_snapshot_reports_shed_scanning():
+    overload_control = OverloadController(BackloggedInference(), sample_rate=0.0)
+    shed_messages(overload_control, 10)
+    snapshot = StatsReporter({"overload_control": overload_control.stats}).snapshot()
+    assert snapshot["overload_control"]["level"] == SHEDDING
+    assert sum(snapshot["overload_control"]["decisions"].values()) == 10
+    assert snapshot["overload_control"]["shed_rate"] == 1.0
+
+
+def test_failing_source_does_not_hide_the_others():
+    def broken():
+        raise RuntimeError("not started")
+
+    snapshot = StatsReporter({"broken": broken, "ok": lambda: {"value": 1}}).snapshot()
+    assert snapshot == {"broken": {"error": "not started"}, "ok": {"value": 1}}
+
+
+def test_stats_are_logged_periodically(caplog):
+    overload_control = OverloadController(BackloggedInference(), sample_rate=0.0)
+    shed_messages(overload_control, 3)
+
+    async def scenario():
+        reporter = StatsReporter({"overload_control": overload_control.stats}, interval=0.01)
+        reporter.start()
+        await asyncio.sleep(0.05)
+        await reporter.stop()
+        return reporter.reports
+
+    with caplog.at_level(logging.INFO, logger="bot.stats_reporter"):
+        reports = asyncio.run(scenario())
+    assert reports >= 2
+    line = next(record.getMessage() for record in caplog.records if record.name == "bot.stats_reporter")
+    logged = json.loads(line.split("Service stats: ", 1)[1])
+    assert logged["overload_control"]["shed_rate"] == 1.0
+
+
+def test_disabled_interval_never_logs():
+    async def scenario():
+        reporter = StatsReporter({"ok": lambda: {}}, interval=0)
+        reporter.start()
+        await asyncio.sleep(0.01)
+        return reporter._loop_task
+
+    assert asyncio.run(scenario()) is None
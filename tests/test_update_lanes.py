@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+
+pytest.importorskip("telegram")
+from telegram import Update
+from bot.update_lanes import PriorityUpdateProcessor, update_lane, LANE_INTERACTIVE, LANE_MODERATION, LANE_SCANNING
+
+GROUP = {"id": -100123, "type": "supergroup", "title": "group"}
+USER = {"id": 7, "is_bot": False, "first_name": "user"}
+
+
+def group_message(update_id, text="hello everyone", entities=None):
+    message = {"message_id": update_id, "date": 0, "chat": GROUP, "from": USER, "text": text}
+    if entities:
+        message["entities"] = entities
+    return Update.de_json({"update_id": update_id, "message": message}, None)
+
+
+def callback(update_id):
+    message = {"message_id": update_id, "date": 0, "chat": GROUP, "from": USER, "text": "verify"}
+    return Update.de_json({"update_id": update_id, "callback_query": {"id": str(update_id), "from": USER, "chat_instance": "1", "data": "vrfct_correct_captcha", "message": message}}, None)
+
+
+class Handlers:
+    """handler coroutines that record when they start and run until released"""
+
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+
+    async def run(self, name):
+        self.started.append(name)
+        self.gates[name] = asyncio.Event()
+        await self.gates[name].wait()
+
+    def release(self, name):
+        self.gates[name].set()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_updates_are_sorted_into_lanes():
+    assert update_lane(group_message(1)) == LANE_SCANNING
+    assert update_lane(group_message(2, "/config")) == LANE_INTERACTIVE
+    assert update_lane(group_message(3, "see example.com", [{"type": "url", "offset": 4, "length": 11}])) == LANE_MODERATION
+    assert update_lane(callback(4)) == LANE_INTERACTIVE
+
+
+def test_waiting_interactive_updates_run_before_waiting_scans():
+    async def scenario():
+        processor = PriorityUpdateProcessor(2, lane_limits={LANE_SCANNING: 2})
+        handlers = Handlers()
+        tasks = [asyncio.create_task(processor.process_update(group_message(number), handlers.run(f"scan {number}"))) for number in (1, 2)]
+        await settle()
+        tasks += [asyncio.create_task(processor.process_update(group_message(number), handlers.run(f"scan {number}"))) for number in (3, 4)]
+        tasks += [asyncio.create_task(processor.process_update(callback(number), handlers.run(f"click {number}"))) for number in (5, 6)]
+        await settle()
+        waiting = processor.stats()
+        for name in ("scan 1", "scan 2", "click 5", "click 6", "scan 3", "scan 4"):
+            handlers.release(name)
+            await settle()
+        await asyncio.gather(*tasks)
+        return handlers.started, waiting, processor.stats()
+
+    started, waiting, done = asyncio.run(scenario())
+    assert started == ["scan 1", "scan 2", "click 5", "click 6", "scan 3", "scan 4"]
+    assert waiting["lanes"][LANE_SCANNING]["waiting"] == 2
+    assert waiting["lanes"][LANE_INTERACTIVE]["waiting"] == 2
+    assert done["running"] == 0
+    assert done["lanes"][LANE_SCANNING]["processed"] == 4
+
+
+def test_lane_limit_leaves_capacity_to_the_other_lanes():
+    async def scenario():
+        processor = PriorityUpdateProcessor(4, lane_limits={LANE_SCANNING: 1})
+        handlers = Handlers()
+        tasks = [asyncio.create_task(processor.process_update(group_message(number), handlers.run(f"scan {number}"))) for number in (1, 2, 3)]
+        tasks.append(asyncio.create_task(processor.process_update(callback(4), handlers.run("click 4"))))
+        await settle()
+        during_raid = (list(handlers.started), processor.stats())
+        for name in ("click 4", "scan 1", "scan 2", "scan 3"):
+            handlers.release(name)
+            await settle()
+        await asyncio.gather(*tasks)
+        return during_raid
+
+    started, stats = asyncio.run(scenario())
+    assert started == ["scan 1", "click 4"]  # scans queue behind the lane limit, the click does not
+    assert stats["running"] == 2
+    assert stats["lanes"][LANE_SCANNING] == {"limit": 1, "running": 1, "waiting": 2, "max_waiting": 2, "processed": 0}
+
+
+def test_cancelled_waiting_update_never_runs_and_frees_its_place():
+    async def scenario():
+        processor = PriorityUpdateProcessor(1)
+        handlers = Handlers()
+        running = asyncio.create_task(processor.process_update(group_message(1), handlers.run("scan 1")))
+        await settle()
+        cancelled = asyncio.create_task(processor.process_update(group_message(2), handlers.run("scan 2")))
+        queued = asyncio.create_task(processor.process_update(group_message(3), handlers.run("scan 3")))
+        await settle()
+        cancelled.cancel()
+        await settle()
+        handlers.release("scan 1")
+        await settle()
+        handlers.release("scan 3")
+        await asyncio.gather(running, queued)
+        return handlers.started, cancelled.cancelled(), processor.stats()
+
+    started, was_cancelled, stats = asyncio.run(scenario())
+    assert was_cancelled
+    assert started == ["scan 1", "scan 3"]
+    assert stats["running"] == 0
+    assert stats["lanes"][LANE_SCANNING]["waiting"] == 0
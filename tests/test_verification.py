@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+import asyncio
+import pytest
+
+pytest.importorskip("telegram")
+from bot import verification
+
+USER_ID = 111222333
+GROUP_ID = -1001234567890
+OTHER_GROUP_ID = -1009876543210
+
+
+class FakeVerificationDb:
+    def __init__(self, pending, group_configs):
+        self.pending = pending  # [{"group_id": ..., "user_id": ..., ...}]
+        self.group_configs = group_configs
+
+    async def get_pending_verification(self, user_id, group_id=None):
+        records = [record for record in self.pending if record["user_id"] == user_id and group_id in (None, record["group_id"])]
+        return records[-1] if records else None
+
+    async def get_admin_config(self, group_id):
+        return self.group_configs.get(group_id, {})
+
+
+def private_update(user_id=USER_ID):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=user_id), effective_user=SimpleNamespace(id=user_id), message=None)
+
+
+@pytest.fixture
+def started(monkeypatch):
+    started = []
+
+    async def captcha_command(update, context):
+        started.append("image")
+
+    async def web_command(update, context):
+        started.append("web")
+
+    monkeypatch.setattr(verification, "captcha_command", captcha_command)
+    monkeypatch.setattr(verification, "web_command", web_command)
+    return started
+
+
+def test_verify_command_starts_the_verification_the_group_configured(started):
+    db = FakeVerificationDb([{"user_id": USER_ID, "group_id": GROUP_ID}], {GROUP_ID: {"human_verification": "image"}})
+    context = SimpleNamespace(args=[], user_data={})
+    asyncio.run(verification.verify_user_command(private_update(), context, db))
+    assert started == ["image"]
+    assert context.user_data["to_verify_in_group_id"] == GROUP_ID
+
+
+def test_verify_command_without_pending_verification_does_nothing(started):
+    db = FakeVerificationDb([], {GROUP_ID: {"human_verification": "image"}})
+    asyncio.run(verification.verify_user_command(private_update(), SimpleNamespace(args=[], user_data={}), db))
+    assert started == []
+
+
+def test_deep_link_picks_the_group_among_several_pending_verifications(started):
+    db = FakeVerificationDb([{"user_id": USER_ID, "group_id": GROUP_ID}, {"user_id": USER_ID, "group_id": OTHER_GROUP_ID}],
+                            {GROUP_ID: {"human_verification": "image"}, OTHER_GROUP_ID: {"human_verification": "web"}})
+    chosen = []
+    for group_id in (GROUP_ID, OTHER_GROUP_ID):
+        is_verification, payload_group_id = verification.parse_verification_start_payload(verification.verification_start_payload(group_id))
+        assert is_verification
+        context = SimpleNamespace(args=[], user_data={})
+        asyncio.run(verification.verify_user_command(private_update(), context, db, group_id=payload_group_id))
+        chosen.append(context.user_data["to_verify_in_group_id"])
+    assert chosen == [GROUP_ID, OTHER_GROUP_ID]  # the older verification is not shadowed by the newer one
+    assert started == ["image", "web"]
+
+
+def test_start_payloads():
+    assert verification.parse_verification_start_payload("verify") == (True, None)  # welcome messages of older versions
+    assert verification.parse_verification_start_payload(f"verify_{GROUP_ID}") == (True, GROUP_ID)
+    assert verification.parse_verification_start_payload("verify_x") == (True, None)
+    assert verification.parse_verification_start_payload("") == (False, None)
+    assert len(verification.verification_start_payload(GROUP_ID)) <= 64  # telegram's limit for start parameters
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+import time
+from bot.vote_scheduler import VoteScheduler
+
+GROUP_ID = -1001234567890
+OTHER_SHARD_GROUP_ID = -1009876543210
+
+
+def in_seconds(seconds):
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+class FakeVoteDb:
+    """
+    the open scam votings the scheduler restores on start.
+    """
+
+    def __init__(self, open_votes=()):
+        self.open_votes = list(open_votes)
+
+    async def get_open_scam_votings(self):
+        return self.open_votes
+
+
+class ConcludeRecorder:
+    """
+    records when each vote is concluded and how many conclude at the same time.
+    """
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.concluded = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.all_done = asyncio.Event()
+        self.expected = None
+
+    async def __call__(self, group_id, scam_message_id):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.duration)
+        self.in_flight -= 1
+        self.concluded.append((time.time(), group_id, scam_message_id))
+        if len(self.concluded) == self.expected:
+            self.all_done.set()
+
+
+def test_votes_are_concluded_in_deadline_order():
+    async def scenario():
+        conclude = ConcludeRecorder()
+        conclude.expected = 4
+        scheduler = VoteScheduler(FakeVoteDb(), conclude=conclude)
+        await scheduler.start()
+        deadlines = {1: in_seconds(0.2), 2: in_seconds(0.1), 3: in_seconds(0.15)}
+        for scam_message_id, deadline in deadlines.items():
+            scheduler.schedule(GROUP_ID, scam_message_id, deadline)
+        await asyncio.sleep(0.02)
+        deadlines[4] = in_seconds(0.03)  # new earliest deadline while the loop waits for vote 2
+        scheduler.schedule(GROUP_ID, 4, deadlines[4])
+        await asyncio.wait_for(conclude.all_done.wait(), timeout=2)
+        stats = scheduler.stats()
+        await scheduler.stop()
+        return conclude.concluded, deadlines, stats
+
+    concluded, deadlines, stats = asyncio.run(scenario())
+    assert [scam_message_id for _, _, scam_message_id in concluded] == [4, 2, 3, 1]
+    for concluded_at, _, scam_message_id in concluded:
+        assert 0 <= concluded_at - deadlines[scam_message_id].timestamp() < 0.1  # not early, not late
+    assert stats == {"open_votes": 0, "concluding": 0, "concluded": 4}
+
+
+def test_open_votes_are_restored_on_start():
+    async def scenario():
+        open_votes = [
+            # mongodb returns naive utc datetimes
+            {"group_id": GROUP_ID, "scam_message_id": 1, "deadline": in_seconds(0.1).replace(tzinfo=None)},
+            {"group_id": GROUP_ID, "scam_message_id": 2, "deadline": in_seconds(-60).replace(tzinfo=None)},  # expired while the bot was down
+            {"group_id": OTHER_SHARD_GROUP_ID, "scam_message_id": 3, "deadline": in_seconds(-60).replace(tzinfo=None)},
+        ]
+        conclude = ConcludeRecorder()
+        conclude.expected = 2
+        scheduler = VoteScheduler(FakeVoteDb(open_votes), conclude=conclude, owns=lambda group_id: group_id == GROUP_ID)
+        started = time.time()
+        await scheduler.start()
+        restored = len(scheduler)
+        await asyncio.wait_for(conclude.all_done.wait(), timeout=2)
+        await asyncio.sleep(0.05)  # nothing else is concluded
+        await scheduler.stop()
+        return started, restored, conclude.concluded
+
+    started, restored, concluded = asyncio.run(scenario())
+    assert restored == 2  # the vote of the other shard's group is left to that shard
+    assert [(group_id, scam_message_id) for _, group_id, scam_message_id in concluded] == [(GROUP_ID, 2), (GROUP_ID, 1)]
+    assert concluded[0][0] - started < 0.05  # the expired vote is concluded right away
+    assert concluded[1][0] - started >= 0.1
+
+
+def test_concurrent_conclusions_are_limited():
+    votes = 50
+
+    async def scenario():
+        conclude = ConcludeRecorder(duration=0.05)
+        conclude.expected = votes
+        scheduler = VoteScheduler(FakeVoteDb(), conclude=conclude)
+        await scheduler.start()
+        for scam_message_id in range(votes):
+            scheduler.schedule(GROUP_ID, scam_message_id, in_seconds(-1))
+        await asyncio.sleep(0.02)
+        concluding = scheduler.stats()["concluding"]
+        await asyncio.wait_for(conclude.all_done.wait(), timeout=2)
+        await scheduler.stop()
+        return conclude, concluding
+
+    conclude, concluding = asyncio.run(scenario())
+    assert concluding == votes  # every due vote gets a task at once ...
+    assert conclude.max_in_flight == 20  # ... but only max_concurrent conclude at the same time
+    assert len(conclude.concluded) == votes
@@ -0,0 +1,88 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import asyncio
+import random
+import pytest
+from db_helpers import test_database
+
+GROUP_ID = -1001234567890
+SCAM_MESSAGE_ID = 4242
+
+
+async def open_voting(db):
+    deadline = datetime.now(timezone.utc) + timedelta(seconds=60)
+    assert await db.initialize_scam_voting(GROUP_ID, SCAM_MESSAGE_ID, alert_message_id=4243, deadline=deadline)
+
+
+def test_simultaneous_votes_are_counted_exactly_once(mongo_uri):
+    voters = 400
+    presses_per_voter = 3  # impatient users hammering the button
+
+    async def scenario():
+        async with test_database(mongo_uri) as db:
+            await open_voting(db)
+            ballots = {user_id: random.random() < 0.7 for user_id in range(1, voters + 1)}
+            presses = [(user_id, vote_yes) for user_id, vote_yes in ballots.items() for _ in range(presses_per_voter)]
+            random.shuffle(presses)
+            outcomes = await asyncio.gather(*[
+                db.register_vote(GROUP_ID, SCAM_MESSAGE_ID, user_id, vote_yes) for user_id, vote_yes in presses
+            ])
+            record = await db.delete_scam_voting(GROUP_ID, SCAM_MESSAGE_ID)
+            return ballots, Counter(outcomes), record
+
+    ballots, outcomes, record = asyncio.run(scenario())
+    yes_votes = sum(ballots.values())
+    assert outcomes == {"counted": voters, "already_voted": voters * (presses_per_voter - 1)}
+    assert record["vote_scam_yes"] == yes_votes
+    assert record["vote_scam_no"] == voters - yes_votes
+    assert sorted(record["voters"]) == sorted(ballots)
+
+
+def test_vote_on_concluded_or_unknown_voting_is_closed(mongo_uri):
+    async def scenario():
+        async with test_database(mongo_uri) as db:
+            unknown = await db.register_vote(GROUP_ID, SCAM_MESSAGE_ID, 1, vote_yes=True)
+            await open_voting(db)
+            counted = await db.register_vote(GROUP_ID, SCAM_MESSAGE_ID, 1, vote_yes=True)
+            repeated = await db.register_vote(GROUP_ID, SCAM_MESSAGE_ID, 1, vote_yes=False)
+            await db.delete_scam_voting(GROUP_ID, SCAM_MESSAGE_ID)  # concluded
+            after_conclusion = await db.register_vote(GROUP_ID, SCAM_MESSAGE_ID, 2, vote_yes=True)
+            return unknown, counted, repeated, after_conclusion
+
+    unknown, counted, repeated, after_conclusion = asyncio.run(scenario())
+    assert (unknown, counted, repeated, after_conclusion) == ("closed", "counted", "already_voted", "closed")
+
+
+def test_vote_press_is_answered_per_outcome(mongo_uri):
+    pytest.importorskip("telegram")
+    from types import SimpleNamespace
+    import bot.group_message_handler as gmh
+
+    class FakeQuery:
+        def __init__(self, user_id):
+            self.data = "msg_check_vote_scam_yes"
+            self.from_user = SimpleNamespace(id=user_id)
+            self.message = SimpleNamespace(message_thread_id=SCAM_MESSAGE_ID, chat=SimpleNamespace(id=GROUP_ID))
+            self.answers = []
+
+        async def answer(self, text=None, show_alert=False):
+            self.answers.append(text)
+
+    async def press(db, user_id):
+        query = FakeQuery(user_id)
+        await gmh.dispatch_group_msg_voting(query, SimpleNamespace(callback_query=query), db)
+        return query.answers
+
+    async def scenario():
+        async with test_database(mongo_uri) as db:
+            await open_voting(db)
+            first = await press(db, 1)
+            again = await press(db, 1)
+            await db.delete_scam_voting(GROUP_ID, SCAM_MESSAGE_ID)
+            closed = await press(db, 2)
+            return first, again, closed
+
+    first, again, closed = asyncio.run(scenario())
+    assert first == []
+    assert again == ["You've already voted!"]
+    assert closed == ["This voting is already closed."]
@@ -0,0 +1,202 @@
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("telegram")
+pytest.importorskip("aiohttp")
+from aiohttp import ClientSession, TCPConnector, web
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+from bot.stats_reporter import StatsReporter
+from bot.update_lanes import PriorityUpdateProcessor
+from bot.webhook_server import SECRET_TOKEN_HEADER, WebhookServer
+
+TOKEN = "123456:replay"
+SECRET = "replay-secret"
+WEBHOOK_URL = "https://guardy.example.com/telegram"
+UPDATES = 5000
+GROUPS = 50
+NETWORK_DELAY = 0.02  # telegram <-> guardy, each way
+
+
+def synthetic_update(update_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": -1000000000000 - update_id % GROUPS, "type": "supergroup", "title": "replay"},
+            "from": {"id": 100000 + update_id, "is_bot": False, "first_name": "user"},
+            "text": f"synthetic message {update_id}",
+        },
+    }
+
+
+class FakeBotApi:
+    """
+    the parts of the bot api the application needs to start and poll, serving a fixed backlog of updates.
+    """
+
+    def __init__(self, updates, delay=0.0):
+        self.updates = updates
+        self.delay = delay
+        self.get_updates_calls = 0
+
+    def build_app(self):
+        app = web.Application()
+        app.router.add_post(f"/bot{TOKEN}/{{method}}", self.handle)
+        return app
+
+    async def handle(self, request: web.Request):
+        method = request.match_info["method"]
+        params = await request.post()
+        if method == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "Guardy", "username": "guardy_replay_bot"}
+        elif method == "getUpdates":
+            self.get_updates_calls += 1
+            await asyncio.sleep(2 * self.delay)  # request and response
+            offset, limit = int(params.get("offset") or 0), int(params.get("limit") or 100)
+            result = [update for update in self.updates if update["update_id"] >= offset][:limit]
+            if not result:
+                await asyncio.sleep(0.05)  # long poll with nothing to deliver
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+async def serve(app):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+
+def build_counting_application(base_url=None, expected=UPDATES):
+    builder = Application.builder().token(TOKEN).concurrent_updates(PriorityUpdateProcessor(128))
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
+    handled, done = set(), asyncio.Event()
+
+    async def count(update, context):
+        handled.add(update.update_id)
+        if len(handled) == expected:
+            done.set()
+
+    application.add_handler(TypeHandler(Update, count))
+    return application, handled, done
+
+
+def test_webhook_url_is_validated_before_serving():
+    application = Application.builder().token(TOKEN).build()
+    for url in (None, "", "http://guardy.example.com/telegram", "https:///telegram", "https://guardy.example.com/other"):
+        with pytest.raises(ValueError):
+            WebhookServer(application, url, secret_token=SECRET)
+    WebhookServer(application, WEBHOOK_URL, secret_token=SECRET)
+    WebhookServer(application, "https://guardy.example.com/bots/guardy", secret_token=SECRET, path="/guardy")
+
+
+def test_webhook_rejects_wrong_secret_and_queues_valid_updates():
+    async def scenario():
+        application = Application.builder().token(TOKEN).build()
+        server = WebhookServer(application, WEBHOOK_URL, secret_token=SECRET)
+        runner, port = await serve(server.build_app())
+        url = f"http://127.0.0.1:{port}/telegram"
+        async with ClientSession() as session:
+            async with session.post(url, json=synthetic_update(1), headers={SECRET_TOKEN_HEADER: "wrong"}) as response:
+                forbidden = response.status
+            async with session.post(url, data=b"not json", headers={SECRET_TOKEN_HEADER: SECRET}) as response:
+                invalid = response.status
+            async with session.post(url, json=synthetic_update(2), headers={SECRET_TOKEN_HEADER: SECRET}) as response:
+                accepted = response.status
+        await runner.cleanup()
+        queued = await application.update_queue.get()
+        return forbidden, invalid, accepted, queued, server.stats()
+
+    forbidden, invalid, accepted, queued, stats = asyncio.run(scenario())
+    assert (forbidden, invalid, accepted) == (403, 400, 200)
+    assert queued.update_id == 2
+    assert stats == {"received": 1, "rejected": 1, "invalid": 1, "queued": 0}
+
+
+def test_health_serves_the_service_stats():
+    async def scenario():
+        application = Application.builder().token(TOKEN).build()
+        application.bot_data['stats_reporter'] = StatsReporter({"overload_control": lambda: {"level": "normal", "shed_rate": 0.0}})
+        server = WebhookServer(application, WEBHOOK_URL, secret_token=SECRET)
+        runner, port = await serve(server.build_app())
+        async with ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/health") as response:
+                health = await response.json()
+        await runner.cleanup()
+        return health
+
+    health = asyncio.run(scenario())
+    assert health["webhook"] == {"received": 0, "rejected": 0, "invalid": 0, "queued": 0}
+    assert health["overload_control"] == {"level": "normal", "shed_rate": 0.0}
+
+
+@pytest.mark.benchmark
+def test_replayed_updates_per_second_webhook_vs_polling():
+    updates = [synthetic_update(update_id) for update_id in range(1, UPDATES + 1)]
+
+    async def replay_polling():
+        fake_api = FakeBotApi(updates, delay=NETWORK_DELAY)
+        api_runner, port = await serve(fake_api.build_app())
+        application, handled, done = build_counting_application(base_url=f"http://127.0.0.1:{port}/bot")
+        await application.initialize()
+        await application.start()
+        started = time.perf_counter()
+        await application.updater.start_polling(poll_interval=0, timeout=10)
+        await done.wait()
+        elapsed = time.perf_counter() - started
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+        await api_runner.cleanup()
+        return len(handled), elapsed, fake_api.get_updates_calls
+
+    async def replay_webhook(max_connections=100):
+        fake_api = FakeBotApi([])
+        api_runner, api_port = await serve(fake_api.build_app())
+        application, handled, done = build_counting_application(base_url=f"http://127.0.0.1:{api_port}/bot")
+        server = WebhookServer(application, WEBHOOK_URL, secret_token=SECRET, max_connections=max_connections)
+        await application.initialize()
+        await application.start()
+        webhook_runner, port = await serve(server.build_app())
+        url = f"http://127.0.0.1:{port}/telegram"
+
+        # telegram delivers with up to max_connections requests in flight
+        pending = asyncio.Queue()
+        for update in updates:
+            pending.put_nowait(update)
+
+        async def connection(session):
+            while not pending.empty():
+                update = pending.get_nowait()
+                await asyncio.sleep(NETWORK_DELAY)
+                async with session.post(url, json=update, headers={SECRET_TOKEN_HEADER: SECRET}) as response:
+                    assert response.status == 200
+                await asyncio.sleep(NETWORK_DELAY)
+
+        started = time.perf_counter()
+        async with ClientSession(connector=TCPConnector(limit=max_connections)) as session:
+            await asyncio.gather(*[connection(session) for _ in range(max_connections)])
+        await done.wait()
+        elapsed = time.perf_counter() - started
+        await webhook_runner.cleanup()
+        await application.stop()
+        await application.shutdown()
+        await api_runner.cleanup()
+        return len(handled), elapsed, server.stats()
+
+    polled, polling_elapsed, get_updates_calls = asyncio.run(replay_polling())
+    pushed, webhook_elapsed, webhook_stats = asyncio.run(replay_webhook())
+
+    polling_rate, webhook_rate = polled / polling_elapsed, pushed / webhook_elapsed
+    print(f"\nreplay of {UPDATES} updates with {NETWORK_DELAY * 2000:.0f}ms network round trip: "
+          f"polling {polling_rate:.0f} updates/s ({get_updates_calls} getUpdates calls), "
+          f"webhook {webhook_rate:.0f} updates/s (100 connections, {webhook_stats['rejected']} rejected)")
+    assert polled == pushed == UPDATES
+    assert webhook_stats["received"] == UPDATES